@@ -1,3 +1,4 @@
+import asyncio
 import logging
 import os
 import shutil
@@ -19,6 +20,20 @@ from src.upgrade_advisor.config import (  # noqa: E402
 )
 
 from src.upgrade_advisor.agents.package import PackageDiscoveryAgent  # noqa: E402
+from src.upgrade_advisor.agents.tools.change_feed import (  # noqa: E402
+    start_cache_refresher,
+    stop_cache_refresher,
+)
+from src.upgrade_advisor.agents.tools.http_client import (  # noqa: E402
+    aclose_http_client,
+)
+from src.upgrade_advisor.agents.tools.resolver_pool import (  # noqa: E402
+    start_resolver_pool,
+    stop_resolver_pool,
+)
+from src.upgrade_advisor.agents.tools.uv_resolver import (  # noqa: E402
+    start_uv_cache_maintenance,
+)
 from src.upgrade_advisor.chat.chat import (  # noqa: E402
     qn_rewriter,
     run_document_qa,
@@ -27,6 +42,7 @@ from src.upgrade_advisor.chat.chat import (  # noqa: E402
 from src.upgrade_advisor.misc import (  # noqa: E402
     _monkeypatch_gradio_save_history,
     get_example_questions,
+    run_coro_sync,
 )
 from src.upgrade_advisor.theme import Christmas  # noqa: E402
 
@@ -133,8 +149,10 @@ async def chat_fn(
             FILE PATH: {uploads_dir / file_name}\n
             """
     logger.info(f"Final message to agent:\n{message}")
-    # Run the package discovery agent to build context
-    context = agent.discover_package_info(
+    # Run the package discovery agent to build context, in a worker thread:
+    # its tools block on uv and the network, other sessions keep being served
+    context = await asyncio.to_thread(
+        agent.discover_package_info,
         user_input=message,
         reframed_question=rewritten_message,
     )
@@ -162,6 +180,13 @@ def main():
     logger.info("Starting MCP client...")
 
     try:
+        # keep cached PyPI metadata in sync with the index change feed
+        start_cache_refresher()
+        # pre-fill the uv cache with the metadata of commonly used packages,
+        # then keep it under its size cap
+        start_uv_cache_maintenance()
+        # run resolutions in worker processes, if configured
+        start_resolver_pool()
         gh_mcp_params = dict(
             url="https://api.githubcopilot.com/mcp/",
             transport="streamable-http",
@@ -266,6 +291,9 @@ def main():
 
     finally:
         logger.info("Cleaning up MCP client resources")
+        stop_cache_refresher()
+        stop_resolver_pool()
+        run_coro_sync(aclose_http_client())
         # remove contents of uploads_dir
         for f in uploads_dir.iterdir():
             if f.is_dir():
@@ -14,11 +14,17 @@ from ..schema import (  # noqa
 )
 from .prompts import get_package_discovery_prompt
 from .tools import (
+    ParseManifestTool,
+    PypiSearchBatchTool,
     PypiSearchTool,
     PypiSearchVersionTool,
+    PypiVersionDependenciesTool,
+    QueryDependencyGraphTool,
     ReadUploadFileTool,
+    RepoFromPyPIBatchTool,
     RepoFromPyPITool,
     RepoFromURLTool,
+    ResolveMatrixTool,
     ResolvePyProjectTOMLTool,
     WriteTomlFileTool,
 )
@@ -45,11 +51,17 @@ class PackageDiscoveryAgent:
             [
                 ReadUploadFileTool(),
                 WriteTomlFileTool(),
+                ParseManifestTool(),
                 ResolvePyProjectTOMLTool(),
+                ResolveMatrixTool(),
+                QueryDependencyGraphTool(),
                 PypiSearchTool(),
                 PypiSearchVersionTool(),
+                PypiSearchBatchTool(),
+                PypiVersionDependenciesTool(),
                 RepoFromURLTool(),
                 RepoFromPyPITool(),
+                RepoFromPyPIBatchTool(),
             ]
         )
         logger.info("Custom tools added to the agent.")
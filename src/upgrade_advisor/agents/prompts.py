@@ -53,9 +53,12 @@ def get_package_discovery_prompt(
     bullet points or numbered lists or code blocks where appropriate.
 
     IMPORTANT CONTEXT AND GUIDELINES:
-    Any issues in converting requirements.txt to pyproject.toml or parsing
-    pyproject.toml is your responsibility to handle using the available tools.
-    Make fixes as needed but report such things later in your final answer.
+    requirements.txt files and Poetry/PDM pyproject.toml files can be passed
+    to `resolve_pyproject_toml` and `parse_manifest` as they are, there is no
+    need to convert them. Any remaining issues in parsing them (see
+    `manifest_warnings`) are your responsibility to handle using the available
+    tools. Make fixes as needed but report such things later in your final
+    answer.
 
     Your knowledge cutoff may prevent you from knowing what's recent.
     NO MATTER WHAT, always use the todays date: {today_date}
@@ -89,16 +92,38 @@ def get_package_discovery_prompt(
     - MCP tool outputs are often structured (Python dict/list). Use them directly.
     - To send pyproject.toml content to the `resolve_pyproject_toml` tool, you
     will need to use the `upload_file_to_gradio` tool first to upload the file.
+    - To resolve content you wrote or edited (a modified pyproject.toml, a
+    list of requirements), pass it as `manifest_content` to
+    `resolve_pyproject_toml` instead of writing it to a file first.
     - The output of `resolve_pyproject_toml` contains `errored` field which
     indicates (boolean) if there were any errors in resolution.
     If true, check `logs` field for
     details. The `logs` field contains useful information of `uv` stderr output.
+    - When a resolution fails and you need to know which requirements
+    conflict, resolve again with `diagnose` set: `conflict` lists the
+    smallest conflicting set and the closest versions of each that resolve,
+    instead of you trying combinations one by one.
+    - To check a pyproject.toml against several Python versions, platforms or
+    resolution strategies, use `resolve_pyproject_toml_matrix` once with all
+    of them instead of calling `resolve_pyproject_toml` per combination.
+    - When resolving again after editing a pyproject.toml, pass the previous
+    result of `resolve_pyproject_toml` as `previous`: only the changed packages
+    are re-solved and `pin_diff` shows what moved.
+    - For questions like "what depends on numpy", "why is X installed" or
+    "what does this upgrade affect", call `query_dependency_graph` with the
+    resolution result instead of reading the whole `output` yourself.
     - If you need more information about how to write a `pyproject.toml`, use
     the information from PEP621: https://peps.python.org/pep-0621/
     - If you decide to use the `web_search`, you must ONLY rely on the
     official package website, PyPI page, or official GitHub repo.
     - NEVER fabricate data. If you cannot find the info, say so.
     - For parsing version numbers, use the `packaging.version` module.
+    - When several packages need to be looked up, use `pypi_search_batch` or
+    `repo_from_pypi_batch` with all of them in a single call instead of
+    looking them up one at a time.
+    - To compare the dependencies or Python requirements of several versions
+    of one package, use `pypi_version_dependencies` instead of calling
+    `pypi_search_version` for each version.
     - When you have gathered the required info, call `final_answer` with the BEST
     structured object that answers the user query according to the appropriate schema.
     """
@@ -0,0 +1,284 @@
+import asyncio
+import json
+import logging
+import time
+import xmlrpc.client
+from dataclasses import dataclass
+from urllib.parse import urlsplit
+
+import httpx
+
+from src.upgrade_advisor.config import (
+    PYPI_BATCH_CONCURRENCY,
+    PYPI_CHANGE_FEED_ENABLED,
+    PYPI_CHANGE_FEED_INTERVAL,
+    PYPI_CHANGE_FEED_MAX_BACKLOG,
+    PYPI_CHANGE_FEED_MAX_LAG,
+    PYPI_CHANGE_FEED_MAX_PAGES,
+    PYPI_CHANGE_FEED_URL,
+)
+
+from ...misc import run_coro_background
+from .http_client import get_http_client
+from .indexes import PackageIndex, get_index_config
+from .pypi_api import LookupFailedError, fetch_json_document, forget_negative_results
+from .pypi_cache import PyPICache, get_pypi_cache, normalize_name
+from .release_index import get_release_index
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+logger.addHandler(logging.StreamHandler())
+
+
+@dataclass(frozen=True)
+class Change:
+    """A single event of the change feed."""
+
+    name: str
+    version: str | None
+    action: str
+    serial: int
+
+
+class ChangeFeed:
+    """Source of package changes, ordered by serial.
+
+    Subclass it to follow another index, or to replay recorded changes
+    from a local fixture server.
+    """
+
+    async def last_serial(self) -> int:
+        """Return the serial of the most recent change."""
+        raise NotImplementedError
+
+    async def changes_since(self, serial: int) -> list[Change]:
+        """Return the changes with a serial greater than `serial`, oldest first."""
+        raise NotImplementedError
+
+
+class XmlRpcChangeFeed(ChangeFeed):
+    """The PyPI XML-RPC changelog (`changelog_since_serial`).
+
+    Any server implementing `changelog_last_serial` and
+    `changelog_since_serial` works, e.g. a `xmlrpc.server` fixture.
+    """
+
+    def __init__(self, url: str):
+        self.url = url
+
+    async def _call(self, method: str, *params):
+        response = await get_http_client().post(
+            self.url,
+            content=xmlrpc.client.dumps(params, method),
+            headers={"Content-Type": "text/xml"},
+        )
+        response.raise_for_status()
+        (result,), _ = xmlrpc.client.loads(response.content)
+        return result
+
+    async def last_serial(self) -> int:
+        return int(await self._call("changelog_last_serial"))
+
+    async def changes_since(self, serial: int) -> list[Change]:
+        rows = await self._call("changelog_since_serial", serial)
+        # rows are (name, version, timestamp, action, serial)
+        return [
+            Change(name=name, version=version, action=action, serial=int(row_serial))
+            for name, version, _, action, row_serial in rows
+        ]
+
+
+class CacheRefresher:
+    """Keep the cached documents of one index in sync with its change feed.
+
+    Every poll fetches the changes since the last seen serial and only
+    touches the packages that changed: their cached documents are marked
+    stale (or dropped when the project was removed), remembered negative
+    answers are forgotten, and packages still resident in the release index
+    (i.e. recently used) are refetched right away. While polls succeed,
+    the cache serves the other entries of the index without revalidating
+    them on TTL expiry.
+
+    A poll applies at most `max_pages` pages of changes; the rest of a
+    backlog is picked up by the next polls, which then follow right away.
+    The cache is only marked in sync once the feed is caught up.
+
+    The feed position is persisted in the cache, so a restart replays the
+    changes it missed instead of starting over.
+    """
+
+    def __init__(
+        self,
+        feed: ChangeFeed,
+        index: PackageIndex,
+        interval: float = PYPI_CHANGE_FEED_INTERVAL,
+        max_lag: float = PYPI_CHANGE_FEED_MAX_LAG,
+        max_backlog: int = PYPI_CHANGE_FEED_MAX_BACKLOG,
+        max_pages: int = PYPI_CHANGE_FEED_MAX_PAGES,
+        cache: PyPICache | None = None,
+    ):
+        self.feed = feed
+        self.index = index
+        self.interval = interval
+        self.max_lag = max_lag
+        self.max_backlog = max_backlog
+        self.max_pages = max(1, max_pages)
+        self.cache = cache or get_pypi_cache()
+        self.serial: int | None = None
+        self.since: float | None = None
+        # whether the last poll reached the end of the feed
+        self.caught_up = False
+        self._state_name = f"change_feed/{index.namespace}"
+
+    def _load_state(self) -> None:
+        state = self.cache.get_state(self._state_name)
+        if state is not None:
+            state = json.loads(state)
+            self.serial, self.since = state["serial"], state["since"]
+
+    def _save_state(self) -> None:
+        state = json.dumps({"serial": self.serial, "since": self.since})
+        self.cache.set_state(self._state_name, state)
+
+    async def _start_over(self) -> None:
+        """Follow the feed from now on; older entries fall back to the TTL."""
+        self.serial = await self.feed.last_serial()
+        self.since = time.time()
+        logger.info(f"Following the change feed from serial {self.serial}.")
+
+    async def sync_once(self) -> set[str]:
+        """
+        Apply the changes since the last poll.
+
+        Returns:
+            Set[str]: Normalized names of the packages that changed.
+        """
+        if self.serial is None:
+            self._load_state()
+        if self.serial is None:
+            await self._start_over()
+        elif await self.feed.last_serial() - self.serial > self.max_backlog:
+            logger.info("Too far behind the change feed, starting over.")
+            await self._start_over()
+
+        changed: dict[str, list[Change]] = {}
+        self.caught_up = False
+        for _ in range(self.max_pages):
+            changes = await self.feed.changes_since(self.serial)
+            if not changes:
+                self.caught_up = True
+                break
+            for change in changes:
+                changed.setdefault(normalize_name(change.name), []).append(change)
+            self.serial = max(self.serial, max(c.serial for c in changes))
+
+        hot = await self._apply(changed)
+        self._save_state()
+        if self.caught_up:
+            self.cache.mark_synced(
+                self.index.namespace, since=self.since, until=time.time() + self.max_lag
+            )
+        if changed:
+            logger.info(
+                f"Change feed at serial {self.serial}: {len(changed)} changed "
+                f"packages, {len(hot)} refreshed."
+            )
+        return set(changed)
+
+    async def _apply(self, changed: dict[str, list[Change]]) -> set[str]:
+        """Invalidate the cached documents of the changed packages."""
+        namespace = self.index.namespace
+        release_index = get_release_index()
+        # one lookup for the whole batch of changes
+        cached = self.cache.package_entries(namespace, changed)
+        hot = set()
+        for name, changes in changed.items():
+            serial = max(c.serial for c in changes)
+            entries = cached.get(name, [])
+            keys = {f"{namespace}/{name}", f"{namespace}/simple/{name}"}
+            keys.update(entry.key for entry in entries)
+            forget_negative_results(
+                keys | {f"{namespace}/{name}/{c.version}" for c in changes if c.version}
+            )
+            if any(c.action == "remove project" for c in changes):
+                for entry in entries:
+                    self.cache.invalidate(entry.key)
+                release_index.invalidate(keys)
+                continue
+            for entry in entries:
+                if entry.last_serial >= serial:
+                    # already fetched after the change
+                    continue
+                self.cache.mark_stale(entry.key)
+                if entry.key in release_index:
+                    hot.add(name)
+
+        semaphore = asyncio.Semaphore(PYPI_BATCH_CONCURRENCY)
+
+        async def refresh(name: str) -> None:
+            async with semaphore:
+                try:
+                    await fetch_json_document(
+                        f"{self.index.json_url}/{name}/json", name, index=self.index
+                    )
+                except (LookupFailedError, httpx.HTTPError) as e:
+                    logger.info(f"Could not refresh {name}: {e!s}")
+
+        if self.index.json_url:
+            await asyncio.gather(*(refresh(name) for name in hot))
+        return hot
+
+    async def run(self) -> None:
+        """Poll the feed forever, every `interval` seconds, until cancelled."""
+        try:
+            while True:
+                behind = False
+                try:
+                    await self.sync_once()
+                    behind = not self.caught_up
+                except Exception:
+                    # whatever failed, keep polling; the cache falls back to
+                    # TTL revalidation once max_lag passes
+                    logger.exception("Change feed poll failed.")
+                if not behind:
+                    await asyncio.sleep(self.interval)
+        finally:
+            self.cache.clear_synced(self.index.namespace)
+
+
+_refresher_future = None
+
+
+def start_cache_refresher(feed: ChangeFeed | None = None) -> bool:
+    """
+    Start following the change feed of the primary index in the background.
+
+    Args:
+        feed (ChangeFeed, optional): The feed to follow. Defaults to the
+            XML-RPC changelog at `PYPI_CHANGE_FEED_URL`, which is only used
+            when it is served by the primary index itself.
+    Returns:
+        bool: Whether the refresher is running.
+    """
+    global _refresher_future
+    if _refresher_future is not None and not _refresher_future.done():
+        return True
+    index = get_index_config().primary
+    if feed is None:
+        if not PYPI_CHANGE_FEED_ENABLED:
+            return False
+        # another index's feed says nothing about what this index serves
+        if urlsplit(PYPI_CHANGE_FEED_URL).netloc != urlsplit(index.url).netloc:
+            logger.info("Change feed disabled, it does not belong to the index.")
+            return False
+        feed = XmlRpcChangeFeed(PYPI_CHANGE_FEED_URL)
+    _refresher_future = run_coro_background(CacheRefresher(feed, index).run())
+    return True
+
+
+def stop_cache_refresher() -> None:
+    """Stop the background refresher, if running."""
+    global _refresher_future
+    if _refresher_future is not None:
+        _refresher_future.cancel()
+        _refresher_future = None
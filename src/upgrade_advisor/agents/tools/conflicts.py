@@ -0,0 +1,412 @@
+import asyncio
+import logging
+from collections.abc import Sequence
+from typing import Literal
+
+import httpx
+from packaging.requirements import InvalidRequirement, Requirement
+from packaging.specifiers import SpecifierSet
+from packaging.version import InvalidVersion, Version
+
+from src.upgrade_advisor.config import (
+    CONFLICT_BISECT_CONCURRENCY,
+    CONFLICT_BISECT_MAX_RESOLUTIONS,
+)
+from src.upgrade_advisor.const import ALLOWED_OS
+from src.upgrade_advisor.misc import run_coro_sync
+from src.upgrade_advisor.schema import ConflictReportSchema, PinSuggestionSchema
+
+from .manifest import ManifestError
+from .pypi_api import LookupFailedError
+from .pypi_cache import normalize_name
+from .resolver_pool import ResolverPoolFullError, get_resolver_pool
+from .simple_api import fetch_simple_project, group_files_by_version
+from .uv_resolver import read_manifest, resolve_environment_async
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+logger.addHandler(logging.StreamHandler())
+
+
+class _BudgetExceeded(Exception):
+    """The search used up its resolutions."""
+
+
+def _split(items: list[str], n: int) -> list[list[str]]:
+    """Split `items` into `n` chunks of (almost) equal size, in order."""
+    size, extra = divmod(len(items), n)
+    chunks, start = [], 0
+    for i in range(n):
+        end = start + size + (i < extra)
+        chunks.append(items[start:end])
+        start = end
+    return chunks
+
+
+def _with_specifier(requirement: Requirement, specifier: str) -> str:
+    """The requirement (extras and marker included) with another specifier."""
+    changed = Requirement(str(requirement))
+    changed.specifier = SpecifierSet(specifier)
+    return str(changed)
+
+
+def _clause_versions(requirement: Requirement) -> list[Version]:
+    """The versions named by the clauses of a requirement."""
+    versions = []
+    for clause in requirement.specifier:
+        try:
+            versions.append(Version(clause.version.rstrip(".*")))
+        except InvalidVersion:
+            continue
+    return versions
+
+
+def _bounds(requirement: Requirement, versions: list[Version]) -> list[Version]:
+    """Versions bounding what the requirement asks for."""
+    allowed = [v for v in versions if requirement.specifier.contains(v)]
+    if allowed:
+        return [min(allowed), max(allowed)]
+    # nothing released matches, bound by the versions the clauses name
+    named = _clause_versions(requirement)
+    return [min(named), max(named)] if named else []
+
+
+async def release_versions(package: str, prereleases: bool = False) -> list[Version]:
+    """
+    The versions of a package on the index, oldest first.
+
+    Args:
+        package (str): Name of the package.
+        prereleases (bool): Include pre-releases.
+    Returns:
+        List[Version]: Versions with at least one file that is not yanked.
+    Raises:
+        LookupFailedError: If no index knows the package.
+        httpx.HTTPError: If the request fails.
+    """
+    project, _ = await fetch_simple_project(package)
+    versions = set()
+    for version, files in group_files_by_version(project).items():
+        if all(file.get("yanked") for file in files):
+            continue
+        try:
+            parsed = Version(version)
+        except InvalidVersion:
+            continue
+        if prereleases or not parsed.is_prerelease:
+            versions.add(parsed)
+    return sorted(versions)
+
+
+class ConflictSearch:
+    """Delta debugging (ddmin) over the direct requirements of a manifest.
+
+    Each step resolves all the chunks of the current candidate and their
+    complements at once, bounded by `concurrency`, on the resolver pool when
+    it runs. A subset is resolved at most once per search, and successful
+    resolutions are kept by the resolution cache, so diagnosing the same
+    manifest again mostly hits it. The constraints and overrides of the
+    manifest apply to every candidate.
+    """
+
+    def __init__(
+        self,
+        settings: dict,
+        constraints: Sequence[str] = (),
+        overrides: Sequence[str] = (),
+        concurrency: int = CONFLICT_BISECT_CONCURRENCY,
+        max_resolutions: int = CONFLICT_BISECT_MAX_RESOLUTIONS,
+    ):
+        # resolution parameters shared by all candidates
+        self.settings = dict(
+            settings, constraints=list(constraints), overrides=list(overrides)
+        )
+        self.concurrency = max(1, concurrency)
+        self.max_resolutions = max_resolutions
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._results: dict[frozenset[str], asyncio.Future[dict]] = {}
+
+    @property
+    def resolutions(self) -> int:
+        return len(self._results)
+
+    def _reserve(self, candidates: Sequence[Sequence[str]]) -> None:
+        """Fail before starting a batch the budget cannot cover in full."""
+        new = {frozenset(c) for c in candidates} - set(self._results)
+        if self.resolutions + len(new) > self.max_resolutions:
+            raise _BudgetExceeded()
+
+    async def resolve(self, requirements: Sequence[str]) -> dict:
+        """Resolve a set of requirements, once per search."""
+        key = frozenset(requirements)
+        if key not in self._results:
+            self._reserve([requirements])
+            self._results[key] = asyncio.ensure_future(self._run(sorted(key)))
+        return await self._results[key]
+
+    async def _run(self, requirements: list[str]) -> dict:
+        kwargs = dict(self.settings, dependencies=requirements)
+        async with self._semaphore:
+            pool = get_resolver_pool()
+            if pool is not None:
+                try:
+                    return await pool.resolve(**kwargs)
+                except ResolverPoolFullError:
+                    # busy with other sessions, resolve in this process
+                    pass
+            return await resolve_environment_async(**kwargs)
+
+    async def _fails(self, candidates: list[list[str]]) -> list[bool]:
+        self._reserve(candidates)
+        results = await asyncio.gather(*(self.resolve(c) for c in candidates))
+        return [result["errored"] for result in results]
+
+    async def minimize(self, requirements: list[str]) -> tuple[list[str], bool]:
+        """
+        Shrink a failing set of requirements to a minimal failing one.
+
+        Args:
+            requirements (List[str]): Requirements failing to resolve.
+        Returns:
+            Tuple[List[str], bool]: The smallest failing subset found, and
+                whether it is minimal (dropping any requirement makes it
+                resolve); False when the budget ran out first.
+        """
+        items, n = list(requirements), 2
+        try:
+            while len(items) >= 2:
+                n = min(n, len(items))
+                chunks = _split(items, n)
+                # with two chunks the complements are the chunks themselves
+                complements = (
+                    [[r for r in items if r not in chunk] for chunk in chunks]
+                    if n > 2
+                    else []
+                )
+                failed = await self._fails(chunks + complements)
+                if any(failed[:n]):
+                    items, n = chunks[failed.index(True)], 2
+                elif any(failed[n:]):
+                    items, n = complements[failed.index(True, n) - n], max(n - 1, 2)
+                elif n >= len(items):
+                    break
+                else:
+                    n = min(2 * n, len(items))
+        except _BudgetExceeded:
+            return items, False
+        return items, True
+
+    async def _resolved_version(
+        self, requirements: list[str], name: str
+    ) -> Version | None:
+        result = await self.resolve(requirements)
+        if result["errored"]:
+            return None
+        dep = result["output"]["deps"].get(name)
+        try:
+            return Version(dep["version"]) if dep else None
+        except InvalidVersion:
+            return None
+
+    async def _closest_higher(
+        self,
+        requirement: Requirement,
+        name: str,
+        others: list[str],
+        upper: Version,
+        versions: list[Version] | None,
+    ) -> Version | None:
+        # the newest version above resolving with the others, then the
+        # oldest one up to it, assuming the versions resolving with the
+        # others form a range there
+        newest = await self._resolved_version(
+            others + [_with_specifier(requirement, f">{upper}")], name
+        )
+        if newest is None or not versions:
+            return newest
+        window = [v for v in versions if upper < v <= newest]
+        if not window:
+            return newest
+        # window[hi] resolves; probe evenly spaced versions below it at once
+        lo, hi = 0, len(window) - 1
+        while lo < hi:
+            count = min(self.concurrency, hi - lo)
+            probes = sorted({lo + (hi - lo) * i // count for i in range(count)})
+            try:
+                failed = await self._fails(
+                    [
+                        others + [_with_specifier(requirement, f"=={window[p]}")]
+                        for p in probes
+                    ]
+                )
+            except _BudgetExceeded:
+                # the closest found so far
+                break
+            resolving = [p for p, f in zip(probes, failed) if not f]
+            hi = resolving[0] if resolving else hi
+            below = [p for p, f in zip(probes, failed) if f and p < hi]
+            lo = max(below) + 1 if below else lo
+        return window[hi]
+
+    async def closest_versions(
+        self, requirement: str, others: list[str]
+    ) -> PinSuggestionSchema:
+        """
+        Find the versions closest to a conflicting requirement that resolve
+        with the other requirements of the conflict.
+
+        Below, uv finds the newest resolvable version itself. Above, the
+        newest resolvable version bounds a search over the releases in
+        between, probing `concurrency` versions at a time.
+
+        Args:
+            requirement (str): The conflicting requirement.
+            others (List[str]): The rest of the conflict, kept as is.
+        Returns:
+            PinSuggestionSchema: The closest lower and higher versions, None
+                where there is none (or the budget ran out).
+        """
+        try:
+            parsed = Requirement(requirement)
+        except InvalidRequirement:
+            return PinSuggestionSchema(requirement=requirement, package=requirement)
+        name = normalize_name(parsed.name)
+        suggestion = PinSuggestionSchema(requirement=requirement, package=name)
+        if parsed.url or not parsed.specifier:
+            return suggestion
+
+        prereleases = any(v.is_prerelease for v in _clause_versions(parsed))
+        try:
+            versions = await release_versions(name, prereleases)
+        except (LookupFailedError, httpx.HTTPError) as e:
+            # uv can still tell the nearest versions, only not refine them
+            logger.info(f"Could not list the versions of {name}: {e!s}")
+            versions = None
+        bounds = _bounds(parsed, versions or [])
+        if not bounds:
+            return suggestion
+        lower, upper = bounds
+
+        async def guarded(search) -> Version | None:
+            try:
+                return await search
+            except _BudgetExceeded:
+                return None
+
+        below, above = await asyncio.gather(
+            guarded(
+                self._resolved_version(
+                    others + [_with_specifier(parsed, f"<{lower}")], name
+                )
+            ),
+            guarded(self._closest_higher(parsed, name, others, upper, versions)),
+        )
+        suggestion.lower = str(below) if below else None
+        suggestion.higher = str(above) if above else None
+        return suggestion
+
+
+async def diagnose_conflict_async(
+    toml_file: str | None = None,
+    resolution_strategy: Literal["lowest-direct", "lowest", "highest"] = "highest",
+    python_platform: Literal[ALLOWED_OS] = "linux",
+    python_version: str = "3.10",
+    universal: bool = False,
+    exclude_newer: str | None = None,
+    content: str | bytes | None = None,
+    manifest_format: Literal["pyproject", "requirements"] = "pyproject",
+    dependencies: list[str] | None = None,
+    concurrency: int = CONFLICT_BISECT_CONCURRENCY,
+    max_resolutions: int = CONFLICT_BISECT_MAX_RESOLUTIONS,
+) -> dict:
+    """
+    Find which direct requirements of a manifest conflict, and the closest
+    versions that would resolve.
+
+    The requirements are bisected (delta debugging) down to a minimal set
+    that fails to resolve on its own, then each requirement of that set is
+    searched for the closest lower and higher versions resolving with the
+    rest of the set. All resolutions use the given parameters, and at most
+    `max_resolutions` are run.
+
+    Args:
+        toml_file (str, optional): Path to the pyproject.toml or
+            requirements file.
+        resolution_strategy (str): Resolution strategy to use. One of 'lowest-direct', 'lowest', 'highest'.
+        python_platform (str): Target Python platform.
+        python_version (str): Target Python version. E.g., '3.10'.
+        universal (bool): Resolve for all platforms.
+        exclude_newer (str, optional): Snapshot to resolve at.
+        content (str, optional): Content of the manifest, instead of
+            `toml_file`.
+        manifest_format (str): Format of `content`, 'pyproject' or
+            'requirements'.
+        dependencies (List[str], optional): PEP 508 requirements, instead of
+            a manifest.
+        concurrency (int): Resolutions run at once.
+        max_resolutions (int): Resolutions run at most.
+    Returns:
+        dict: The diagnosis following ConflictReportSchema.
+    """
+    if [toml_file, content, dependencies].count(None) != 2:
+        return ConflictReportSchema(
+            resolvable=False,
+            error="Give exactly one of toml_file, content or dependencies.",
+        ).model_dump()
+    try:
+        manifest, _ = read_manifest(toml_file, content, manifest_format, dependencies)
+    except (ManifestError, OSError) as e:
+        return ConflictReportSchema(resolvable=False, error=str(e)).model_dump()
+    if manifest.requirements is None:
+        return ConflictReportSchema(
+            resolvable=False,
+            error="The dependencies of the project are dynamic, they cannot be "
+            "bisected without building it.",
+        ).model_dump()
+
+    requirements = manifest.requirements.splitlines()
+    search = ConflictSearch(
+        {
+            "resolution_strategy": resolution_strategy,
+            "python_platform": python_platform,
+            "python_version": python_version,
+            "universal": universal,
+            "exclude_newer": exclude_newer,
+        },
+        constraints=manifest.constraints.splitlines(),
+        overrides=manifest.overrides.splitlines(),
+        concurrency=concurrency,
+        max_resolutions=max(max_resolutions, 2),
+    )
+    full, empty = await asyncio.gather(search.resolve(requirements), search.resolve([]))
+    if not full["errored"]:
+        return ConflictReportSchema(
+            resolvable=True, resolutions=search.resolutions
+        ).model_dump()
+    if empty["errored"]:
+        # the parameters, constraints or overrides fail by themselves
+        return ConflictReportSchema(
+            resolvable=False,
+            logs=empty["logs"],
+            resolutions=search.resolutions,
+            error="Resolution fails without any requirement, see the logs.",
+        ).model_dump()
+
+    conflict, minimal = await search.minimize(requirements)
+    logger.info(f"Conflicting requirements: {conflict}")
+    suggestions = await asyncio.gather(
+        *(search.closest_versions(r, [o for o in conflict if o != r]) for r in conflict)
+    )
+    return ConflictReportSchema(
+        resolvable=False,
+        conflict=conflict,
+        minimal=minimal,
+        suggestions=list(suggestions),
+        logs=(await search.resolve(conflict))["logs"],
+        resolutions=search.resolutions,
+    ).model_dump()
+
+
+def diagnose_conflict(**kwargs) -> dict:
+    """Synchronous wrapper of `diagnose_conflict_async`."""
+    return run_coro_sync(diagnose_conflict_async(**kwargs))
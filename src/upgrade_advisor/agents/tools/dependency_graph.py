@@ -0,0 +1,334 @@
+import itertools
+import logging
+import os
+import re
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, field
+
+from .pypi_cache import normalize_name
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+logger.addHandler(logging.StreamHandler())
+
+# a pinned package in `uv pip compile` output, e.g.
+#   pygments==2.21.0 ; sys_platform == 'linux'  # via rich
+#   foo @ git+https://github.com/org/foo@1a2b3c
+_PACKAGE_LINE = re.compile(
+    r"(?P<name>[A-Za-z0-9][A-Za-z0-9._-]*)(?:\[[^\]]*\])?\s*"
+    r"(?:==\s*(?P<version>[^\s;#]+)|@\s*(?P<url>[^\s;]+))"
+    r"(?:\s*;(?P<marker>[^#]*))?"
+    r"(?:\s*#\s*via\s*(?P<via>.*))?"
+)
+# requirement files in `via` annotations: -r, -c, --override
+_SOURCE_FILE = re.compile(r"(-r|-c|--override)\s+(.+)")
+
+
+@dataclass
+class ResolvedPackage:
+    """A package pinned by a resolution."""
+
+    name: str
+    version: str
+    # environment marker limiting where it is installed ('' for everywhere)
+    marker: str = ""
+    # direct reference, for packages not pinned by version
+    url: str | None = None
+    # what requires this entry (uv's `via`), packages and manifest sources
+    via: list[str] = field(default_factory=list)
+
+
+def _via_entry(entry: str) -> str:
+    """Drop the (temporary) directory of the requirement files uv points to."""
+    match = _SOURCE_FILE.fullmatch(entry)
+    if match is None or match.group(2) == "-":
+        return entry
+    return f"{match.group(1)} {os.path.basename(match.group(2))}"
+
+
+class DependencyGraph:
+    """The packages of a resolution and the requirements between them.
+
+    Both directions are indexed: `dependencies[a]` holds the packages `a`
+    requires and `dependents[a]` the ones requiring `a` (uv's `via`), so
+    "what does X pull in" and "why is X installed" are dict lookups.
+    A `via` entry that is not a resolved package is a source of the
+    manifest itself (`-r -`, `-c constraints.txt`, the project), and what
+    it requires is a direct dependency.
+
+    A universal resolution can pin a package differently per environment:
+    `variants[a]` keeps one entry per marker, in output order, and
+    `packages[a]` is the first of them. Requirement edges are between
+    names.
+
+    Transitive queries walk the indexes breadth first and are memoized
+    until the graph changes.
+    """
+
+    def __init__(self):
+        self.packages: dict[str, ResolvedPackage] = {}
+        self.variants: dict[str, list[ResolvedPackage]] = {}
+        self.dependencies: dict[str, set[str]] = {}
+        # insertion ordered (dict keys), as uv lists them
+        self.dependents: dict[str, dict[str, None]] = {}
+        self._closures: dict[tuple[str, tuple[str, ...]], dict[str, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self.packages)
+
+    def __contains__(self, name: str) -> bool:
+        return normalize_name(name) in self.packages
+
+    def add(self, package: ResolvedPackage, via: Iterable[str] = ()) -> None:
+        """
+        Add a package entry and the requirements it was pulled in by.
+
+        An entry replaces the one of the same package and marker, if any.
+        """
+        variants = self.variants.setdefault(package.name, [])
+        for i, known in enumerate(variants):
+            if known.marker == package.marker:
+                variants[i] = package
+                break
+        else:
+            variants.append(package)
+        self.packages[package.name] = variants[0]
+        self.dependents.setdefault(package.name, {})
+        if self._closures:
+            self._closures.clear()
+        for dependent in via:
+            self.add_via(package, dependent)
+
+    def add_via(self, package: ResolvedPackage, dependent: str) -> None:
+        """Record that `dependent` requires one entry of a package."""
+        if dependent not in package.via:
+            package.via.append(dependent)
+        self._link(package.name, dependent)
+
+    def add_dependent(self, name: str, dependent: str) -> None:
+        """Record that `dependent` (a package or source) requires `name`."""
+        for package in self.variants.get(name, ()):
+            if dependent not in package.via:
+                package.via.append(dependent)
+        self._link(name, dependent)
+
+    def _link(self, name: str, dependent: str) -> None:
+        self.dependents.setdefault(name, {})[dependent] = None
+        self.dependencies.setdefault(dependent, set()).add(name)
+        if self._closures:
+            self._closures.clear()
+
+    def requires(self, name: str) -> set[str]:
+        """Packages `name` requires directly."""
+        return self.dependencies.get(normalize_name(name), set())
+
+    def required_by(self, name: str) -> list[str]:
+        """Packages (and manifest sources) requiring `name` directly."""
+        return list(self.dependents.get(normalize_name(name), ()))
+
+    def is_direct(self, name: str) -> bool:
+        """Whether `name` is required by the manifest rather than a package."""
+        dependents = self.dependents.get(normalize_name(name))
+        if dependents is None:
+            return False
+        # requirements read from stdin carry no annotation at all
+        return not dependents or any(d not in self.packages for d in dependents)
+
+    def direct(self) -> list[str]:
+        """The direct dependencies, in output order."""
+        return [name for name in self.packages if self.is_direct(name)]
+
+    def pins(self) -> dict[str, str]:
+        """Map package name to pinned version (of its first entry)."""
+        return {name: package.version for name, package in self.packages.items()}
+
+    def _closure(self, kind: str, names: Iterable[str]) -> dict[str, int]:
+        """Packages reachable from `names` along one index, by distance."""
+        starts = tuple(sorted({normalize_name(name) for name in names}))
+        key = (kind, starts)
+        if key in self._closures:
+            return dict(self._closures[key])
+        edges = self.dependents if kind == "dependents" else self.dependencies
+        distances: dict[str, int] = {}
+        seen = set(starts)
+        frontier = list(starts)
+        for distance in itertools.count(1):
+            if not frontier:
+                break
+            next_frontier = []
+            for node in frontier:
+                for neighbor in edges.get(node, ()):
+                    # sources are not packages, the walk stops there
+                    if neighbor in seen or neighbor not in self.packages:
+                        continue
+                    seen.add(neighbor)
+                    distances[neighbor] = distance
+                    next_frontier.append(neighbor)
+            frontier = next_frontier
+        self._closures[key] = distances
+        return dict(distances)
+
+    def transitive_dependents(self, *names: str) -> dict[str, int]:
+        """
+        Packages requiring any of `names`, directly or not.
+
+        Args:
+            *names (str): The packages, e.g. the ones getting a new version.
+        Returns:
+            Dict[str, int]: Each dependent and its distance in requirement
+                edges from the nearest of `names`.
+        """
+        return self._closure("dependents", names)
+
+    def transitive_dependencies(self, *names: str) -> dict[str, int]:
+        """
+        Packages required by any of `names`, directly or not.
+
+        Args:
+            *names (str): The packages.
+        Returns:
+            Dict[str, int]: Each dependency and its distance in requirement
+                edges from the nearest of `names`.
+        """
+        return self._closure("dependencies", names)
+
+    def why(self, name: str, max_paths: int = 5) -> list[list[str]]:
+        """
+        Shortest requirement chains from the manifest to a package.
+
+        Args:
+            name (str): The package.
+            max_paths (int): Chains returned at most; there can be many of
+                the same length.
+        Returns:
+            List[List[str]]: Chains from a direct dependency to `name`, e.g.
+                [['gradio', 'pandas', 'numpy']]. Empty if not resolved.
+        """
+        target = normalize_name(name)
+        if target not in self.packages:
+            return []
+        if self.is_direct(target):
+            return [[target]]
+        # walk up the dependents level by level, remembering all the ways
+        # back down, until a level reaches direct dependencies
+        children: dict[str, list[str]] = {target: []}
+        frontier = [target]
+        found: list[str] = []
+        while frontier and not found:
+            level: dict[str, list[str]] = {}
+            for node in frontier:
+                for dependent in self.dependents.get(node, ()):
+                    if dependent in self.packages and dependent not in children:
+                        level.setdefault(dependent, []).append(node)
+            children.update(level)
+            found = [node for node in level if self.is_direct(node)]
+            frontier = list(level)
+
+        def chains(node: str) -> Iterator[list[str]]:
+            if node == target:
+                yield [target]
+            for child in children[node]:
+                for chain in chains(child):
+                    yield [node] + chain
+
+        paths = (chain for node in found for chain in chains(node))
+        return list(itertools.islice(paths, max_paths))
+
+    def to_output(self) -> dict:
+        """
+        The graph as a ResolveResult dump: one entry per package and
+        marker, keyed by name, and by `name ; marker` for the other entries
+        of a package pinned per environment.
+        """
+        deps = {}
+        for name, variants in self.variants.items():
+            for i, package in enumerate(variants):
+                deps[name if i == 0 else f"{name} ; {package.marker}"] = {
+                    "name": name,
+                    "version": package.version,
+                    "via": list(package.via),
+                    "metainfo": package.marker,
+                }
+        return {"deps": deps}
+
+    @classmethod
+    def from_output(cls, output: dict) -> "DependencyGraph":
+        """Rebuild the graph of a ResolveResult dump, e.g. a cached result."""
+        graph = cls()
+        for dep in output.get("deps", {}).values():
+            if not dep.get("name"):
+                continue
+            package = ResolvedPackage(
+                name=normalize_name(dep["name"]),
+                version=dep.get("version", ""),
+                marker=dep.get("metainfo") or "",
+            )
+            graph.add(package, (_via_entry(v) for v in dep.get("via", [])))
+        return graph
+
+
+class CompileOutputParser:
+    """Incremental parser of `uv pip compile` output (its stdout).
+
+    Lines can be fed as uv writes them. Both annotation styles are read:
+    `--annotation-style line` (one line per package, which the resolver
+    asks for) and the default split style with `# via` comment blocks.
+    Anything else, e.g. the header, is skipped.
+    """
+
+    def __init__(self):
+        self.graph = DependencyGraph()
+        # the entry annotated by the following `# via` lines (split style)
+        self._current: ResolvedPackage | None = None
+
+    def feed(self, line: str) -> None:
+        if not line.strip():
+            return
+        if line[0].isspace():
+            self._feed_annotation(line.strip())
+            return
+        self._current = None
+        match = _PACKAGE_LINE.match(line)
+        if match is None:
+            return
+        name = normalize_name(match.group("name"))
+        package = ResolvedPackage(
+            name=name,
+            version=match.group("version") or "",
+            marker=(match.group("marker") or "").strip(),
+            url=match.group("url"),
+        )
+        via = match.group("via")
+        self.graph.add(
+            package, (_via_entry(v.strip()) for v in via.split(",")) if via else ()
+        )
+        self._current = package
+
+    def _feed_annotation(self, text: str) -> None:
+        if self._current is None or not text.startswith("#"):
+            # e.g. `--hash` lines
+            return
+        text = text.lstrip("#").strip()
+        if text == "via" or text.startswith("via "):
+            text = text[3:].strip()
+        if text:
+            self.graph.add_via(self._current, _via_entry(text))
+
+    def feed_all(self, output: str) -> "DependencyGraph":
+        for line in output.splitlines():
+            self.feed(line)
+        return self.graph
+
+
+def parse_compile_output(output: str) -> DependencyGraph:
+    """
+    Parse the output of `uv pip compile` into a dependency graph.
+
+    Args:
+        output (str): The output, in either annotation style.
+    Returns:
+        DependencyGraph: The pinned packages and their requirements.
+    """
+    graph = CompileOutputParser().feed_all(output)
+    logger.debug(f"Parsed {len(graph)} resolved dependencies.")
+    return graph
@@ -0,0 +1,171 @@
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+
+from src.upgrade_advisor.config import DEPENDENCY_GRAPH_CACHE_ENTRIES
+from src.upgrade_advisor.schema import (
+    DependencyNodeSchema,
+    DependencyQuerySchema,
+    ErrorResponseSchema,
+)
+
+from .dependency_graph import DependencyGraph
+from .parse_response import diff_pins
+from .pypi_cache import normalize_name
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+logger.addHandler(logging.StreamHandler())
+
+QUERIES = ("dependents", "dependencies", "why", "blast_radius")
+
+_graphs: "OrderedDict[str, DependencyGraph]" = OrderedDict()
+_graphs_lock = threading.Lock()
+
+
+def _output_of(resolution: dict) -> dict:
+    """The ResolveResult dump of a resolution result (or the dump itself)."""
+    output = resolution.get("output", resolution)
+    if not isinstance(output, dict) or not isinstance(output.get("deps"), dict):
+        raise TypeError("Expected a resolution result or its `output`.")
+    return output
+
+
+def resolution_key(resolution: dict) -> str:
+    """
+    Identify a resolution by a digest of its output (pins and edges).
+
+    The `resolution_id` of a result is not used: it comes back from the
+    caller, and a graph must never be reused for different pins.
+    """
+    encoded = json.dumps(_output_of(resolution), sort_keys=True)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def remember_graph(key: str, graph: DependencyGraph) -> None:
+    """Keep the graph of a resolution for later queries."""
+    with _graphs_lock:
+        _graphs[key] = graph
+        _graphs.move_to_end(key)
+        while len(_graphs) > DEPENDENCY_GRAPH_CACHE_ENTRIES:
+            _graphs.popitem(last=False)
+
+
+def get_dependency_graph(resolution: dict) -> DependencyGraph:
+    """
+    Return the dependency graph of a resolution, built once per resolution.
+
+    Args:
+        resolution (dict): A result of `resolve_environment`, or its
+            `output` (a ResolveResult dump).
+    Returns:
+        DependencyGraph: The graph, shared by all queries on the resolution.
+    Raises:
+        TypeError: If `resolution` is not a resolution result.
+    """
+    key = resolution_key(resolution)
+    with _graphs_lock:
+        graph = _graphs.get(key)
+        if graph is not None:
+            _graphs.move_to_end(key)
+            return graph
+    graph = DependencyGraph.from_output(_output_of(resolution))
+    remember_graph(key, graph)
+    return graph
+
+
+def _nodes(graph: DependencyGraph, distances: dict[str, int]) -> list:
+    return [
+        DependencyNodeSchema(
+            name=name,
+            version=graph.packages[name].version,
+            distance=distance,
+            direct=graph.is_direct(name),
+            marker=graph.packages[name].marker,
+        )
+        for name, distance in sorted(distances.items(), key=lambda i: (i[1], i[0]))
+    ]
+
+
+def query_dependency_graph(
+    resolution: dict,
+    query: str,
+    package: str | None = None,
+    other: dict | None = None,
+    max_paths: int = 5,
+) -> dict:
+    """
+    Answer a question about the dependency graph of a resolution.
+
+    Queries:
+        - 'dependents': packages requiring `package`, directly or not, i.e.
+          what may break when it changes.
+        - 'dependencies': packages `package` pulls in, directly or not.
+        - 'why': shortest requirement chains from the manifest to `package`.
+        - 'blast_radius': packages whose pins differ between `resolution`
+          and `other` (distance 0), and the packages depending on them.
+
+    Args:
+        resolution (dict): A result of `resolve_environment`, or its `output`.
+        query (str): One of QUERIES.
+        package (str, optional): The package, required by all queries but
+            'blast_radius'.
+        other (dict, optional): The resolution to compare with, for
+            'blast_radius'.
+        max_paths (int): Chains returned by 'why' at most.
+    Returns:
+        dict: The answer following DependencyQuerySchema, or an
+            ErrorResponseSchema dump.
+    """
+    if query not in QUERIES:
+        return ErrorResponseSchema(
+            error=f"Invalid query: {query}. Must be one of {QUERIES}."
+        ).model_dump()
+    try:
+        graph = get_dependency_graph(resolution)
+        other_graph = get_dependency_graph(other) if other else None
+    except TypeError as e:
+        return ErrorResponseSchema(error=str(e)).model_dump()
+
+    answer = DependencyQuerySchema(query=query, package=package)
+    if query == "blast_radius":
+        if other_graph is None:
+            return ErrorResponseSchema(
+                error="'blast_radius' needs the `other` resolution to compare with."
+            ).model_dump()
+        answer.pin_diff = diff_pins(graph.pins(), other_graph.pins())
+        changed = set(answer.pin_diff.changed) | set(answer.pin_diff.added)
+        removed = set(answer.pin_diff.removed)
+        # what depends on a package now, and on a removed one before
+        distances = other_graph.transitive_dependents(*changed)
+        distances.update({name: 0 for name in changed})
+        answer.packages = _nodes(other_graph, distances)
+        answer.packages += _nodes(
+            graph,
+            {
+                name: distance
+                for name, distance in graph.transitive_dependents(*removed).items()
+                if name not in distances
+            }
+            | {name: 0 for name in removed},
+        )
+        answer.packages.sort(key=lambda node: (node.distance, node.name))
+        return answer.model_dump()
+
+    if not package:
+        return ErrorResponseSchema(
+            error=f"The '{query}' query needs a package."
+        ).model_dump()
+    if package not in graph:
+        return ErrorResponseSchema(
+            error=f"{normalize_name(package)} is not part of the resolution."
+        ).model_dump()
+    if query == "dependents":
+        answer.packages = _nodes(graph, graph.transitive_dependents(package))
+    elif query == "dependencies":
+        answer.packages = _nodes(graph, graph.transitive_dependencies(package))
+    else:
+        answer.paths = graph.why(package, max_paths=max_paths)
+    return answer.model_dump()
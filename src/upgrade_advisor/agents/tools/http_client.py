@@ -0,0 +1,97 @@
+import asyncio
+import logging
+import weakref
+
+import httpx
+
+from src.upgrade_advisor.config import (
+    HTTP2_ENABLED,
+    HTTP_KEEPALIVE_EXPIRY,
+    HTTP_MAX_CONNECTIONS,
+    HTTP_MAX_KEEPALIVE_CONNECTIONS,
+    HTTP_TIMEOUT,
+)
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+logger.addHandler(logging.StreamHandler())
+
+USER_AGENT = "upgrade-advisor (+https://github.com/thatgeeman/upgrade-advisor)"
+
+# httpx clients are bound to the event loop they were first used on, so we
+# keep the pooled clients per loop, one per package index (plus one for
+# everything else). In practice all tool calls are dispatched to the single
+# background loop in `run_coro_sync`.
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[str, httpx.AsyncClient]]" = weakref.WeakKeyDictionary()
+DEFAULT_POOL = "default"
+
+
+def http2_available() -> bool:
+    """Check if the optional `h2` package needed for HTTP/2 is installed."""
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def build_http_client(**kwargs) -> httpx.AsyncClient:
+    """Create a new async client with keep-alive pooling and the configured limits.
+
+    Args:
+        **kwargs: Extra keyword arguments forwarded to `httpx.AsyncClient`.
+    Returns:
+        httpx.AsyncClient: A new client. The caller owns it and must close it.
+    """
+    limits = httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+    )
+    http2 = HTTP2_ENABLED and http2_available()
+    options = {
+        "limits": limits,
+        "timeout": httpx.Timeout(HTTP_TIMEOUT),
+        "http2": http2,
+        "follow_redirects": True,
+        "headers": {"User-Agent": USER_AGENT},
+    }
+    options.update(kwargs)
+    return httpx.AsyncClient(**options)
+
+
+def get_http_client(pool: str | None = None) -> httpx.AsyncClient:
+    """Return the shared async client for the running event loop.
+
+    The client is created lazily on first use and reused by every lookup
+    on the same loop, so TCP/TLS connections are kept alive between calls.
+
+    Args:
+        pool (str, optional): Name of the connection pool, e.g. the name of
+            a package index so every index gets its own pool. Defaults to
+            the general purpose pool.
+    """
+    pool = pool or DEFAULT_POOL
+    loop = asyncio.get_running_loop()
+    clients = _clients.setdefault(loop, {})
+    client = clients.get(pool)
+    if client is None or client.is_closed:
+        client = build_http_client()
+        clients[pool] = client
+        logger.info(
+            f"Created shared HTTP client for pool '{pool}' "
+            f"(http2={HTTP2_ENABLED and http2_available()}, "
+            f"max_connections={HTTP_MAX_CONNECTIONS})."
+        )
+    return client
+
+
+async def aclose_http_client() -> None:
+    """Close the shared clients of the running event loop, if any."""
+    loop = asyncio.get_running_loop()
+    clients = _clients.pop(loop, {})
+    for client in clients.values():
+        if not client.is_closed:
+            await client.aclose()
+    if clients:
+        logger.info("Closed shared HTTP clients.")
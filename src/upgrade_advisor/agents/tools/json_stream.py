@@ -0,0 +1,134 @@
+import codecs
+import json
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from typing import Any
+
+CHUNK_SIZE = 64 * 1024
+_WHITESPACE = " \t\n\r"
+_decoder = json.JSONDecoder()
+
+
+def iter_file_chunks(path: Path, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """Yield the contents of a file in fixed-size byte chunks."""
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            yield chunk
+
+
+class _StreamBuffer:
+    """A sliding text window over a stream of utf-8 encoded byte chunks.
+
+    Only the part of the document that is still being decoded is kept in
+    memory; consumed text is dropped as the window moves forward.
+    """
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _read(self, min_chars: int = 1) -> bool:
+        """Append at least `min_chars` characters to the window, False at EOF."""
+        if self.eof:
+            return False
+        if self.pos > CHUNK_SIZE:
+            self.buf = self.buf[self.pos :]
+            self.pos = 0
+        added = 0
+        parts = [self.buf]
+        while added < min_chars:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                parts.append(self._utf8.decode(b"", final=True))
+                self.eof = True
+                break
+            text = self._utf8.decode(chunk)
+            parts.append(text)
+            added += len(text)
+        self.buf = "".join(parts)
+        return added > 0
+
+    def peek(self) -> str:
+        """Return the next non-whitespace character without consuming it."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._read():
+                raise ValueError("Unexpected end of JSON document.")
+
+    def expect(self, char: str) -> None:
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected '{char}' at offset {self.pos}, got '{found}'.")
+        self.pos += 1
+
+    def skip(self, char: str) -> bool:
+        """Consume `char` if it is the next token."""
+        if self.peek() == char:
+            self.pos += 1
+            return True
+        return False
+
+    def value(self) -> Any:
+        """Decode the next complete JSON value from the stream."""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                # incomplete value: at least double the pending text before
+                # retrying so large values are not re-scanned chunk by chunk
+                if not self._read(max(CHUNK_SIZE, len(self.buf) - self.pos)):
+                    raise
+                continue
+            # a number may continue in the next chunk
+            if end == len(self.buf) and not self.eof and self._read():
+                continue
+            self.pos = end
+            return value
+
+
+def iter_pypi_document(
+    chunks: Iterable[bytes], stream_keys: tuple[str, ...] = ("releases",)
+) -> Iterator[tuple[str, Any]]:
+    """
+    Incrementally walk a PyPI JSON API document.
+
+    Top-level members are yielded as `(key, value)` pairs. Members listed in
+    `stream_keys` (objects such as `releases`) are not materialized; each of
+    their entries is yielded as `(key, (name, value))` instead, so the caller
+    decides what to keep and the memory needed stays bounded by the largest
+    single entry.
+
+    Args:
+        chunks (Iterable[bytes]): The raw document as utf-8 byte chunks.
+        stream_keys (Tuple[str, ...]): Top-level object members to stream entry by entry.
+    Yields:
+        Tuple[str, Any]: Top-level key and its (partial) value.
+    """
+    stream = _StreamBuffer(chunks)
+    stream.expect("{")
+    if stream.skip("}"):
+        return
+    while True:
+        key = stream.value()
+        stream.expect(":")
+        if key in stream_keys and stream.skip("{"):
+            if not stream.skip("}"):
+                while True:
+                    name = stream.value()
+                    stream.expect(":")
+                    yield key, (name, stream.value())
+                    if not stream.skip(","):
+                        stream.expect("}")
+                        break
+        else:
+            yield key, stream.value()
+        if not stream.skip(","):
+            stream.expect("}")
+            break
@@ -0,0 +1,746 @@
+import json
+import logging
+import os
+import re
+import shlex
+from collections.abc import Iterable
+from functools import lru_cache
+from pathlib import Path
+from typing import NamedTuple
+
+from packaging.requirements import InvalidRequirement, Requirement
+from packaging.specifiers import InvalidSpecifier, SpecifierSet
+from packaging.version import InvalidVersion, Version
+
+from src.upgrade_advisor.const import UPLOADS_DIR
+from src.upgrade_advisor.schema import ManifestRequirementSchema, ManifestSchema
+
+from .pypi_cache import normalize_name
+
+try:
+    import tomllib
+except ModuleNotFoundError:  # Python 3.10
+    import tomli as tomllib
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+logger.addHandler(logging.StreamHandler())
+
+# a `#` starting a comment in a requirements file, as pip strips them
+_COMMENT = re.compile(r"(^|\s+)#.*$")
+# one clause of a Poetry constraint: operator (optional) and version
+_POETRY_CLAUSE = re.compile(r"(\^|~=|~|===|==|!=|<=|>=|<|>|=)?\s*([\w.*+!-]+)")
+# the separator of the alternatives of a Poetry constraint (`||`, or `|`)
+_POETRY_OR = re.compile(r"\s*\|\|?\s*")
+# requirements file options taking a value, and the ones that do not matter
+# for resolution
+_VALUE_OPTIONS = {
+    "-r": "requirement",
+    "--requirement": "requirement",
+    "-c": "constraint",
+    "--constraint": "constraint",
+    "-e": "editable",
+    "--editable": "editable",
+    "-i": "index",
+    "--index-url": "index",
+    "--extra-index-url": "index",
+    "-f": "index",
+    "--find-links": "index",
+    "--trusted-host": "ignored",
+    "--no-binary": "ignored",
+    "--only-binary": "ignored",
+    "--use-feature": "ignored",
+}
+_FLAG_OPTIONS = {"--pre", "--prefer-binary", "--require-hashes", "--no-index"}
+
+
+class ManifestError(ValueError):
+    """A manifest cannot be read or parsed."""
+
+
+def make_requirement(
+    requirement: str | Requirement, hashes: Iterable[str] = ()
+) -> ManifestRequirementSchema:
+    """
+    Build the canonical form of a requirement.
+
+    Args:
+        requirement (str | Requirement): A PEP 508 requirement.
+        hashes (Iterable[str]): Allowed hashes, e.g. from `--hash` options.
+    Returns:
+        ManifestRequirementSchema: The requirement with a normalized name.
+    Raises:
+        InvalidRequirement: If the requirement is not valid PEP 508.
+    """
+    req = requirement
+    if isinstance(req, str):
+        req = Requirement(req)
+    req.name = normalize_name(req.name)
+    # extras compare normalized too (PEP 685)
+    req.extras = set(map(normalize_name, req.extras))
+    return ManifestRequirementSchema(
+        name=req.name,
+        requirement=str(req),
+        specifier=str(req.specifier),
+        extras=sorted(req.extras),
+        marker=str(req.marker) if req.marker else None,
+        url=req.url,
+        hashes=list(hashes),
+    )
+
+
+def _parse_requirements(
+    requirements: Iterable[str], warnings: list[str], where: str
+) -> list[ManifestRequirementSchema]:
+    """Parse PEP 508 strings, recording the invalid ones as warnings."""
+    parsed = []
+    for requirement in requirements:
+        try:
+            parsed.append(make_requirement(requirement))
+        except (InvalidRequirement, TypeError):
+            warnings.append(f"Skipped invalid requirement {requirement!r} in {where}.")
+    return parsed
+
+
+# Poetry
+
+
+def _bump(version: str, index: int) -> str:
+    """`version` truncated after `index` with that component incremented."""
+    release = list(Version(version).release)
+    release += [0] * (index + 1 - len(release))
+    return ".".join(map(str, release[:index] + [release[index] + 1]))
+
+
+def poetry_specifier(constraint: str) -> str:
+    """
+    Translate a Poetry version constraint into a PEP 440 specifier.
+
+    Handles caret (`^1.2` -> `>=1.2,<2`), tilde (`~1.2` -> `>=1.2,<1.3`),
+    wildcards (`1.2.*`), bare versions (`1.2` -> `==1.2`) and comma or space
+    separated clauses. PEP 440 has no "or", so for `A || B` only the last
+    alternative (usually the newest versions) is kept; the manifest parser
+    warns about it.
+
+    Args:
+        constraint (str): A Poetry constraint, e.g. '^1.2.3'.
+    Returns:
+        str: The equivalent PEP 440 specifier, empty for any version.
+    Raises:
+        InvalidSpecifier: If the constraint cannot be translated.
+    """
+    constraint = _POETRY_OR.split(constraint.strip())[-1]
+    clauses = []
+    for operator, version in _POETRY_CLAUSE.findall(constraint):
+        if version == "*":
+            continue
+        try:
+            if operator == "^":
+                given = version.split(".")
+                Version(version)
+                # the first non-zero component given is the one that may not change
+                index = next(
+                    (i for i, part in enumerate(given) if part.strip("0")),
+                    len(given) - 1,
+                )
+                clauses += [f">={version}", f"<{_bump(version, index)}"]
+            elif operator == "~":
+                index = 1 if len(version.split(".")) > 1 else 0
+                clauses += [f">={version}", f"<{_bump(version, index)}"]
+            elif operator in ("", "="):
+                clauses.append(f"=={version}")
+            else:
+                clauses.append(f"{operator}{version}")
+        except InvalidVersion:
+            raise InvalidSpecifier(f"Invalid constraint: {constraint}") from None
+    # validates the result
+    return str(SpecifierSet(",".join(clauses)))
+
+
+def _warn_alternatives(
+    name: str, constraint: str, warnings: list[str], where: str
+) -> None:
+    """Record it when `poetry_specifier` drops alternatives of a constraint."""
+    if len(_POETRY_OR.split(constraint.strip())) > 1:
+        warnings.append(
+            f"Narrowed the constraint {constraint!r} of {name} in {where} to its "
+            "last alternative: PEP 440 has no 'or'."
+        )
+
+
+def _python_marker(constraint: str) -> str | None:
+    """Translate a Poetry `python` constraint into an environment marker."""
+    clauses = []
+    for spec in SpecifierSet(poetry_specifier(constraint)):
+        version = spec.version.rstrip(".*")
+        key = "python_version"
+        if len(version.split(".")) > 2:
+            key = "python_full_version"
+        clauses.append(f'{key} {spec.operator} "{spec.version}"')
+    return " and ".join(sorted(clauses)) or None
+
+
+def _poetry_requirement(
+    name: str, spec: str | dict, warnings: list[str], where: str
+) -> tuple[str | None, bool]:
+    """
+    Translate one Poetry dependency into a PEP 508 string.
+
+    Returns:
+        Tuple[Optional[str], bool]: The requirement (None if it cannot be
+            resolved) and whether it is optional, i.e. only part of extras.
+    """
+    if isinstance(spec, str):
+        spec = {"version": spec}
+    extras = f"[{','.join(spec['extras'])}]" if spec.get("extras") else ""
+    markers = []
+    if spec.get("markers"):
+        markers.append(spec["markers"])
+    if spec.get("python"):
+        _warn_alternatives(name, str(spec["python"]), warnings, where)
+        markers.append(_python_marker(spec["python"]))
+    if spec.get("platform"):
+        markers.append(f'sys_platform == "{spec["platform"]}"')
+    marker = " and ".join(f"({m})" for m in markers if m)
+    marker = f" ; {marker}" if marker else ""
+
+    if "git" in spec:
+        ref = spec.get("rev") or spec.get("tag") or spec.get("branch")
+        url = f"git+{spec['git']}" + (f"@{ref}" if ref else "")
+        if spec.get("subdirectory"):
+            url += f"#subdirectory={spec['subdirectory']}"
+        requirement = f"{name}{extras} @ {url}{marker}"
+    elif "url" in spec:
+        requirement = f"{name}{extras} @ {spec['url']}{marker}"
+    elif "path" in spec:
+        warnings.append(f"Skipped {name}: local path dependencies cannot be resolved.")
+        return None, False
+    else:
+        constraint = str(spec.get("version", "*"))
+        _warn_alternatives(name, constraint, warnings, where)
+        version = poetry_specifier(constraint)
+        requirement = f"{name}{extras}{version}{marker}"
+    return requirement, bool(spec.get("optional"))
+
+
+def _poetry_dependencies(
+    table: dict, warnings: list[str], where: str
+) -> tuple[list[str], dict[str, str], str | None]:
+    """
+    Translate a Poetry dependency table.
+
+    Returns:
+        Tuple: Required PEP 508 strings, optional ones by package name, and
+            the `python` constraint as a PEP 440 specifier.
+    """
+    required, optional, python = [], {}, None
+    for name, spec in table.items():
+        try:
+            if name.lower() == "python":
+                _warn_alternatives(name, str(spec), warnings, where)
+                python = poetry_specifier(str(spec))
+                continue
+            # a list holds alternatives for different environments
+            for alternative in spec if isinstance(spec, list) else [spec]:
+                requirement, is_optional = _poetry_requirement(
+                    name, alternative, warnings, where
+                )
+                if requirement is None:
+                    continue
+                if is_optional:
+                    optional[normalize_name(name)] = requirement
+                else:
+                    required.append(requirement)
+        except (InvalidSpecifier, TypeError, AttributeError, KeyError):
+            warnings.append(f"Skipped {name} in {where}: unsupported constraint.")
+    return required, optional, python
+
+
+def _parse_poetry(poetry: dict, manifest: ManifestSchema) -> None:
+    warnings = manifest.warnings
+    required, optional, python = _poetry_dependencies(
+        poetry.get("dependencies", {}), warnings, "[tool.poetry.dependencies]"
+    )
+    if not manifest.dependencies:
+        manifest.dependencies = _parse_requirements(
+            required, warnings, "[tool.poetry.dependencies]"
+        )
+        manifest.requires_python = manifest.requires_python or python
+    for extra, names in poetry.get("extras", {}).items():
+        names = [normalize_name(name) for name in names]
+        requirements = [optional[name] for name in names if name in optional]
+        manifest.optional_dependencies.setdefault(extra, []).extend(
+            _parse_requirements(requirements, warnings, "[tool.poetry.extras]")
+        )
+
+    groups = {
+        name: group.get("dependencies", {})
+        for name, group in poetry.get("group", {}).items()
+    }
+    if "dev-dependencies" in poetry:
+        # before Poetry 1.2
+        groups.setdefault("dev", {}).update(poetry["dev-dependencies"])
+    for group, table in groups.items():
+        where = f"[tool.poetry.group.{group}.dependencies]"
+        required, optional, _ = _poetry_dependencies(table, warnings, where)
+        manifest.dependency_groups.setdefault(group, []).extend(
+            _parse_requirements(required + list(optional.values()), warnings, where)
+        )
+
+
+# pyproject.toml
+
+
+def _dependency_groups(
+    groups: dict, warnings: list[str]
+) -> dict[str, list[ManifestRequirementSchema]]:
+    """Expand PEP 735 dependency groups, following `include-group` entries."""
+
+    def expand(name: str, seen: set[str]) -> list[str]:
+        if name in seen:
+            warnings.append(f"Dependency group {name} includes itself.")
+            return []
+        requirements = []
+        for entry in groups.get(name, []):
+            if isinstance(entry, dict):
+                included = entry.get("include-group", "")
+                requirements += expand(included, seen | {name})
+            else:
+                requirements.append(entry)
+        return requirements
+
+    return {
+        name: _parse_requirements(
+            expand(name, set()), warnings, f"dependency group {name}"
+        )
+        for name in groups
+    }
+
+
+def _strip_editable(requirements: Iterable[str], warnings: list[str]) -> list[str]:
+    """Drop PDM editable entries (`-e path`), which are local projects."""
+    kept = []
+    for requirement in requirements:
+        if requirement.startswith("-e "):
+            warnings.append(f"Skipped editable dependency {requirement[3:].strip()}.")
+        else:
+            kept.append(requirement)
+    return kept
+
+
+def parse_pyproject(content: str | bytes) -> ManifestSchema:
+    """
+    Parse the dependencies declared in a pyproject.toml.
+
+    Reads PEP 621 `[project]` metadata, PEP 735 `[dependency-groups]`,
+    Poetry (`[tool.poetry]`, with caret/tilde constraints, groups and
+    extras), PDM development groups and uv constraints, overrides and
+    development dependencies.
+
+    Args:
+        content (str | bytes): Content of the pyproject.toml.
+    Returns:
+        ManifestSchema: The dependencies in canonical form.
+    Raises:
+        ManifestError: If the content is not valid TOML.
+    """
+    if isinstance(content, bytes):
+        content = content.decode("utf-8", errors="replace")
+    try:
+        data = tomllib.loads(content)
+    except tomllib.TOMLDecodeError as e:
+        raise ManifestError(f"Invalid pyproject.toml: {e!s}") from e
+    project = data.get("project", {})
+    tool = data.get("tool", {})
+    poetry = tool.get("poetry", {})
+    pdm = tool.get("pdm", {})
+    uv = tool.get("uv", {})
+
+    if "dependencies" in project or not poetry:
+        source_format = "pdm" if pdm else "pep621"
+    else:
+        source_format = "poetry"
+    manifest = ManifestSchema(
+        source_format=source_format,
+        name=project.get("name") or poetry.get("name"),
+        requires_python=project.get("requires-python"),
+    )
+    warnings = manifest.warnings
+    manifest.dependencies = _parse_requirements(
+        project.get("dependencies", []), warnings, "[project.dependencies]"
+    )
+    for extra, requirements in project.get("optional-dependencies", {}).items():
+        manifest.optional_dependencies[extra] = _parse_requirements(
+            requirements, warnings, f"[project.optional-dependencies.{extra}]"
+        )
+    manifest.dependency_groups = _dependency_groups(
+        data.get("dependency-groups", {}), warnings
+    )
+    if poetry:
+        _parse_poetry(poetry, manifest)
+    for group, requirements in pdm.get("dev-dependencies", {}).items():
+        requirements = _strip_editable(requirements, warnings)
+        manifest.dependency_groups.setdefault(group, []).extend(
+            _parse_requirements(requirements, warnings, "[tool.pdm.dev-dependencies]")
+        )
+    if uv.get("dev-dependencies"):
+        manifest.dependency_groups.setdefault("dev", []).extend(
+            _parse_requirements(
+                uv["dev-dependencies"], warnings, "[tool.uv.dev-dependencies]"
+            )
+        )
+    manifest.constraints = _parse_requirements(
+        uv.get("constraint-dependencies", []), warnings, "[tool.uv]"
+    )
+    manifest.overrides = _parse_requirements(
+        uv.get("override-dependencies", []), warnings, "[tool.uv]"
+    )
+    if uv.get("sources"):
+        warnings.append("Ignored [tool.uv.sources], packages come from the index.")
+
+    if "dependencies" in project.get("dynamic", []):
+        manifest.dynamic = True
+        warnings.append("Dependencies are dynamic, the project has to be built.")
+    elif not project and not poetry:
+        # e.g. only [build-system], with the metadata in setup.py/setup.cfg
+        manifest.dynamic = True
+        warnings.append(
+            "No [project] or [tool.poetry] table found, the project has to be built."
+        )
+    return manifest
+
+
+# requirements files
+
+
+def _logical_lines(content: str) -> Iterable[tuple[int, str]]:
+    """
+    Lines of a requirements file with continuations joined, comments removed,
+    and the number of the line each starts on.
+    """
+    buffer, start = "", 1
+    for number, line in enumerate(content.splitlines(), 1):
+        line = _COMMENT.sub("", line)
+        if not buffer:
+            start = number
+        if line.endswith("\\"):
+            buffer += line[:-1] + " "
+            continue
+        line = (buffer + line).strip()
+        buffer = ""
+        if line:
+            yield start, line
+    if buffer.strip():
+        yield start, buffer.strip()
+
+
+def _split_options(line: str) -> tuple[str, list[str]]:
+    """Split a requirement line into the requirement and its options."""
+    tokens = line.split(" ")
+    for i, token in enumerate(tokens):
+        if token.startswith("-"):
+            options = " ".join(tokens[i:])
+            try:
+                return " ".join(tokens[:i]).strip(), shlex.split(options)
+            except ValueError:
+                # unbalanced quotes
+                return " ".join(tokens[:i]).strip(), options.split()
+    return line, []
+
+
+def _option(line: str) -> tuple[str, str]:
+    """Split an option line (`-r file`, `-rfile`, `--requirement=file`)."""
+    if line.startswith("--"):
+        match = re.match(r"(--[\w-]+)[=\s]?(.*)", line)
+        return match.group(1), match.group(2).strip()
+    return line[:2], line[2:].strip()
+
+
+def _direct_reference(line: str) -> str | None:
+    """Turn a bare URL with an `#egg=name` fragment into `name @ url`."""
+    url, _, fragment = line.partition("#")
+    for part in fragment.split("&"):
+        key, _, value = part.partition("=")
+        if key == "egg" and value:
+            return f"{value} @ {url}"
+    return None
+
+
+class _RequirementsReader:
+    """Reads a requirements file and the files it includes.
+
+    Includes are only followed within the uploads directory, like the
+    files the tools read, so a manifest cannot pull in other files of the
+    server. Warnings name files and line numbers, never the content of a
+    line.
+    """
+
+    def __init__(self, manifest: ManifestSchema):
+        self.manifest = manifest
+        self.seen: set[Path] = set()
+
+    def read(self, path: Path, constraint: bool = False) -> None:
+        path = path.resolve()
+        if path in self.seen:
+            return
+        self.seen.add(path)
+        try:
+            content = path.read_text(encoding="utf-8")
+        except (OSError, UnicodeDecodeError):
+            self.manifest.warnings.append(f"Could not read {path.name}.")
+            return
+        self.feed(content, path.parent, constraint, where=path.name)
+
+    def feed(self, content: str, base_dir: Path, constraint: bool, where: str) -> None:
+        for number, line in _logical_lines(content):
+            where_line = f"line {number} of {where}"
+            if line.startswith("-"):
+                self._handle_option(line, base_dir, constraint, where_line)
+            else:
+                self._add(line, constraint, where_line)
+
+    def _include(
+        self, base_dir: Path, value: str, constraint: bool, where: str
+    ) -> None:
+        path = (base_dir / value).resolve()
+        if not path.is_relative_to(UPLOADS_DIR):
+            self.manifest.warnings.append(
+                f"Skipped the include on {where}: only uploaded files can be included."
+            )
+            return
+        self.read(path, constraint)
+
+    def _handle_option(
+        self, line: str, base_dir: Path, constraint: bool, where: str
+    ) -> None:
+        name, value = _option(line)
+        kind = _VALUE_OPTIONS.get(name)
+        if kind == "requirement":
+            self._include(base_dir, value, constraint, where)
+        elif kind == "constraint":
+            self._include(base_dir, value, True, where)
+        elif kind == "editable":
+            reference = _direct_reference(value)
+            if reference is not None:
+                self._add(reference, constraint, where)
+            else:
+                self.manifest.warnings.append(f"Skipped an editable path on {where}.")
+        elif kind == "index":
+            self.manifest.warnings.append(
+                f"Ignored {name} on {where}, set PACKAGE_INDEX_URL instead."
+            )
+        elif kind is None and name not in _FLAG_OPTIONS:
+            self.manifest.warnings.append(f"Ignored an unknown option on {where}.")
+
+    def _add(self, line: str, constraint: bool, where: str) -> None:
+        requirement, options = _split_options(line)
+        hashes = []
+        for i, option in enumerate(options):
+            if option.startswith("--hash="):
+                hashes.append(option[len("--hash=") :])
+            elif option == "--hash" and i + 1 < len(options):
+                hashes.append(options[i + 1])
+        if re.match(r"^[\w+.-]+://", requirement):
+            # a bare URL, only usable if it names its package
+            requirement = _direct_reference(requirement) or requirement
+        try:
+            parsed = make_requirement(requirement, hashes)
+        except InvalidRequirement:
+            self.manifest.warnings.append(f"Skipped an invalid requirement on {where}.")
+            return
+        if constraint:
+            self.manifest.constraints.append(parsed)
+        else:
+            self.manifest.dependencies.append(parsed)
+
+
+def parse_requirements(content: str, base_dir: str | Path = ".") -> ManifestSchema:
+    """
+    Parse a pip requirements file.
+
+    Follows `-r` (requirements) and `-c` (constraints) includes relative to
+    the including file, within the uploads directory, keeps
+    `--hash` options and markers, and turns `#egg=` URLs into direct
+    references. Index options and local or editable paths are skipped with
+    a warning.
+
+    Args:
+        content (str): Content of the requirements file.
+        base_dir (str | Path): Directory includes are relative to.
+    Returns:
+        ManifestSchema: The dependencies in canonical form.
+    """
+    manifest = ManifestSchema(source_format="requirements")
+    _RequirementsReader(manifest).feed(
+        content, Path(base_dir), constraint=False, where="requirements"
+    )
+    return manifest
+
+
+def load_manifest(path: str) -> ManifestSchema:
+    """
+    Read a pyproject.toml or requirements file into the canonical model.
+
+    Args:
+        path (str): Path of the manifest; files ending in `.toml` are read
+            as pyproject.toml, anything else as a requirements file.
+    Returns:
+        ManifestSchema: The dependencies in canonical form.
+    Raises:
+        ManifestError: If the file cannot be read or parsed.
+    """
+    try:
+        content = Path(path).read_text(encoding="utf-8")
+    except (OSError, UnicodeDecodeError) as e:
+        raise ManifestError(f"Could not read {path}: {e!s}") from e
+    if path.endswith(".toml"):
+        return parse_pyproject(content)
+    manifest = ManifestSchema(source_format="requirements")
+    _RequirementsReader(manifest).read(Path(path))
+    return manifest
+
+
+def _toml_list(requirements: list[ManifestRequirementSchema]) -> str:
+    """A TOML array of the PEP 508 strings (JSON strings are valid TOML)."""
+    if not requirements:
+        return "[]"
+    items = "".join(f"    {json.dumps(r.requirement)},\n" for r in requirements)
+    return f"[\n{items}]"
+
+
+def manifest_to_pyproject(manifest: ManifestSchema) -> str:
+    """
+    Write the canonical model as a minimal PEP 621 pyproject.toml.
+
+    The result only has static metadata, so uv reads the dependencies from
+    it without building the project.
+
+    Args:
+        manifest (ManifestSchema): The dependencies.
+    Returns:
+        str: Content of the pyproject.toml.
+    """
+    name = normalize_name(manifest.name or "") or "manifest"
+    lines = [
+        "[project]",
+        f"name = {json.dumps(name)}",
+        'version = "0"',
+    ]
+    if manifest.requires_python:
+        lines.append(f"requires-python = {json.dumps(manifest.requires_python)}")
+    lines.append(f"dependencies = {_toml_list(manifest.dependencies)}")
+    if manifest.optional_dependencies:
+        lines.append("\n[project.optional-dependencies]")
+        for extra, requirements in sorted(manifest.optional_dependencies.items()):
+            lines.append(f"{json.dumps(extra)} = {_toml_list(requirements)}")
+    if manifest.dependency_groups:
+        lines.append("\n[dependency-groups]")
+        for group, requirements in sorted(manifest.dependency_groups.items()):
+            lines.append(f"{json.dumps(group)} = {_toml_list(requirements)}")
+    if manifest.constraints or manifest.overrides:
+        lines.append("\n[tool.uv]")
+        if manifest.constraints:
+            lines.append(
+                f"constraint-dependencies = {_toml_list(manifest.constraints)}"
+            )
+        if manifest.overrides:
+            lines.append(f"override-dependencies = {_toml_list(manifest.overrides)}")
+    return "\n".join(lines) + "\n"
+
+
+class UVManifest(NamedTuple):
+    """What `uv pip compile` resolves a manifest from."""
+
+    # minimal pyproject.toml identifying the manifest (fingerprints, diffs),
+    # None if the manifest has to be built as is
+    pyproject: bytes | None
+    # the dependencies, one per line, for uv to read from stdin
+    requirements: str | None
+    # their names (uv does not annotate what stdin requires when a package
+    # requires it too)
+    direct: tuple[str, ...]
+    # contents of the --constraint and --override files (uv does not read
+    # [tool.uv] from the files it compiles)
+    constraints: str
+    overrides: str
+    warnings: tuple[str, ...]
+
+
+def _uv_manifest(manifest: ManifestSchema) -> UVManifest:
+    pyproject = requirements = None
+    if not manifest.dynamic:
+        pyproject = manifest_to_pyproject(manifest).encode("utf-8")
+        requirements = "".join(f"{r.requirement}\n" for r in manifest.dependencies)
+    return UVManifest(
+        pyproject=pyproject,
+        requirements=requirements,
+        direct=tuple(r.name for r in manifest.dependencies),
+        constraints="".join(f"{r.requirement}\n" for r in manifest.constraints),
+        overrides="".join(f"{r.requirement}\n" for r in manifest.overrides),
+        warnings=tuple(manifest.warnings),
+    )
+
+
+@lru_cache(maxsize=256)
+def _uv_pyproject(content: bytes) -> UVManifest:
+    return _uv_manifest(parse_pyproject(content))
+
+
+def uv_manifest(path: str, content: bytes) -> UVManifest:
+    """
+    Get what uv resolves a manifest from.
+
+    Args:
+        path (str): Path of the manifest, to tell its format and find the
+            files a requirements file includes (uploaded ones only).
+        content (bytes): Content of the manifest.
+    Returns:
+        UVManifest: The dependencies (None if they are dynamic and the
+            manifest has to be resolved as is), constraints, overrides and
+            the warnings of the parser.
+    Raises:
+        ManifestError: If the manifest cannot be parsed.
+    """
+    if path.endswith(".toml"):
+        # memoized: the same manifests are resolved over and over
+        return _uv_pyproject(content)
+    manifest = ManifestSchema(source_format="requirements")
+    base_dir = Path(path).resolve().parent
+    reader = _RequirementsReader(manifest)
+    # the includes are read on every call, they may have changed
+    reader.seen.add(Path(path).resolve())
+    reader.feed(
+        content.decode("utf-8", errors="replace"),
+        base_dir,
+        constraint=False,
+        where=os.path.basename(path),
+    )
+    return _uv_manifest(manifest)
+
+
+def dependencies_manifest(
+    dependencies: Iterable[str], name: str | None = None
+) -> UVManifest:
+    """
+    Get what uv resolves a plain list of requirements from.
+
+    Args:
+        dependencies (Iterable[str]): PEP 508 requirements, e.g.
+            ['gradio>=5', 'torch==2.1.*'].
+        name (str, optional): Name of the project they belong to.
+    Returns:
+        UVManifest: As `uv_manifest`; invalid requirements are skipped
+            with a warning.
+    """
+    manifest = ManifestSchema(source_format="requirements", name=name)
+    manifest.dependencies = _parse_requirements(
+        dependencies, manifest.warnings, "the dependencies"
+    )
+    return _uv_manifest(manifest)
+
+
+if __name__ == "__main__":
+    import sys
+
+    for manifest_path in sys.argv[1:]:
+        print(manifest_to_pyproject(load_manifest(os.path.abspath(manifest_path))))
@@ -1,35 +1,220 @@
+import heapq
+import itertools
 import logging
+from collections.abc import Iterable
+
+from packaging.specifiers import InvalidSpecifier, SpecifierSet
+from packaging.version import InvalidVersion, Version
 
 from src.upgrade_advisor.schema import (
     PackageInfoSchema,
     PackageReleaseSchema,
     PackageSearchResponseSchema,
     PackageVersionResponseSchema,
-    ResolvedDep,
+    PinDiffSchema,
     ResolveResult,
 )
 
+from .dependency_graph import parse_compile_output
+from .json_stream import iter_pypi_document
+
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 logger.addHandler(logging.StreamHandler())
 
 
+class LatestReleases:
+    """Select the `k` newest releases by version from a stream of releases.
+
+    Releases are ordered by their parsed `packaging` version (not by the
+    order they appear in the document), using a bounded min-heap so that
+    selecting from `n` releases costs O(n log k) time and O(k) memory.
+    Unparseable (legacy) versions cannot be ordered and are skipped.
+
+    Args:
+        k (int): Number of releases to keep. Keeps all if `k <= 0`.
+        include_prereleases (bool): Keep pre-, post-dev and dev releases.
+        include_yanked (bool): Keep yanked release files.
+        python_version (str, optional): Only keep release files whose
+            `requires_python` allows this Python version, e.g. '3.12'.
+    """
+
+    def __init__(
+        self,
+        k: int,
+        include_prereleases: bool = True,
+        include_yanked: bool = True,
+        python_version: str | None = None,
+    ):
+        self.k = k
+        self.include_prereleases = include_prereleases
+        self.include_yanked = include_yanked
+        self.python_version = Version(python_version) if python_version else None
+        self._heap: list[tuple[Version, int, str, list]] = []
+        self._counter = itertools.count()
+        self._specifiers = {}
+        # number of parseable versions added, selected or not
+        self.seen = 0
+
+    def _python_matches(self, requires_python: str | None) -> bool:
+        if not requires_python:
+            return True
+        specifier = self._specifiers.get(requires_python)
+        if specifier is None:
+            try:
+                specifier = SpecifierSet(requires_python)
+            except InvalidSpecifier:
+                specifier = SpecifierSet()
+            self._specifiers[requires_python] = specifier
+        return specifier.contains(self.python_version, prereleases=True)
+
+    def filter_files(self, files: list) -> list:
+        """Drop the release files excluded by the yanked/Python version filters."""
+        if self.include_yanked and self.python_version is None:
+            return files
+        kept = []
+        for file in files:
+            if not self.include_yanked and file.get("yanked"):
+                continue
+            if self.python_version is not None and not self._python_matches(
+                file.get("requires_python")
+            ):
+                continue
+            kept.append(file)
+        return kept
+
+    def add(self, version: str, files: list) -> None:
+        try:
+            parsed = Version(version)
+        except InvalidVersion:
+            return
+        self.seen += 1
+        if not self.include_prereleases and parsed.is_prerelease:
+            return
+        # compare with the smallest kept release before doing any file work
+        if 0 < self.k <= len(self._heap) and parsed <= self._heap[0][0]:
+            return
+        kept_files = self.filter_files(files)
+        if files and not kept_files:
+            return
+        item = (parsed, next(self._counter), version, kept_files)
+        if 0 < self.k <= len(self._heap):
+            heapq.heappushpop(self._heap, item)
+        else:
+            heapq.heappush(self._heap, item)
+
+    def releases(self) -> dict:
+        """Return the selected releases as a dict, ordered from oldest to newest."""
+        return {version: files for _, _, version, files in sorted(self._heap)}
+
+
+def select_latest_releases(
+    releases: dict,
+    k: int,
+    include_prereleases: bool = True,
+    include_yanked: bool = True,
+    python_version: str | None = None,
+) -> dict:
+    """
+    Select the `k` newest releases by version from a PyPI `releases` dict.
+
+    Args:
+        releases (dict): Mapping of version strings to lists of release files.
+        k (int): Number of releases to keep. Keeps all if `k <= 0`.
+        include_prereleases (bool): Keep pre-releases. Defaults to True.
+        include_yanked (bool): Keep yanked release files. Defaults to True.
+        python_version (str, optional): Only keep release files compatible with this Python version.
+    Returns:
+        dict: The selected releases, ordered from oldest to newest version.
+    """
+    selector = LatestReleases(
+        k,
+        include_prereleases=include_prereleases,
+        include_yanked=include_yanked,
+        python_version=python_version,
+    )
+    for version, files in releases.items():
+        selector.add(version, files)
+    return selector.releases()
+
+
 def parse_response_pypi_search(
-    data: dict, cutoff: int = 10
+    data: dict,
+    cutoff: int = 10,
+    include_prereleases: bool = True,
+    include_yanked: bool = True,
+    python_version: str | None = None,
 ) -> PackageSearchResponseSchema:
     """
     Parse the JSON response from the PyPI search API into a Pydantic model.
 
     Args:
         data (dict): The JSON response from the PyPI search API.
-        cutoff (int): The maximum number of releases to include in the response. Defaults to 10.
+        cutoff (int): The maximum number of releases to include in the response, newest versions first. Defaults to 10.
+        include_prereleases (bool): Include pre-releases. Defaults to True.
+        include_yanked (bool): Include yanked release files. Defaults to True.
+        python_version (str, optional): Only include releases with files compatible with this Python version.
     Returns:
         PackageSearchResponseSchema: A Pydantic model containing metadata about the package.
     """
     info = data.get("info", {})
-    releases = dict(list(data.get("releases", {}).items())[-cutoff:])
+    releases = select_latest_releases(
+        data.get("releases", {}),
+        cutoff,
+        include_prereleases=include_prereleases,
+        include_yanked=include_yanked,
+        python_version=python_version,
+    )
     last_serial = data.get("last_serial", 0)
+    return build_search_response(info, releases, last_serial)
+
+
+def parse_response_pypi_search_stream(
+    chunks: Iterable[bytes],
+    cutoff: int = 10,
+    include_prereleases: bool = True,
+    include_yanked: bool = True,
+    python_version: str | None = None,
+) -> PackageSearchResponseSchema:
+    """
+    Parse the PyPI search API response incrementally from raw byte chunks.
+
+    Produces the same result as `parse_response_pypi_search`, but the
+    document is never loaded as a whole: only `info`, `last_serial` and the
+    releases that will be returned are kept while streaming, so peak memory
+    does not grow with the size of the document.
+
+    Args:
+        chunks (Iterable[bytes]): The raw JSON response body in chunks.
+        cutoff (int): The maximum number of releases to include in the response, newest versions first. Defaults to 10.
+        include_prereleases (bool): Include pre-releases. Defaults to True.
+        include_yanked (bool): Include yanked release files. Defaults to True.
+        python_version (str, optional): Only include releases with files compatible with this Python version.
+    Returns:
+        PackageSearchResponseSchema: A Pydantic model containing metadata about the package.
+    """
+    info = {}
+    last_serial = 0
+    selector = LatestReleases(
+        cutoff,
+        include_prereleases=include_prereleases,
+        include_yanked=include_yanked,
+        python_version=python_version,
+    )
+    for key, value in iter_pypi_document(chunks, stream_keys=("releases",)):
+        if key == "info":
+            info = value or {}
+        elif key == "last_serial":
+            last_serial = value or 0
+        elif key == "releases":
+            selector.add(*value)
+    return build_search_response(info, selector.releases(), last_serial)
+
 
+def build_search_response(
+    info: dict, releases: dict, last_serial: int
+) -> PackageSearchResponseSchema:
+    """Build the search response model from the selected raw releases."""
     # create the info
     info = PackageInfoSchema(**info)
     # create the releases
@@ -94,50 +279,29 @@ def parse_resolved_deps(data: str) -> ResolveResult:
     Returns:
         ResolveResult: A ResolveResult model containing resolved dependencies.
     """
-    resolved_deps = []
-    current_dep = None
-    lines = data.splitlines()
-    for line_number, line in enumerate(lines):
-        # skip 2 lines
-        if line_number < 2:
-            continue
-        # one liner:
-        #    # via pydantic
-        # could also be:
-        #    # via
-        #    #    pydantic=1.10.7
-        #    #    packaging=23.1
-        # if begins with ascii character
-        if not line.lower().strip().startswith("#"):
-            direct_dep = line.strip()
-            # pycparser==2.23 ; implementation_name != 'PyPy' and platform_python_implementation != 'PyPy'
-            direct_dep_metainfo = direct_dep.rsplit(";", 1)
-            direct_dep = direct_dep_metainfo[0].strip().split("==")
-            direct_dep_name = direct_dep[0] if len(direct_dep) > 0 else direct_dep
-            direct_dep_version = direct_dep[1] if len(direct_dep) > 1 else ""
-            logger.info(
-                f"Parsed direct dependency: {direct_dep_name}=={direct_dep_version}"
-            )
-            resolved_dep = ResolvedDep(
-                name=direct_dep_name,
-                version=direct_dep_version,
-                via=[],  # will be filled later
-                metainfo=direct_dep_metainfo[1].strip()
-                if len(direct_dep_metainfo) > 1
-                else "",
-            )
-            resolved_deps.append(resolved_dep)
-            current_dep = direct_dep_name
-            continue
-        else:
-            if line.replace("    #", "").strip() == "via":
-                continue
-            indirect_dep = line.replace("    #", "").replace("via", "").strip()
-            if current_dep is not None:
-                resolved_deps[-1].update_indirect_dep(indirect_dep)
-                logger.info(
-                    f"Updated indirect dependency for {current_dep}: {indirect_dep}"
-                )
-    logger.info(f"Total resolved dependencies parsed: {len(resolved_deps)}")
-    logger.debug(f"Resolved dependencies details: {resolved_deps}")
-    return ResolveResult(deps={dep.name: dep for dep in resolved_deps})
+    return ResolveResult(**parse_compile_output(data).to_output())
+
+
+def resolved_pins(output: dict) -> dict[str, str]:
+    """
+    Map package name to pinned version from a ResolveResult dump. A package
+    pinned per environment maps to its first entry.
+    """
+    pins: dict[str, str] = {}
+    for dep in output.get("deps", {}).values():
+        if dep.get("name"):
+            pins.setdefault(dep["name"], dep["version"])
+    return pins
+
+
+def diff_pins(old: dict[str, str], new: dict[str, str]) -> PinDiffSchema:
+    """Compare two sets of pins (package name -> version)."""
+    return PinDiffSchema(
+        added={name: new[name] for name in sorted(new.keys() - old.keys())},
+        removed={name: old[name] for name in sorted(old.keys() - new.keys())},
+        changed={
+            name: [old[name], new[name]]
+            for name in sorted(old.keys() & new.keys())
+            if old[name] != new[name]
+        },
+    )
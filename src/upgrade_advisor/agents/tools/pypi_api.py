@@ -1,43 +1,267 @@
+import asyncio
+import json
+import os
 import re
-from typing import Optional
+from collections.abc import Awaitable, Callable, Iterable
 
-import requests
-from requests import HTTPError
+import httpx
+from packaging.version import InvalidVersion, Version
 
+from src.upgrade_advisor.config import (
+    PYPI_BATCH_CONCURRENCY,
+    PYPI_NEGATIVE_CACHE_TTL,
+)
 from src.upgrade_advisor.schema import (
     ErrorResponseSchema,
     GithubRepoSchema,
+    PackageBatchResponseSchema,
     PackageGitHubandReleasesSchema,
 )
 
-from .parse_response import (
-    parse_response_pypi_search,
-    parse_response_version_search,
+from .http_client import get_http_client
+from .indexes import PackageIndex, get_index_config
+from .parse_response import parse_response_version_search
+from .pypi_cache import (
+    CacheEntry,
+    get_pypi_cache,
+    normalize_name,
+    package_cache_key,
+    version_cache_key,
+)
+from .release_index import get_release_index
+from .singleflight import SingleFlight, TTLCache
+
+
+class LookupFailedError(Exception):
+    """A lookup failed with a (cached) negative result, e.g. a 404 from the index."""
+
+    def __init__(self, status_code: int):
+        super().__init__(str(status_code))
+        self.status_code = status_code
+
+
+# PEP 508 project names; anything else cannot exist on the index
+PACKAGE_NAME_PATTERN = re.compile(
+    r"^([A-Z0-9]|[A-Z0-9][A-Z0-9._-]*[A-Z0-9])$", re.IGNORECASE
 )
+# statuses that are worth remembering for a while
+NEGATIVE_STATUS_CODES = (404, 410)
+
+_inflight = SingleFlight()
+_negative_cache: TTLCache[int] = TTLCache(ttl=PYPI_NEGATIVE_CACHE_TTL)
+
+
+def invalid_package_name_error(package: str) -> dict | None:
+    """Return an error payload if `package` is not a valid project name."""
+    if PACKAGE_NAME_PATTERN.match(package.strip()):
+        return None
+    return ErrorResponseSchema(error=f"Invalid package name: {package}").model_dump()
+
+
+def invalid_version_error(version: str) -> dict | None:
+    """Return an error payload if `version` is not a valid PEP 440 version."""
+    try:
+        Version(version)
+    except (InvalidVersion, TypeError):
+        return ErrorResponseSchema(error=f"Invalid version: {version}").model_dump()
+    return None
+
+
+def forget_negative_results(cache_keys: Iterable[str]) -> None:
+    """Drop remembered negative answers, e.g. once a package gets published."""
+    for cache_key in cache_keys:
+        _negative_cache.pop(cache_key)
+
+
+async def fetch_from_indexes(
+    build_url: Callable[[PackageIndex], str | None],
+    cache_key: str,
+    accept: str | None = None,
+) -> tuple[CacheEntry, PackageIndex]:
+    """
+    Fetch a document from the first configured index that has it.
+
+    Indexes are tried in `IndexConfig.lookup_order`; an index that does
+    not know the package (negative answer) hands over to the next one.
+
+    Args:
+        build_url (Callable): Returns the document URL on a given index, or
+            None if that index cannot serve it (e.g. it has no JSON API).
+        cache_key (str): Normalized cache key of the document.
+        accept (str, optional): Value of the `Accept` header.
+    Returns:
+        Tuple[CacheEntry, PackageIndex]: The document and the index it came from.
+    Raises:
+        LookupFailedError: If no index has the document.
+        httpx.HTTPError: If a request fails.
+    """
+    error = LookupFailedError(404)
+    for index in get_index_config().lookup_order:
+        url = build_url(index)
+        if url is None:
+            continue
+        try:
+            entry = await fetch_json_document(
+                url, cache_key, accept=accept, index=index
+            )
+        except LookupFailedError as e:
+            error = e
+            continue
+        return entry, index
+    raise error
+
+
+async def fetch_json_document(
+    url: str,
+    cache_key: str,
+    accept: str | None = None,
+    index: PackageIndex | None = None,
+) -> CacheEntry:
+    """
+    Fetch a JSON document from a package index through the persistent cache.
+
+    Concurrent calls for the same `cache_key` share a single in-flight fetch,
+    and negative answers (404, 410) are remembered for
+    `PYPI_NEGATIVE_CACHE_TTL` seconds so bursts of lookups for missing
+    packages or versions do not reach the index again.
+
+    Args:
+        url (str): URL of the JSON document.
+        cache_key (str): Normalized cache key of the document.
+        accept (str, optional): Value of the `Accept` header, e.g. to ask for
+            the PEP 691 JSON flavor of the simple API.
+        index (PackageIndex, optional): The index serving the document. Its
+            connection pool, credentials and cache namespace are used.
+            Defaults to the primary index.
+    Returns:
+        CacheEntry: The cached (and possibly refreshed) document.
+    Raises:
+        LookupFailedError: If the index answered with a negative result.
+        httpx.HTTPStatusError: If the index answers with another error status.
+        httpx.HTTPError: If the request fails.
+    """
+    index = index or get_index_config().primary
+    cache_key = f"{index.namespace}/{cache_key}"
+    status_code = _negative_cache.get(cache_key)
+    if status_code is not None:
+        raise LookupFailedError(status_code)
+    try:
+        return await _inflight.do(
+            cache_key,
+            lambda: _fetch_json_document(url, cache_key, accept=accept, index=index),
+        )
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code not in NEGATIVE_STATUS_CODES:
+            raise
+        _negative_cache.put(cache_key, e.response.status_code)
+        raise LookupFailedError(e.response.status_code) from e
+
+
+async def _fetch_json_document(
+    url: str, cache_key: str, accept: str | None, index: PackageIndex
+) -> CacheEntry:
+    """
+    Fetch a JSON document, serving and revalidating it from the persistent cache.
+
+    Fresh entries (younger than the TTL, or kept in sync by the change feed,
+    see `change_feed.CacheRefresher`) are served from disk. Stale entries
+    are revalidated with `If-None-Match` and by comparing the
+    `X-PyPI-Last-Serial` header against the cached `last_serial`, so
+    unchanged documents are not downloaded or rewritten again.
+    """
+    cache = get_pypi_cache()
+    # sqlite and the file system, off the event loop
+    entry = await asyncio.to_thread(cache.get, cache_key)
+    if entry is not None and (entry.is_fresh(cache.ttl) or cache.is_synced(entry)):
+        return entry
+
+    headers = {"Accept": accept} if accept else {}
+    if entry is not None and entry.etag:
+        headers["If-None-Match"] = entry.etag
+    client = get_http_client(index.name)
+    async with client.stream(
+        "GET", url, headers=headers, auth=index.auth_for(url)
+    ) as response:
+        if response.status_code == 304 and entry is not None:
+            return await asyncio.to_thread(cache.touch, cache_key) or entry
+        response.raise_for_status()
+
+        last_serial = int(response.headers.get("X-PyPI-Last-Serial", 0) or 0)
+        etag = response.headers.get("ETag")
+        if entry is not None and last_serial and last_serial <= entry.last_serial:
+            # same serial means unchanged data, a lower one means a lagging
+            # replica; either way the body is not worth downloading
+            return await asyncio.to_thread(cache.touch, cache_key, etag=etag) or entry
+
+        # stream the body to disk so large documents are never held in memory
+        fd, tmp_path = cache.new_temp_file()
+        try:
+            with os.fdopen(fd, "wb") as f:
+                async for chunk in response.aiter_bytes():
+                    f.write(chunk)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+    return await asyncio.to_thread(
+        cache.put_file, cache_key, tmp_path, etag=etag, last_serial=last_serial
+    )
 
 
 async def pypi_search(
     package: str,
     cutoff: int = 10,
+    include_prereleases: bool = True,
+    include_yanked: bool = True,
+    python_version: str | None = None,
 ) -> dict:
     """
     Get metadata about the PyPI package from the PyPI Index provided the package name.
 
     Args:
         package (str): Name of the package to look up.
-        cutoff (int): The maximum number of releases to include in the response. Defaults to 10.
+        cutoff (int): The maximum number of releases to include in the response,
+            selected by version (newest first). Defaults to 10.
+        include_prereleases (bool): Include pre-releases. Defaults to True.
+        include_yanked (bool): Include yanked release files. Defaults to True.
+        python_version (str, optional): Only include releases with files
+            compatible with this Python version, e.g. '3.12'.
 
     Returns:
         dict: Parsed package metadata or an error payload.
     """
-    REQUEST_URL = f"https://pypi.python.org/pypi/{package}/json"
+    if error := invalid_package_name_error(package):
+        return error
+    if python_version:
+        try:
+            Version(python_version)
+        except InvalidVersion:
+            return ErrorResponseSchema(
+                error=f"Invalid Python version: {python_version}"
+            ).model_dump()
+    selection = {
+        "cutoff": cutoff,
+        "include_prereleases": include_prereleases,
+        "include_yanked": include_yanked,
+        "python_version": python_version,
+    }
+    # one URL, cache entry and in-flight fetch for every spelling of the name
+    package = normalize_name(package)
 
-    response = requests.get(REQUEST_URL, timeout=10)
-    if response.ok:
-        result = parse_response_pypi_search(response.json(), cutoff=cutoff)
-        return result.model_dump()
-    e = HTTPError(str(response.status_code))
-    return ErrorResponseSchema(error=str(e)).model_dump()
+    def request_url(index: PackageIndex) -> str | None:
+        return index.json_url and f"{index.json_url}/{package}/json"
+
+    try:
+        entry, _ = await fetch_from_indexes(request_url, package_cache_key(package))
+    except LookupFailedError as e:
+        return ErrorResponseSchema(error=str(e)).model_dump()
+    except httpx.HTTPStatusError as e:
+        return ErrorResponseSchema(error=str(e.response.status_code)).model_dump()
+    except httpx.HTTPError as e:
+        return ErrorResponseSchema(error=f"Request failed: {e!s}").model_dump()
+    # answer from the compact in-memory index, parsing the document when it
+    # holds too few releases; off the event loop, documents can be large
+    result = await asyncio.to_thread(get_release_index().search, entry, **selection)
+    return result.model_dump()
 
 
 async def pypi_search_version(package: str, version: str, cutoff: int = 10) -> dict:
@@ -54,14 +278,27 @@ async def pypi_search_version(package: str, version: str, cutoff: int = 10) -> d
               version of the package. Returns an error message in dictionary
               form if fetching fails.
     """
-    REQUEST_URL = f"https://pypi.python.org/pypi/{package}/{version}/json"
-    response = requests.get(REQUEST_URL, timeout=10)
-    if response.ok:
-        result = parse_response_version_search(response.json(), cutoff=cutoff)
-        return result.model_dump()
+    if error := invalid_package_name_error(package) or invalid_version_error(version):
+        return error
+    package, version = normalize_name(package), version.strip()
 
-    e = HTTPError(str(response.status_code))
-    return ErrorResponseSchema(error=str(e)).model_dump()
+    def request_url(index: PackageIndex) -> str | None:
+        return index.json_url and f"{index.json_url}/{package}/{version}/json"
+
+    try:
+        entry, _ = await fetch_from_indexes(
+            request_url, version_cache_key(package, version)
+        )
+    except LookupFailedError as e:
+        return ErrorResponseSchema(error=str(e)).model_dump()
+    except httpx.HTTPStatusError as e:
+        return ErrorResponseSchema(error=str(e.response.status_code)).model_dump()
+    except httpx.HTTPError as e:
+        return ErrorResponseSchema(error=f"Request failed: {e!s}").model_dump()
+    result = parse_response_version_search(
+        json.loads(entry.read_bytes()), cutoff=cutoff
+    )
+    return result.model_dump()
 
 
 def resolve_repo_from_url(url: str) -> dict:
@@ -93,8 +330,7 @@ def resolve_repo_from_url(url: str) -> dict:
     if matches:
         owner, repo = matches.groups()[-2:]  # take the last two matches
         # Remove .git suffix if matched
-        if repo.endswith(".git"):
-            repo = repo[:-4]
+        repo = repo.removesuffix(".git")
         return GithubRepoSchema(owner=owner, repo=repo).model_dump()
 
     return ErrorResponseSchema(error="Invalid GitHub repository URL.").model_dump()
@@ -132,14 +368,106 @@ async def github_repo_and_releases(
         releases = list(result.get("releases", {}).keys())
     except Exception as e:
         return ErrorResponseSchema(
-            error=f"Error processing PyPI data: {str(e)}"
+            error=f"Error processing PyPI data: {e!s}"
         ).model_dump()
     return PackageGitHubandReleasesSchema(
         name=name, url=gh_url, releases=releases
     ).model_dump()
 
 
-def extract_github_url(info: dict) -> Optional[str]:
+async def gather_bounded(
+    specs: list[str],
+    lookup: Callable[[str], Awaitable[dict]],
+    concurrency: int,
+) -> dict:
+    """Run `lookup` for every spec concurrently, at most `concurrency` at a time.
+
+    Exceptions are turned into error payloads so one bad package does not
+    fail the whole batch. Duplicate specs are looked up once.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run(spec: str) -> dict:
+        async with semaphore:
+            try:
+                return await lookup(spec)
+            except Exception as e:  # noqa: BLE001
+                return ErrorResponseSchema(
+                    error=f"Error looking up {spec}: {e!s}"
+                ).model_dump()
+
+    unique_specs = list(dict.fromkeys(spec.strip() for spec in specs if spec.strip()))
+    results = await asyncio.gather(*(run(spec) for spec in unique_specs))
+    return PackageBatchResponseSchema(
+        results=dict(zip(unique_specs, results))
+    ).model_dump()
+
+
+async def pypi_search_batch(
+    packages: list[str],
+    cutoff: int = 10,
+    include_prereleases: bool = True,
+    include_yanked: bool = True,
+    python_version: str | None = None,
+    concurrency: int = PYPI_BATCH_CONCURRENCY,
+) -> dict:
+    """
+    Get metadata about several PyPI packages in one call.
+
+    Args:
+        packages (List[str]): Package names to look up. An entry of the form
+            `name==version` looks up that specific version instead.
+        cutoff (int): The maximum number of releases (or files for version
+            lookups) to include per package. Defaults to 10.
+        include_prereleases (bool): Include pre-releases. Defaults to True.
+        include_yanked (bool): Include yanked release files. Defaults to True.
+        python_version (str, optional): Only include releases compatible with this Python version.
+        concurrency (int): Maximum number of concurrent requests.
+    Returns:
+        dict: Per-package results or error payloads, following
+              PackageBatchResponseSchema.
+    """
+
+    async def lookup(spec: str) -> dict:
+        name, _, version = spec.partition("==")
+        if version:
+            return await pypi_search_version(
+                name.strip(), version.strip(), cutoff=cutoff
+            )
+        return await pypi_search(
+            name.strip(),
+            cutoff=cutoff,
+            include_prereleases=include_prereleases,
+            include_yanked=include_yanked,
+            python_version=python_version,
+        )
+
+    return await gather_bounded(packages, lookup, concurrency)
+
+
+async def github_repo_and_releases_batch(
+    names: list[str],
+    cutoff: int = 10,
+    concurrency: int = PYPI_BATCH_CONCURRENCY,
+) -> dict:
+    """Lookup the GitHub repository URL and releases of several packages at once.
+
+    Args:
+        names (List[str]): The package names.
+        cutoff (int): The maximum number of releases to include per package. Defaults to 10.
+        concurrency (int): Maximum number of concurrent requests.
+    Returns:
+        dict: Per-package results or error payloads, following
+              PackageBatchResponseSchema.
+    """
+
+    async def lookup(name: str) -> dict:
+        return await github_repo_and_releases(name, cutoff=cutoff)
+
+    return await gather_bounded(names, lookup, concurrency)
+
+
+def extract_github_url(info: dict) -> str | None:
     """Extract the GitHub repository URL from the package info dictionary.
 
     Args:
@@ -169,7 +497,7 @@ def extract_github_url(info: dict) -> Optional[str]:
     return gh_url
 
 
-def extract_github_url_description(info: dict) -> Optional[str]:
+def extract_github_url_description(info: dict) -> str | None:
     """Extract the GitHub repository URL from the package description field.
     Args:
         info (dict): The 'info' section of the PyPI package metadata.
@@ -0,0 +1,370 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections.abc import Iterable
+from dataclasses import dataclass
+from pathlib import Path
+
+from packaging.utils import canonicalize_name
+
+from src.upgrade_advisor.config import (
+    CACHE_DIR,
+    PYPI_CACHE_MAX_MB,
+    PYPI_CACHE_TTL,
+)
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+logger.addHandler(logging.StreamHandler())
+
+# package names looked up per query by `PyPICache.package_entries`, four
+# parameters each (well under sqlite's limit of 999)
+_PACKAGE_BATCH = 200
+
+
+def normalize_name(name: str) -> str:
+    """Normalize a package name as described in PEP 503."""
+    return canonicalize_name(name.strip())
+
+
+def package_cache_key(package: str) -> str:
+    """Cache key of the `/pypi/<name>/json` document."""
+    return normalize_name(package)
+
+
+def version_cache_key(package: str, version: str) -> str:
+    """Cache key of the `/pypi/<name>/<version>/json` document."""
+    return f"{normalize_name(package)}/{version.strip()}"
+
+
+@dataclass
+class CacheEntry:
+    """A cached JSON document and the validators needed to revalidate it."""
+
+    key: str
+    path: Path
+    etag: str | None
+    last_serial: int
+    fetched_at: float
+    size: int
+
+    def is_fresh(self, ttl: float) -> bool:
+        """Check if the entry can be served without asking the index."""
+        return (time.time() - self.fetched_at) < ttl
+
+    def read_bytes(self) -> bytes:
+        return self.path.read_bytes()
+
+
+class PyPICache:
+    """Persistent, size-bounded cache of PyPI JSON documents.
+
+    Bodies are stored as files under `root/bodies`, the validators (ETag,
+    `last_serial`) and bookkeeping live in a small sqlite index. When the
+    total size exceeds `max_bytes`, the least recently used entries are
+    evicted. The cache is safe to share between threads and processes.
+    """
+
+    def __init__(self, root: Path, max_bytes: int, ttl: float):
+        self.root = Path(root)
+        self.body_dir = self.root / "bodies"
+        self.body_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            str(self.root / "index.sqlite3"),
+            timeout=30,
+            check_same_thread=False,
+            isolation_level=None,  # autocommit, we keep statements atomic
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                filename TEXT NOT NULL,
+                etag TEXT,
+                last_serial INTEGER NOT NULL DEFAULT 0,
+                fetched_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                size INTEGER NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS state (name TEXT PRIMARY KEY, value TEXT)"
+        )
+        # namespace -> (synced since, sync valid until)
+        self._synced: dict[str, tuple[float, float]] = {}
+
+    def _body_path(self, filename: str) -> Path:
+        return self.body_dir / filename[:2] / filename
+
+    def _to_entry(self, row) -> CacheEntry:
+        key, filename, etag, last_serial, fetched_at, size = row
+        return CacheEntry(
+            key=key,
+            path=self._body_path(filename),
+            etag=etag,
+            last_serial=last_serial,
+            fetched_at=fetched_at,
+            size=size,
+        )
+
+    def get(self, key: str) -> CacheEntry | None:
+        """Return the cached entry for `key` or None if missing."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT key, filename, etag, last_serial, fetched_at, size "
+                "FROM entries WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            entry = self._to_entry(row)
+            if not entry.path.exists():
+                # body was removed behind our back, forget about it
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                return None
+            self._conn.execute(
+                "UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key)
+            )
+        return entry
+
+    def new_temp_file(self) -> tuple[int, str]:
+        """Create a temp file next to the bodies to stream a download into.
+
+        Returns:
+            Tuple[int, str]: Open file descriptor and path, as `tempfile.mkstemp`.
+        """
+        tmp_dir = self.body_dir / "tmp"
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+        return tempfile.mkstemp(dir=str(tmp_dir), suffix=".tmp")
+
+    def put(
+        self, key: str, body: bytes, etag: str | None, last_serial: int
+    ) -> CacheEntry:
+        """Store a freshly downloaded document and evict old entries if needed."""
+        fd, tmp_path = self.new_temp_file()
+        with os.fdopen(fd, "wb") as f:
+            f.write(body)
+        return self.put_file(key, tmp_path, etag=etag, last_serial=last_serial)
+
+    def put_file(
+        self, key: str, tmp_path: str, etag: str | None, last_serial: int
+    ) -> CacheEntry:
+        """Move a fully written temp file (see `new_temp_file`) into the cache."""
+        filename = f"{hashlib.sha256(key.encode('utf-8')).hexdigest()}.json"
+        path = self._body_path(filename)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        size = os.path.getsize(tmp_path)
+        # atomic rename so readers never see a partial body
+        os.replace(tmp_path, path)
+
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries "
+                "(key, filename, etag, last_serial, fetched_at, last_access, size) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, filename, etag, last_serial, now, now, size),
+            )
+            self._evict(keep=key)
+        return CacheEntry(
+            key=key,
+            path=path,
+            etag=etag,
+            last_serial=last_serial,
+            fetched_at=now,
+            size=size,
+        )
+
+    def touch(self, key: str, etag: str | None = None) -> CacheEntry | None:
+        """Mark an entry as revalidated (e.g. after a 304) and return it."""
+        with self._lock:
+            if etag:
+                self._conn.execute(
+                    "UPDATE entries SET fetched_at = ?, etag = ? WHERE key = ?",
+                    (time.time(), etag, key),
+                )
+            else:
+                self._conn.execute(
+                    "UPDATE entries SET fetched_at = ? WHERE key = ?",
+                    (time.time(), key),
+                )
+        return self.get(key)
+
+    def package_entries(
+        self, namespace: str, names: Iterable[str]
+    ) -> dict[str, list[CacheEntry]]:
+        """
+        Return the cached entries of packages, without counting as accesses.
+
+        The entries of a package are its JSON document, its simple API page
+        and its version documents. Their keys are ranges of the primary key,
+        so a batch of packages is one indexed query, not a scan per package.
+
+        Args:
+            namespace (str): Key prefix (without the trailing `/`) of the index.
+            names (Iterable[str]): Normalized package names.
+        Returns:
+            Dict[str, List[CacheEntry]]: Package name -> its cached entries,
+                for the packages that have any.
+        """
+        names = sorted(set(names))
+        found: dict[str, list[CacheEntry]] = {}
+        for start in range(0, len(names), _PACKAGE_BATCH):
+            batch = names[start : start + _PACKAGE_BATCH]
+            params = []
+            for name in batch:
+                prefix = f"{namespace}/{name}"
+                # the versions are the keys from `prefix/` to `prefix0`,
+                # '0' being the character after '/'
+                params += [
+                    prefix,
+                    f"{namespace}/simple/{name}",
+                    f"{prefix}/",
+                    f"{prefix}0",
+                ]
+            where = " OR ".join(
+                ["(key IN (?, ?) OR (key >= ? AND key < ?))"] * len(batch)
+            )
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT key, filename, etag, last_serial, fetched_at, size "
+                    f"FROM entries WHERE {where}",
+                    params,
+                ).fetchall()
+            in_batch = set(batch)
+            for row in rows:
+                entry = self._to_entry(row)
+                first, _, rest = entry.key[len(namespace) + 1 :].partition("/")
+                if first in in_batch:
+                    found.setdefault(first, []).append(entry)
+                if first == "simple" and rest in in_batch:
+                    found.setdefault(rest, []).append(entry)
+        return found
+
+    def peek(self, key: str) -> CacheEntry | None:
+        """Like `get`, but without counting as an access for the LRU."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT key, filename, etag, last_serial, fetched_at, size "
+                "FROM entries WHERE key = ?",
+                (key,),
+            ).fetchone()
+        return self._to_entry(row) if row is not None else None
+
+    def mark_stale(self, key: str) -> None:
+        """Force the next lookup of `key` to revalidate it with the index."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE entries SET fetched_at = 0 WHERE key = ?", (key,)
+            )
+
+    def mark_synced(self, namespace: str, since: float, until: float) -> None:
+        """Record that a change feed keeps `namespace` in sync.
+
+        Args:
+            namespace (str): Key prefix (without the trailing `/`) covered.
+            since (float): Timestamp the feed started following changes at.
+            until (float): Timestamp the sync is trusted until, extended on
+                every successful poll of the feed.
+        """
+        with self._lock:
+            self._synced[namespace] = (since, until)
+
+    def clear_synced(self, namespace: str) -> None:
+        with self._lock:
+            self._synced.pop(namespace, None)
+
+    def is_synced(self, entry: CacheEntry) -> bool:
+        """Check if a change feed vouches for the entry being up to date."""
+        namespace = entry.key.split("/", 1)[0]
+        with self._lock:
+            since, until = self._synced.get(namespace, (None, 0.0))
+        return since is not None and entry.fetched_at >= since and time.time() < until
+
+    def get_state(self, name: str) -> str | None:
+        """Read a persisted bookkeeping value, e.g. the change feed position."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM state WHERE name = ?", (name,)
+            ).fetchone()
+        return row[0] if row is not None else None
+
+    def set_state(self, name: str, value: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO state (name, value) VALUES (?, ?)",
+                (name, value),
+            )
+
+    def invalidate(self, key: str) -> None:
+        """Drop an entry and its body."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT filename FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+        if row is not None:
+            self._body_path(row[0]).unlink(missing_ok=True)
+
+    def total_size(self) -> int:
+        with self._lock:
+            (total,) = self._conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+        return total
+
+    def _evict(self, keep: str | None = None) -> None:
+        """
+        Remove least recently used entries until the cache fits. Needs the lock.
+
+        Args:
+            keep (str, optional): Key never evicted, the one just stored: its
+                entry is handed to the caller. A body larger than the whole
+                cache stays until the next insert.
+        """
+        (total,) = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM entries"
+        ).fetchone()
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute(
+            "SELECT key, filename, size FROM entries WHERE key IS NOT ? "
+            "ORDER BY last_access ASC",
+            (keep,),
+        ).fetchall()
+        for key, filename, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._body_path(filename).unlink(missing_ok=True)
+            total -= size
+            logger.info(f"Evicted {key} from the PyPI cache.")
+
+
+_cache: PyPICache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_pypi_cache() -> PyPICache:
+    """Return the process-wide PyPI metadata cache."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = PyPICache(
+                root=CACHE_DIR / "pypi",
+                max_bytes=PYPI_CACHE_MAX_MB * 1024 * 1024,
+                ttl=PYPI_CACHE_TTL,
+            )
+        return _cache
@@ -0,0 +1,411 @@
+import functools
+import json
+import logging
+import sys
+import threading
+from array import array
+from collections import OrderedDict
+from collections.abc import Iterable
+from pathlib import Path
+
+from packaging.version import Version
+
+from src.upgrade_advisor.config import (
+    PYPI_INDEX_MAX_PACKAGES,
+    PYPI_INDEX_MAX_RELEASES,
+    PYPI_STREAM_PARSE_KB,
+)
+from src.upgrade_advisor.schema import (
+    PackageInfoSchema,
+    PackageReleaseSchema,
+    PackageSearchResponseSchema,
+)
+
+from .json_stream import iter_file_chunks, iter_pypi_document
+from .parse_response import (
+    LatestReleases,
+    build_search_response,
+    parse_response_pypi_search,
+    parse_response_pypi_search_stream,
+)
+from .pypi_cache import CacheEntry
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+logger.addHandler(logging.StreamHandler())
+
+# info fields kept in memory, `description` is loaded lazily from disk
+_INFO_FIELDS = (
+    "name",
+    "version",
+    "author",
+    "author_email",
+    "home_page",
+    "requires_python",
+    "requires_dist",
+    "summary",
+    "keywords",
+    "project_urls",
+)
+_PRERELEASE = 1
+# descriptions kept around for the packages queried most recently
+_DESCRIPTION_CACHE_SIZE = 256
+
+
+def _intern(value: str | None) -> str | None:
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def load_info(path: Path) -> dict:
+    """Read only the `info` member of a cached PyPI document.
+
+    `info` comes first in PyPI documents, so the releases are never parsed.
+    """
+    for key, value in iter_pypi_document(iter_file_chunks(path)):
+        if key == "info":
+            return value or {}
+    return {}
+
+
+@functools.lru_cache(maxsize=_DESCRIPTION_CACHE_SIZE)
+def _load_description(path: Path, stamp: tuple) -> str | None:
+    # `stamp` is only part of the cache key: a rewritten document misses
+    return load_info(path).get("description")
+
+
+class ReleaseFile:
+    """Compact record of a single release file."""
+
+    __slots__ = ("python_version", "requires_python", "upload_time", "url", "yanked")
+
+    def __init__(self, data: dict):
+        self.url = data.get("url")
+        self.upload_time = data.get("upload_time")
+        self.python_version = _intern(data.get("python_version"))
+        self.requires_python = _intern(data.get("requires_python"))
+        self.yanked = bool(data.get("yanked", False))
+
+    def to_dict(self) -> dict:
+        return {
+            "upload_time": self.upload_time,
+            "python_version": self.python_version,
+            "url": self.url,
+            # the filename is always the last segment of the URL
+            "filename": self.url.rsplit("/", 1)[-1] if self.url else None,
+            "requires_python": self.requires_python,
+            "yanked": self.yanked,
+        }
+
+
+def _representative_files(files: list) -> tuple[ReleaseFile, ...]:
+    """Keep the first file for every distinct (requires_python, yanked) pair.
+
+    Release filters only look at these two fields, so the first file that
+    survives a filter is always among the kept ones, and the responses stay
+    identical to the ones built from the full file list.
+    """
+    kept = {}
+    for file in files:
+        key = (file.get("requires_python"), bool(file.get("yanked", False)))
+        if key not in kept:
+            kept[key] = ReleaseFile(file)
+    return tuple(kept.values())
+
+
+class CompactPackage:
+    """Memory-lean view of a package document with its newest releases.
+
+    Releases are sorted by parsed version. Their version strings are packed
+    in one ASCII buffer indexed by an offsets array, and the parsed form
+    queries need (the pre-release flag) is kept in a parallel byte array;
+    the strings themselves are kept as PyPI spells them, which is not
+    always the normalized form. Only the newest `PYPI_INDEX_MAX_RELEASES`
+    releases are kept; `truncated` tells whether older ones exist on disk.
+    The long `description` is not kept in the record: it is read from the
+    cached document when a response is built, and the most recent ones are
+    cached by document stamp.
+    """
+
+    __slots__ = (
+        "_offsets",
+        "_version_text",
+        "files",
+        "flags",
+        "info",
+        "last_serial",
+        "name",
+        "path",
+        "stamp",
+        "truncated",
+    )
+
+    def __init__(
+        self,
+        entry: CacheEntry,
+        stamp: tuple,
+        info: dict,
+        last_serial: int,
+        releases: dict,
+        truncated: bool,
+    ):
+        self.name = sys.intern(entry.key)
+        self.stamp = stamp
+        self.path = entry.path
+        self.last_serial = last_serial
+        self.info = tuple(self._compact_info_value(info.get(f)) for f in _INFO_FIELDS)
+        # PEP 440 versions, the only ones kept, are plain ASCII
+        self._version_text = "".join(releases).encode("ascii")
+        self._offsets = array("I", [0])
+        for version in releases:
+            self._offsets.append(self._offsets[-1] + len(version))
+        self.flags = array(
+            "B", (_PRERELEASE if Version(v).is_prerelease else 0 for v in releases)
+        )
+        self.files = tuple(_representative_files(f) for f in releases.values())
+        self.truncated = truncated
+
+    @staticmethod
+    def _compact_info_value(value):
+        if isinstance(value, list):
+            return tuple(_intern(v) for v in value)
+        if isinstance(value, dict):
+            return tuple((_intern(k), v) for k, v in value.items())
+        return _intern(value)
+
+    def __len__(self) -> int:
+        return len(self.flags)
+
+    def version(self, idx: int) -> str:
+        """The version string of the `idx`-th oldest kept release."""
+        start, end = self._offsets[idx], self._offsets[idx + 1]
+        return self._version_text[start:end].decode("ascii")
+
+    def info_dict(self, include_description: bool = True) -> dict:
+        info = {}
+        for field, value in zip(_INFO_FIELDS, self.info):
+            if field == "requires_dist" and value is not None:
+                value = list(value)
+            elif field == "project_urls" and value is not None:
+                value = dict(value)
+            info[field] = value
+        if include_description:
+            info["description"] = _load_description(self.path, self.stamp)
+        return info
+
+    def search_response(
+        self,
+        cutoff: int,
+        include_prereleases: bool = True,
+        include_yanked: bool = True,
+        python_version: str | None = None,
+    ) -> PackageSearchResponseSchema | None:
+        """Build the pydantic search response from the compact records.
+
+        Returns:
+            Optional[PackageSearchResponseSchema]: The response, or None if
+            the kept releases cannot answer the query exactly (the caller
+            then falls back to parsing the full document).
+        """
+        selector = LatestReleases(
+            cutoff,
+            include_prereleases=include_prereleases,
+            include_yanked=include_yanked,
+            python_version=python_version,
+        )
+        # versions are sorted, walk from the newest and stop once we have enough
+        selected = {}
+        for idx in range(len(self) - 1, -1, -1):
+            if 0 < cutoff <= len(selected):
+                break
+            if not include_prereleases and self.flags[idx] & _PRERELEASE:
+                continue
+            files = [f.to_dict() for f in self.files[idx]]
+            kept = selector.filter_files(files)
+            if files and not kept:
+                continue
+            selected[self.version(idx)] = kept
+        if self.truncated and (cutoff <= 0 or len(selected) < cutoff):
+            return None
+
+        releases = {}
+        for version in reversed(list(selected)):
+            files = selected[version]
+            release = files[0] if files else {}
+            releases[version] = PackageReleaseSchema(version=version, **release)
+        return PackageSearchResponseSchema(
+            info=PackageInfoSchema(**self.info_dict()),
+            releases=releases,
+            last_serial=self.last_serial,
+        )
+
+
+def _read_document(path: Path, selectors: Iterable[LatestReleases]) -> tuple[dict, int]:
+    """
+    Stream a cached document once, feeding its releases to every selector.
+
+    Returns:
+        Tuple[dict, int]: The `info` and `last_serial` of the document.
+    """
+    info = {}
+    last_serial = 0
+    for key, value in iter_pypi_document(iter_file_chunks(path)):
+        if key == "info":
+            info = value or {}
+        elif key == "last_serial":
+            last_serial = value or 0
+        elif key == "releases":
+            for selector in selectors:
+                selector.add(*value)
+    return info, last_serial
+
+
+def _compact_package(
+    entry: CacheEntry,
+    stamp: tuple,
+    info: dict,
+    last_serial: int,
+    selector: LatestReleases,
+) -> CompactPackage:
+    releases = selector.releases()
+    return CompactPackage(
+        entry,
+        stamp=stamp,
+        info=info,
+        last_serial=last_serial,
+        releases=releases,
+        # legacy versions are never selected, so they do not count
+        truncated=selector.seen > len(releases),
+    )
+
+
+def build_compact_package(
+    entry: CacheEntry, stamp: tuple, max_releases: int
+) -> CompactPackage:
+    """Parse a cached document incrementally into a CompactPackage."""
+    selector = LatestReleases(max_releases)
+    info, last_serial = _read_document(entry.path, [selector])
+    return _compact_package(entry, stamp, info, last_serial, selector)
+
+
+class ReleaseIndex:
+    """LRU-bounded in-memory index of CompactPackage records.
+
+    Records are tied to the cached document they were built from and are
+    rebuilt when the document on disk changes.
+    """
+
+    def __init__(self, max_packages: int, max_releases: int):
+        self.max_packages = max_packages
+        self.max_releases = max_releases
+        self._packages: OrderedDict[str, CompactPackage] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._packages)
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._packages
+
+    @staticmethod
+    def _stamp(entry: CacheEntry) -> tuple:
+        stat = entry.path.stat()
+        return (stat.st_mtime_ns, stat.st_size, entry.last_serial)
+
+    def _cached(self, entry: CacheEntry, stamp: tuple) -> CompactPackage | None:
+        with self._lock:
+            package = self._packages.get(entry.key)
+            if package is not None and package.stamp == stamp:
+                self._packages.move_to_end(entry.key)
+                return package
+        return None
+
+    def _store(self, package: CompactPackage) -> None:
+        with self._lock:
+            self._packages[package.name] = package
+            self._packages.move_to_end(package.name)
+            while len(self._packages) > self.max_packages:
+                self._packages.popitem(last=False)
+
+    def get(self, entry: CacheEntry) -> CompactPackage:
+        """Return the compact record of a cached document, building it if needed."""
+        stamp = self._stamp(entry)
+        package = self._cached(entry, stamp)
+        if package is None:
+            package = build_compact_package(entry, stamp, self.max_releases)
+            self._store(package)
+        return package
+
+    def search(
+        self,
+        entry: CacheEntry,
+        cutoff: int,
+        include_prereleases: bool = True,
+        include_yanked: bool = True,
+        python_version: str | None = None,
+    ) -> PackageSearchResponseSchema:
+        """
+        Answer a search query on a cached document.
+
+        The compact record answers when it holds enough releases, otherwise
+        the document is parsed for the query. A record that has to be built
+        is built in the same pass, so the document is parsed at most once.
+        Blocking (disk I/O and parsing), run it in a worker thread.
+
+        Returns:
+            PackageSearchResponseSchema: As `parse_response_pypi_search`.
+        """
+        selection = {
+            "cutoff": cutoff,
+            "include_prereleases": include_prereleases,
+            "include_yanked": include_yanked,
+            "python_version": python_version,
+        }
+        stamp = self._stamp(entry)
+        package = self._cached(entry, stamp)
+        if package is None:
+            # one pass builds the record and selects the releases of the query
+            selector = LatestReleases(self.max_releases)
+            query = LatestReleases(
+                cutoff,
+                include_prereleases=include_prereleases,
+                include_yanked=include_yanked,
+                python_version=python_version,
+            )
+            info, last_serial = _read_document(entry.path, [selector, query])
+            package = _compact_package(entry, stamp, info, last_serial, selector)
+            self._store(package)
+            result = package.search_response(**selection)
+            if result is None:
+                result = build_search_response(info, query.releases(), last_serial)
+            return result
+        result = package.search_response(**selection)
+        if result is not None:
+            return result
+        if entry.size > PYPI_STREAM_PARSE_KB * 1024:
+            # large documents (boto3, tensorflow, ...) are parsed incrementally
+            return parse_response_pypi_search_stream(
+                iter_file_chunks(entry.path), **selection
+            )
+        return parse_response_pypi_search(json.loads(entry.read_bytes()), **selection)
+
+    def invalidate(self, keys: Iterable[str]) -> None:
+        with self._lock:
+            for key in keys:
+                self._packages.pop(key, None)
+
+
+_index: ReleaseIndex | None = None
+_index_lock = threading.Lock()
+
+
+def get_release_index() -> ReleaseIndex:
+    """Return the process-wide release index."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = ReleaseIndex(
+                max_packages=PYPI_INDEX_MAX_PACKAGES,
+                max_releases=PYPI_INDEX_MAX_RELEASES,
+            )
+        return _index
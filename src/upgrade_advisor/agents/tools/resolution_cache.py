@@ -0,0 +1,285 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from functools import lru_cache
+
+from packaging.requirements import InvalidRequirement, Requirement
+
+from src.upgrade_advisor.config import (
+    CACHE_DIR,
+    RESOLUTION_CACHE_MAX_MB,
+    RESOLUTION_CACHE_MEMORY_ENTRIES,
+    RESOLUTION_CACHE_TTL,
+)
+
+from .indexes import get_index_config
+from .pypi_cache import normalize_name
+
+try:
+    import tomllib
+except ModuleNotFoundError:  # Python 3.10
+    import tomli as tomllib
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+logger.addHandler(logging.StreamHandler())
+
+
+def _canonical_requirement(requirement: str) -> str:
+    try:
+        req = Requirement(requirement)
+    except InvalidRequirement:
+        return requirement.strip()
+    req.name = normalize_name(req.name)
+    req.extras = set(map(normalize_name, req.extras))
+    return str(req)
+
+
+@lru_cache(maxsize=1024)
+def _canonical_manifest(toml_content: bytes) -> str:
+    return json.dumps(canonical_dependencies(toml_content), sort_keys=True)
+
+
+def canonical_dependencies(toml_content: bytes) -> dict:
+    """
+    Reduce a pyproject.toml to what `uv pip compile` resolves from it.
+
+    Formatting, comments, ordering and name spelling (`Foo_Bar` vs
+    `foo-bar`) do not change the result, so they do not change the
+    fingerprint either. Projects whose dependencies are not static PEP 621
+    metadata (e.g. Poetry's `[tool.poetry]`) are identified by their full
+    content instead.
+
+    Args:
+        toml_content (bytes): Raw content of the pyproject.toml file.
+    Returns:
+        dict: A JSON-serializable, canonical description of the manifest.
+    """
+    try:
+        data = tomllib.loads(toml_content.decode("utf-8"))
+    except (UnicodeDecodeError, tomllib.TOMLDecodeError):
+        data = {}
+    project = data.get("project")
+    if not isinstance(project, dict) or "dependencies" in project.get("dynamic", []):
+        return {"content": hashlib.sha256(toml_content).hexdigest()}
+    return {
+        # the project name shows up in the `via` annotations of the output
+        "name": normalize_name(str(project.get("name", ""))),
+        "requires_python": project.get("requires-python"),
+        "dependencies": sorted(
+            {_canonical_requirement(r) for r in project.get("dependencies", [])}
+        ),
+        # [tool.uv] may carry constraints, overrides and sources
+        "tool_uv": data.get("tool", {}).get("uv"),
+    }
+
+
+def resolution_fingerprint(toml_content: bytes, **settings) -> str:
+    """
+    Content-addressed key of a resolution.
+
+    Args:
+        toml_content (bytes): Raw content of the pyproject.toml file.
+        **settings: Everything else the result depends on, e.g. the
+            resolution strategy, target platform, Python and uv versions.
+    Returns:
+        str: Hex sha256 of the canonical manifest, settings and indexes.
+    """
+    indexes = get_index_config()
+    material = {
+        "settings": settings,
+        # index URLs without credentials, rotating a token keeps the cache
+        "indexes": [index.url for index in indexes.lookup_order],
+    }
+    encoded = json.dumps(material, sort_keys=True, default=str)
+    # the canonical manifest is memoized, parsing TOML dominates otherwise
+    digest = hashlib.sha256(_canonical_manifest(toml_content).encode("utf-8"))
+    digest.update(encoded.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def normalize_snapshot(value: str) -> str:
+    """
+    Normalize an `--exclude-newer` snapshot to a canonical UTC timestamp.
+
+    Equivalent spellings ('2025-06-01', '2025-06-01T00:00:00+00:00') map to
+    the same string, so they share cache entries.
+
+    Args:
+        value (str): An RFC 3339 timestamp, or a date meaning UTC midnight.
+    Returns:
+        str: The snapshot as `YYYY-MM-DDTHH:MM:SSZ`.
+    Raises:
+        ValueError: If the value is not a valid timestamp or date.
+    """
+    text = value.strip()
+    if text.endswith(("Z", "z")):
+        text = f"{text[:-1]}+00:00"
+    try:
+        moment = datetime.fromisoformat(text)
+    except ValueError:
+        raise ValueError(
+            f"Invalid snapshot: {value}. Use a date (2025-06-01) or an RFC 3339 "
+            "timestamp (2025-06-01T12:00:00Z)."
+        ) from None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def is_past_snapshot(snapshot: str | None) -> bool:
+    """Check if a normalized snapshot lies in the past, i.e. can no longer change."""
+    if not snapshot:
+        return False
+    moment = datetime.strptime(snapshot, "%Y-%m-%dT%H:%M:%SZ")
+    return moment.replace(tzinfo=timezone.utc) < datetime.now(timezone.utc)
+
+
+class ResolutionCache:
+    """Persistent cache of resolution results keyed by their fingerprint.
+
+    Results live in a sqlite database shared between processes, with the
+    most recently used ones also kept parsed in an in-process LRU, so a
+    repeated resolution is a dict lookup. Entries older than `ttl` are not
+    served, since new releases can change a resolution, unless they are
+    pinned (resolved at a past `--exclude-newer` snapshot, so they never
+    change). When the stored results exceed `max_bytes` the least recently
+    used ones are evicted, pinned or not.
+    """
+
+    def __init__(self, path, max_bytes: int, ttl: float, memory_entries: int):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.memory_entries = memory_entries
+        self._memory: OrderedDict[str, tuple] = OrderedDict()
+        self._stats = {"hits": 0, "memory_hits": 0, "misses": 0, "evictions": 0}
+        self._lock = threading.Lock()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(
+            str(path), timeout=30, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS resolutions (
+                key TEXT PRIMARY KEY,
+                result TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                size INTEGER NOT NULL
+            )
+            """)
+        # caches created before results could be pinned lack the column
+        columns = self._conn.execute("PRAGMA table_info(resolutions)").fetchall()
+        if "pinned" not in [column[1] for column in columns]:
+            self._conn.execute(
+                "ALTER TABLE resolutions ADD COLUMN pinned INTEGER NOT NULL DEFAULT 0"
+            )
+
+    def get(self, key: str) -> dict | None:
+        """Return the cached result for `key`, None if missing or expired.
+
+        The result is a shallow copy: top-level keys can be set freely, but
+        nested values are shared with the cache and must not be mutated.
+        """
+        now = time.time()
+        with self._lock:
+            item = self._memory.get(key)
+            if item is not None and now < item[0]:
+                self._memory.move_to_end(key)
+                self._stats["hits"] += 1
+                self._stats["memory_hits"] += 1
+                return dict(item[1])
+            row = self._conn.execute(
+                "SELECT result, created_at, pinned FROM resolutions WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is not None:
+                expires_at = float("inf") if row[2] else row[1] + self.ttl
+            if row is None or now >= expires_at:
+                self._memory.pop(key, None)
+                self._stats["misses"] += 1
+                return None
+            self._conn.execute(
+                "UPDATE resolutions SET last_access = ? WHERE key = ?", (now, key)
+            )
+            result = json.loads(row[0])
+            self._remember(key, expires_at, result)
+            self._stats["hits"] += 1
+        return dict(result)
+
+    def put(self, key: str, result: dict, pinned: bool = False) -> None:
+        """Store a resolution result and evict old ones if needed.
+
+        Args:
+            key (str): The resolution fingerprint.
+            result (dict): The result following UVResolutionResultSchema.
+            pinned (bool): The result never changes and does not expire.
+        """
+        encoded = json.dumps(result)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO resolutions "
+                "(key, result, created_at, last_access, size, pinned) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, encoded, now, now, len(encoded), int(pinned)),
+            )
+            expires_at = float("inf") if pinned else now + self.ttl
+            self._remember(key, expires_at, json.loads(encoded))
+            self._evict()
+
+    def stats(self) -> dict:
+        """Hit/miss counters of this process and the size of the cache."""
+        with self._lock:
+            entries, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM resolutions"
+            ).fetchone()
+            return {**self._stats, "entries": entries, "bytes": total}
+
+    def _remember(self, key: str, expires_at: float, result: dict) -> None:
+        """Keep a result in the in-memory LRU. Needs the lock."""
+        self._memory[key] = (expires_at, result)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _evict(self) -> None:
+        """Remove least recently used results until the cache fits. Needs the lock."""
+        (total,) = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM resolutions"
+        ).fetchone()
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute(
+            "SELECT key, size FROM resolutions ORDER BY last_access ASC"
+        ).fetchall()
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM resolutions WHERE key = ?", (key,))
+            self._memory.pop(key, None)
+            self._stats["evictions"] += 1
+            total -= size
+
+
+_cache: ResolutionCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_resolution_cache() -> ResolutionCache:
+    """Return the process-wide resolution cache."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResolutionCache(
+                path=CACHE_DIR / "resolutions.sqlite3",
+                max_bytes=RESOLUTION_CACHE_MAX_MB * 1024 * 1024,
+                ttl=RESOLUTION_CACHE_TTL,
+                memory_entries=RESOLUTION_CACHE_MEMORY_ENTRIES,
+            )
+        return _cache
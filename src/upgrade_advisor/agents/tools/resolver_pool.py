@@ -0,0 +1,404 @@
+import asyncio
+import concurrent.futures
+import logging
+import multiprocessing
+import os
+import shutil
+import signal
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+from src.upgrade_advisor.config import (
+    CACHE_DIR,
+    RESOLVER_POOL_MAX_QUEUE,
+    RESOLVER_POOL_WORKERS,
+    UV_RESOLVE_TIMEOUT,
+)
+from src.upgrade_advisor.const import UV_VERSION
+from src.upgrade_advisor.misc import run_coro_sync
+from src.upgrade_advisor.schema import ResolveResult, UVResolutionResultSchema
+
+from .resolution_cache import get_resolution_cache
+from .uv_resolver import (
+    kill_running_uv,
+    resolve_environment,
+    resolve_environment_async,
+)
+from .uv_toolchain import UVToolchainError, find_uv
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+logger.addHandler(logging.StreamHandler())
+
+# time a worker gets past the deadline to report back after killing uv
+_DEADLINE_GRACE = 5.0
+# least time between two restarts of broken workers
+_RESTART_BACKOFF = 30.0
+# time workers get to exit on shutdown before they are killed
+_SHUTDOWN_GRACE = 2.0
+
+
+class ResolverPoolFullError(RuntimeError):
+    """The resolver pool has too many jobs waiting to accept another one."""
+
+
+def _remove_stale_workspaces() -> None:
+    """Remove the workspaces of pools whose app process is gone."""
+    for path in (CACHE_DIR / "workspaces").glob("*-*"):
+        _, _, pid = path.name.partition("-")
+        try:
+            os.kill(int(pid), 0)
+        except ValueError:
+            continue
+        except ProcessLookupError:
+            shutil.rmtree(path, ignore_errors=True)
+        except PermissionError:
+            # alive, run by another user
+            pass
+
+
+def _terminate_worker(signum, frame) -> None:
+    """Kill the uv processes of a worker told to stop, then exit."""
+    kill_running_uv()
+    os._exit(0)
+
+
+def _init_worker(workspaces: str) -> None:
+    """Prepare a worker process before it runs any job."""
+    # a private workspace for the temp dirs of the resolutions, removed
+    # with the pool's directory on shutdown
+    workspace = Path(workspaces) / f"worker-{os.getpid()}"
+    shutil.rmtree(workspace, ignore_errors=True)
+    workspace.mkdir(parents=True)
+    tempfile.tempdir = str(workspace)
+    # uv runs in sessions of its own, out of reach of the signals the
+    # worker gets
+    signal.signal(signal.SIGTERM, _terminate_worker)
+    # locate (or install) uv and open the caches once, not per job; an
+    # initializer raising breaks the whole pool, so a missing uv is left
+    # for the jobs to report
+    try:
+        find_uv()
+    except UVToolchainError as e:
+        logger.error(f"Resolver worker started without uv: {e!s}")
+    get_resolution_cache()
+
+
+def _run_job(kwargs: dict, deadline: float) -> tuple:
+    """Run one resolution in a worker, within what is left of its deadline."""
+    started = time.time()
+    remaining = deadline - started
+    if remaining <= 0:
+        result = _errored_result(
+            kwargs, "Resolution deadline exceeded while waiting for a worker."
+        )
+    else:
+        result = resolve_environment(**kwargs, timeout=remaining)
+    return result, started, time.time()
+
+
+def _errored_result(kwargs: dict, message: str) -> dict:
+    return UVResolutionResultSchema(
+        python_version=kwargs.get("python_version", "3.10"),
+        uv_version=UV_VERSION,
+        output=ResolveResult(deps={}).model_dump(),
+        errored=True,
+        logs=message,
+    ).model_dump()
+
+
+def _percentile(values: list, q: float) -> float | None:
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+class ResolverPool:
+    """A pool of long-lived worker processes running uv resolutions.
+
+    Workers are started once, with uv located, the caches opened and a
+    private temp workspace each, and then take jobs from a shared queue.
+    At most `max_queue` jobs wait for a free worker; beyond that `resolve`
+    fails fast with `ResolverPoolFullError` instead of piling up work. A
+    job counts against that limit until its worker is done with it, even
+    if the caller stopped waiting.
+    Every job has a deadline covering both the wait and the resolution:
+    a job still queued at its deadline is dropped by the worker that picks
+    it up, and a running one has uv killed.
+    If a worker dies (e.g. killed for memory), the pool is restarted, at
+    most once every `_RESTART_BACKOFF` seconds; jobs run in the app
+    process meanwhile.
+    """
+
+    def __init__(
+        self,
+        workers: int = RESOLVER_POOL_WORKERS,
+        max_queue: int = RESOLVER_POOL_MAX_QUEUE,
+        deadline: float = UV_RESOLVE_TIMEOUT,
+    ):
+        self.workers = max(1, workers)
+        self.max_queue = max_queue
+        self.deadline = deadline
+        # the workspaces of the workers, one directory per pool
+        self._workspaces = CACHE_DIR / "workspaces" / f"pool-{os.getpid()}"
+        _remove_stale_workspaces()
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._counters = {
+            "completed": 0,
+            "errored": 0,
+            "rejected": 0,
+            "expired": 0,
+            "restarts": 0,
+            "in_process": 0,
+        }
+        # (queue wait, run time) of the most recent jobs
+        self._latencies: deque[tuple] = deque(maxlen=1000)
+        self._broken_since: float | None = None
+        self._closed = False
+        self._executor = self._start_executor()
+
+    def _start_executor(self) -> ProcessPoolExecutor:
+        # spawn: the app process runs threads (event loops) that fork would copy
+        executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(str(self._workspaces),),
+        )
+        # workers are started on demand, start them all now so the first
+        # jobs do not pay for spawning and initializing them
+        self._warmup = [executor.submit(os.getpid) for _ in range(self.workers)]
+        return executor
+
+    def _executor_or_none(self) -> ProcessPoolExecutor | None:
+        """The executor, restarted if broken, None while backing off."""
+        with self._lock:
+            if self._broken_since is None:
+                return self._executor
+            if time.monotonic() - self._broken_since < _RESTART_BACKOFF:
+                return None
+            broken, self._broken_since = self._executor, None
+            self._counters["restarts"] += 1
+            self._executor = self._start_executor()
+            executor = self._executor
+        logger.info("Restarted the resolver workers.")
+        broken.shutdown(wait=False, cancel_futures=True)
+        return executor
+
+    def _mark_broken(self, executor: ProcessPoolExecutor) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            if executor is self._executor and self._broken_since is None:
+                logger.error("A resolver worker died, resolving in the app for now.")
+                self._broken_since = time.monotonic()
+
+    def _job_done(self, future: concurrent.futures.Future) -> None:
+        with self._lock:
+            self._pending -= 1
+
+    async def resolve(self, deadline: float | None = None, **kwargs) -> dict:
+        """
+        Resolve in a worker process.
+
+        Args:
+            deadline (float, optional): Seconds the job may take, including
+                the wait for a worker. Defaults to the pool's deadline.
+            **kwargs: Arguments of `resolve_environment`.
+        Returns:
+            dict: The resolution result following UVResolutionResultSchema.
+        Raises:
+            ResolverPoolFullError: If `max_queue` jobs are already waiting.
+        """
+        timeout = self.deadline if deadline is None else deadline
+        if self._closed:
+            return _errored_result(kwargs, "The resolver service is stopped.")
+        executor = self._executor_or_none()
+        if executor is None:
+            return await self._resolve_in_process(kwargs, timeout)
+        with self._lock:
+            if self._pending >= self.workers + self.max_queue:
+                self._counters["rejected"] += 1
+                raise ResolverPoolFullError(
+                    f"{self._pending} resolutions are in progress or queued, "
+                    "try again later."
+                )
+            self._pending += 1
+        submitted = time.time()
+        try:
+            future = executor.submit(_run_job, kwargs, submitted + timeout)
+        except (BrokenProcessPool, RuntimeError):
+            # broken, or shut down by a concurrent restart
+            with self._lock:
+                self._pending -= 1
+            self._mark_broken(executor)
+            return await self._resolve_in_process(kwargs, timeout)
+        # in flight until the worker is done, not until the caller gives up
+        # (giving up only cancels a job that is still queued)
+        future.add_done_callback(self._job_done)
+        try:
+            result, started, finished = await asyncio.wait_for(
+                asyncio.wrap_future(future), timeout + _DEADLINE_GRACE
+            )
+        except asyncio.TimeoutError:
+            with self._lock:
+                self._counters["expired"] += 1
+            return _errored_result(
+                kwargs, "Resolution deadline exceeded while resolving."
+            )
+        except BrokenProcessPool:
+            self._mark_broken(executor)
+            return await self._resolve_in_process(
+                kwargs, submitted + timeout - time.time()
+            )
+        with self._lock:
+            self._counters["completed"] += 1
+            self._counters["errored"] += int(result.get("errored", False))
+            self._latencies.append((started - submitted, finished - started))
+        return result
+
+    async def _resolve_in_process(self, kwargs: dict, timeout: float) -> dict:
+        if self._closed:
+            return _errored_result(kwargs, "The resolver service was stopped.")
+        with self._lock:
+            self._counters["in_process"] += 1
+        if timeout <= 0:
+            return _errored_result(kwargs, "Resolution deadline exceeded.")
+        return await resolve_environment_async(**kwargs, timeout=timeout)
+
+    def wait_ready(self, timeout: float | None = None) -> None:
+        """Block until the workers started with the pool are initialized."""
+        concurrent.futures.wait(self._warmup, timeout=timeout)
+
+    def stats(self) -> dict:
+        """Queue depth, job counters and latency percentiles (seconds)."""
+        with self._lock:
+            waits = [wait for wait, _ in self._latencies]
+            runs = [run for _, run in self._latencies]
+            return {
+                "workers": self.workers,
+                "in_progress": min(self._pending, self.workers),
+                "queue_depth": max(0, self._pending - self.workers),
+                **self._counters,
+                "queue_wait_p50": _percentile(waits, 0.5),
+                "queue_wait_p95": _percentile(waits, 0.95),
+                "run_time_p50": _percentile(runs, 0.5),
+                "run_time_p95": _percentile(runs, 0.95),
+            }
+
+    def shutdown(self) -> None:
+        """
+        Stop the workers: queued jobs are dropped, running ones have uv
+        killed, and the workspaces are removed.
+        """
+        self._closed = True
+        executor = self._executor
+        # the processes are only known to the executor
+        processes = list((getattr(executor, "_processes", None) or {}).values())
+        executor.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        for process in processes:
+            process.join(_SHUTDOWN_GRACE)
+            if process.is_alive():
+                process.kill()
+        shutil.rmtree(self._workspaces, ignore_errors=True)
+
+
+_pool: ResolverPool | None = None
+_pool_lock = threading.Lock()
+
+
+def start_resolver_pool() -> bool:
+    """
+    Start the resolver service if `RESOLVER_POOL_WORKERS` is set.
+
+    Returns:
+        bool: Whether resolutions run in the pool.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None and RESOLVER_POOL_WORKERS > 0:
+            _pool = ResolverPool()
+            logger.info(f"Started {_pool.workers} resolver workers.")
+        return _pool is not None
+
+
+def stop_resolver_pool() -> None:
+    """Stop the resolver service, if running."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
+
+
+def get_resolver_pool() -> ResolverPool | None:
+    """Return the running resolver service, None if resolutions run in-process."""
+    return _pool
+
+
+async def resolve_with_pool_async(**kwargs) -> dict:
+    """
+    Resolve in the resolver service if it runs, in this process otherwise.
+
+    Args:
+        **kwargs: Arguments of `resolve_environment`.
+    Returns:
+        dict: The resolution result following UVResolutionResultSchema.
+    """
+    pool = get_resolver_pool()
+    if pool is None:
+        return await resolve_environment_async(**kwargs)
+    try:
+        return await pool.resolve(**kwargs)
+    except ResolverPoolFullError as e:
+        return _errored_result(kwargs, str(e))
+
+
+def resolve_with_pool(**kwargs) -> dict:
+    """Blocking wrapper around `resolve_with_pool_async`."""
+    if get_resolver_pool() is None:
+        return resolve_environment(**kwargs)
+    return run_coro_sync(resolve_with_pool_async(**kwargs))
+
+
+if __name__ == "__main__":
+    # Load test: python -m src.upgrade_advisor.agents.tools.resolver_pool
+    import argparse
+    import itertools
+
+    parser = argparse.ArgumentParser(description="Load test the resolver pool.")
+    parser.add_argument("toml_file")
+    parser.add_argument("--jobs", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--max-queue", type=int, default=RESOLVER_POOL_MAX_QUEUE)
+    parser.add_argument("--deadline", type=float, default=UV_RESOLVE_TIMEOUT)
+    parser.add_argument("--python-versions", default="3.10,3.11,3.12,3.13")
+    args = parser.parse_args()
+
+    async def load_test() -> None:
+        pool = ResolverPool(args.workers, args.max_queue, args.deadline)
+        pool.wait_ready()
+        versions = itertools.cycle(args.python_versions.split(","))
+        jobs = [
+            pool.resolve(toml_file=args.toml_file, python_version=next(versions))
+            for _ in range(args.jobs)
+        ]
+        started = time.perf_counter()
+        results = await asyncio.gather(*jobs, return_exceptions=True)
+        elapsed = time.perf_counter() - started
+        rejected = sum(isinstance(r, ResolverPoolFullError) for r in results)
+        print(f"{args.jobs} jobs in {elapsed:.2f}s, {rejected} rejected")
+        print(pool.stats())
+        pool.shutdown()
+
+    asyncio.run(load_test())
@@ -0,0 +1,324 @@
+import hashlib
+import json
+from email.parser import BytesParser
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+
+import httpx
+from packaging.utils import (
+    InvalidSdistFilename,
+    InvalidWheelFilename,
+    parse_sdist_filename,
+    parse_wheel_filename,
+)
+from packaging.version import InvalidVersion, Version
+
+from src.upgrade_advisor.config import PYPI_BATCH_CONCURRENCY
+from src.upgrade_advisor.schema import CoreMetadataSchema, ErrorResponseSchema
+
+from .http_client import get_http_client
+from .indexes import PackageIndex
+from .parse_response import LatestReleases
+from .pypi_api import (
+    LookupFailedError,
+    fetch_from_indexes,
+    gather_bounded,
+    invalid_package_name_error,
+    invalid_version_error,
+    pypi_search_version,
+)
+from .pypi_cache import get_pypi_cache, normalize_name
+
+# PEP 691 JSON flavor first, the PEP 503 HTML page for indexes without it
+SIMPLE_API_ACCEPT = (
+    "application/vnd.pypi.simple.v1+json, "
+    "application/vnd.pypi.simple.v1+html;q=0.2, text/html;q=0.01"
+)
+
+
+class _SimpleHTMLParser(HTMLParser):
+    """Collect the file links of a PEP 503 project page into PEP 691 dicts."""
+
+    def __init__(self):
+        super().__init__()
+        self.files: list[dict] = []
+        self._current: dict | None = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag != "a":
+            return
+        attrs = dict(attrs)
+        href = attrs.get("href")
+        if not href:
+            return
+        url, _, fragment = href.partition("#")
+        algorithm, _, digest = fragment.partition("=")
+        metadata = attrs.get("data-core-metadata", attrs.get("data-dist-info-metadata"))
+        self._current = {
+            "filename": "",
+            "url": url,
+            "hashes": {algorithm: digest} if digest else {},
+            "requires-python": attrs.get("data-requires-python"),
+            "yanked": "data-yanked" in attrs,
+            "core-metadata": _parse_metadata_attribute(metadata),
+        }
+
+    def handle_data(self, data):
+        if self._current is not None:
+            self._current["filename"] += data
+
+    def handle_endtag(self, tag):
+        if tag == "a" and self._current is not None:
+            file = self._current
+            file["filename"] = (
+                file["filename"].strip() or file["url"].rsplit("/", 1)[-1]
+            )
+            self.files.append(file)
+            self._current = None
+
+
+def _parse_metadata_attribute(value: str | None) -> bool | dict:
+    """Parse a `data-core-metadata` attribute: absent, 'true' or '<algo>=<digest>'."""
+    if value is None:
+        return False
+    algorithm, _, digest = value.partition("=")
+    return {algorithm: digest} if digest else True
+
+
+def parse_simple_project(body: bytes, base_url: str) -> dict:
+    """
+    Parse a simple API project page in PEP 691 JSON or PEP 503 HTML form.
+
+    Args:
+        body (bytes): The raw response body.
+        base_url (str): URL of the project page, to resolve relative file URLs.
+    Returns:
+        dict: The project in PEP 691 form, with a `files` list whose entries
+              have absolute URLs.
+    """
+    if body.lstrip()[:1] == b"{":
+        project = json.loads(body)
+    else:
+        parser = _SimpleHTMLParser()
+        parser.feed(body.decode("utf-8", errors="replace"))
+        parser.close()
+        project = {"files": parser.files}
+    for file in project.get("files", []):
+        file["url"] = urljoin(base_url, file["url"])
+        # `dist-info-metadata` is the name used before PEP 714
+        if "core-metadata" not in file:
+            file["core-metadata"] = file.get("dist-info-metadata", False)
+    return project
+
+
+def file_version(filename: str) -> str | None:
+    """Get the version of a wheel or sdist from its filename, None if unknown."""
+    try:
+        if filename.endswith(".whl"):
+            return str(parse_wheel_filename(filename)[1])
+        return str(parse_sdist_filename(filename)[1])
+    except (InvalidWheelFilename, InvalidSdistFilename):
+        return None
+
+
+def group_files_by_version(project: dict) -> dict[str, list[dict]]:
+    """Group the files of a simple API project by release version."""
+    releases: dict[str, list[dict]] = {}
+    for file in project.get("files", []):
+        version = file_version(file.get("filename", ""))
+        if version is not None:
+            releases.setdefault(version, []).append(file)
+    return releases
+
+
+async def fetch_simple_project(package: str) -> tuple[dict, PackageIndex]:
+    """
+    Fetch the simple API project page of a package (PEP 691, or PEP 503 HTML)
+    from the first configured index that has it.
+
+    Args:
+        package (str): Name of the package.
+    Returns:
+        Tuple[dict, PackageIndex]: The project in PEP 691 form (see
+            `parse_simple_project`) and the index serving it.
+    Raises:
+        LookupFailedError: If no index knows the package.
+        httpx.HTTPError: If the request fails.
+    """
+    name = normalize_name(package)
+
+    def project_url(index: PackageIndex) -> str:
+        return f"{index.url}/{name}/"
+
+    entry, index = await fetch_from_indexes(
+        project_url, f"simple/{name}", accept=SIMPLE_API_ACCEPT
+    )
+    return parse_simple_project(entry.read_bytes(), project_url(index)), index
+
+
+def _metadata_file(files: list[dict]) -> dict | None:
+    """Pick the release file whose PEP 658 metadata will be fetched."""
+    candidates = [f for f in files if f.get("core-metadata") and not f.get("yanked")]
+    candidates = candidates or [f for f in files if f.get("core-metadata")]
+    # wheels carry static metadata, sdist metadata may be incomplete
+    wheels = [f for f in candidates if f["filename"].endswith(".whl")]
+    return (wheels or candidates or [None])[0]
+
+
+async def fetch_core_metadata(file: dict, index: PackageIndex) -> bytes:
+    """
+    Download (or read from the cache) the PEP 658 `.metadata` file of a release file.
+
+    Metadata files are immutable, so cached copies never need revalidation.
+    The advertised hash is checked when present.
+
+    Args:
+        file (dict): A PEP 691 file entry with `core-metadata` set.
+        index (PackageIndex): The index that listed the file.
+    Returns:
+        bytes: The raw core metadata (RFC 822 style).
+    Raises:
+        ValueError: If the downloaded metadata does not match its hash.
+        httpx.HTTPError: If the request fails.
+    """
+    cache = get_pypi_cache()
+    cache_key = f"{index.namespace}/metadata/{file['filename']}"
+    entry = cache.get(cache_key)
+    if entry is not None:
+        return entry.read_bytes()
+
+    url = f"{file['url']}.metadata"
+    response = await get_http_client(index.name).get(url, auth=index.auth_for(url))
+    response.raise_for_status()
+    body = response.content
+    hashes = file["core-metadata"] if isinstance(file["core-metadata"], dict) else {}
+    expected = hashes.get("sha256")
+    if expected and hashlib.sha256(body).hexdigest() != expected:
+        raise ValueError(f"Hash mismatch for the metadata of {file['filename']}.")
+    cache.put(cache_key, body, etag=None, last_serial=0)
+    return body
+
+
+def parse_core_metadata(data: bytes, source: str) -> CoreMetadataSchema:
+    """Parse raw core metadata into a CoreMetadataSchema."""
+    message = BytesParser().parsebytes(data, headersonly=True)
+    return CoreMetadataSchema(
+        name=message.get("Name", ""),
+        version=message.get("Version", ""),
+        requires_python=message.get("Requires-Python"),
+        requires_dist=message.get_all("Requires-Dist") or [],
+        provides_extra=message.get_all("Provides-Extra") or [],
+        source=source,
+    )
+
+
+async def _release_core_metadata(
+    package: str, version: str, files: list[dict], index: PackageIndex
+) -> dict:
+    """Get the core metadata of one release, falling back to the JSON API."""
+    file = _metadata_file(files)
+    if file is not None:
+        try:
+            data = await fetch_core_metadata(file, index)
+        except httpx.HTTPStatusError:
+            # advertised but not served (e.g. a partial mirror), use the JSON API
+            data = None
+        if data is not None:
+            source = f"{file['url']}.metadata"
+            return parse_core_metadata(data, source=source).model_dump()
+
+    # the index does not serve PEP 658 metadata for this release
+    result = await pypi_search_version(package, version, cutoff=1)
+    if result.get("error"):
+        return result
+    info = result["info"]
+    return CoreMetadataSchema(
+        name=info["name"],
+        version=info["version"],
+        requires_python=info.get("requires_python"),
+        requires_dist=info.get("requires_dist") or [],
+        source="json-api",
+    ).model_dump()
+
+
+async def pypi_core_metadata(package: str, version: str) -> dict:
+    """
+    Get the core metadata (dependencies, Python requirement, extras) of one
+    release without downloading the full JSON API document.
+
+    Args:
+        package (str): Name of the package.
+        version (str): Version of the release.
+    Returns:
+        dict: Metadata following CoreMetadataSchema, or an error payload.
+    """
+    if error := invalid_version_error(version):
+        return error
+    version = version.strip()
+    result = await pypi_core_metadata_versions(package, versions=[version])
+    if result.get("error"):
+        return result
+    return result["results"][version]
+
+
+async def pypi_core_metadata_versions(
+    package: str,
+    versions: list[str] | None = None,
+    last_n: int = 10,
+    include_prereleases: bool = True,
+    concurrency: int = PYPI_BATCH_CONCURRENCY,
+) -> dict:
+    """
+    Get the core metadata of many releases of a package concurrently, using
+    the PEP 691 simple API and PEP 658 `.metadata` files.
+
+    Args:
+        package (str): Name of the package.
+        versions (List[str], optional): Versions to look up. Defaults to the
+            newest `last_n` versions.
+        last_n (int): Number of newest versions to look up when `versions`
+            is not given. Defaults to 10.
+        include_prereleases (bool): Consider pre-releases when picking the
+            newest versions. Defaults to True.
+        concurrency (int): Maximum number of concurrent requests.
+    Returns:
+        dict: Per-version metadata or error payloads, following
+              PackageBatchResponseSchema, or an error payload.
+    """
+    if error := invalid_package_name_error(package):
+        return error
+    try:
+        project, index = await fetch_simple_project(package)
+    except LookupFailedError as e:
+        return ErrorResponseSchema(error=str(e)).model_dump()
+    except httpx.HTTPStatusError as e:
+        return ErrorResponseSchema(error=str(e.response.status_code)).model_dump()
+    except httpx.HTTPError as e:
+        return ErrorResponseSchema(error=f"Request failed: {e!s}").model_dump()
+
+    releases = group_files_by_version(project)
+    if versions is None:
+        selector = LatestReleases(last_n, include_prereleases=include_prereleases)
+        for version, files in releases.items():
+            selector.add(version, files)
+        versions = list(reversed(list(selector.releases())))
+
+    # match requested versions by value, so "1.17" finds "1.17.0"
+    by_version = {}
+    for v, files in releases.items():
+        try:
+            by_version[Version(v)] = files
+        except InvalidVersion:
+            continue
+
+    async def lookup(version: str) -> dict:
+        if error := invalid_version_error(version):
+            return error
+        files = by_version.get(Version(version))
+        if files is None:
+            return ErrorResponseSchema(
+                error=f"Version {version} of {package} not found."
+            ).model_dump()
+        return await _release_core_metadata(package, version, files, index)
+
+    return await gather_bounded(versions, lookup, concurrency)
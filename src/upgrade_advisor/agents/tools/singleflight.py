@@ -0,0 +1,83 @@
+import asyncio
+import threading
+import time
+from collections.abc import Awaitable, Callable
+from typing import Generic, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key into one in-flight call.
+
+    The first caller for a key starts the work; callers arriving while it is
+    still running await the same task and get the same result (or
+    exception). Once the task finishes the key is forgotten, so the next
+    call starts a fresh one. A caller being cancelled does not cancel the
+    shared task for the other waiters.
+    """
+
+    def __init__(self):
+        self._inflight: dict[str, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Future) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # mark the exception as retrieved even if every waiter went away
+            task.exception()
+
+
+class TTLCache(Generic[T]):
+    """A small thread-safe in-memory cache whose entries expire after `ttl` seconds."""
+
+    def __init__(self, ttl: float, max_entries: int = 10_000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: dict[str, tuple[float, T]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> T | None:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            return value
+
+    def put(self, key: str, value: T) -> None:
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._purge()
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+
+    def pop(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def _purge(self) -> None:
+        """Drop expired entries, or the oldest half if none expired. Needs the lock."""
+        now = time.monotonic()
+        expired = [
+            key for key, (expires_at, _) in self._entries.items() if expires_at <= now
+        ]
+        if not expired:
+            expired = list(self._entries)[: len(self._entries) // 2 or 1]
+        for key in expired:
+            del self._entries[key]
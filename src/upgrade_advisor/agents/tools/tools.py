@@ -1,32 +1,69 @@
 import logging
 import shutil
 from pathlib import Path
+from typing import ClassVar
 
 from smolagents.tools import Tool
 
 from src.upgrade_advisor.const import ALLOWED_OS, UPLOADS_DIR
 from src.upgrade_advisor.schema import (
+    DependencyQuerySchema,
+    ErrorResponseSchema,
     GithubRepoSchema,
+    ManifestSchema,
+    PackageBatchResponseSchema,
     PackageGitHubandReleasesSchema,
     PackageSearchResponseSchema,
     PackageVersionResponseSchema,
+    ResolutionMatrixSchema,
     UVResolutionResultSchema,
 )
 
 from ...misc import run_coro_sync
+from .conflicts import diagnose_conflict
+from .graph_query import query_dependency_graph
+from .manifest import ManifestError, load_manifest
 from .pypi_api import (
     github_repo_and_releases,
+    github_repo_and_releases_batch,
     pypi_search,
+    pypi_search_batch,
     pypi_search_version,
     resolve_repo_from_url,
 )
-from .uv_resolver import resolve_environment
+from .resolver_pool import resolve_with_pool
+from .simple_api import pypi_core_metadata_versions
+from .uv_resolver import resolve_matrix
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 logger.addHandler(logging.StreamHandler())
 
 
+def _uploaded_path(path: str) -> str:
+    """
+    Resolve a path given by the agent to a file in the uploads directory.
+
+    Args:
+        path (str): Absolute path, or path relative to the uploads directory.
+    Returns:
+        str: The resolved path.
+    Raises:
+        ValueError: If the path is outside the uploads directory.
+    """
+    file_path = Path(path).expanduser()
+    if not file_path.is_absolute():
+        file_path = UPLOADS_DIR / file_path
+    resolved = file_path.resolve()
+    try:
+        resolved.relative_to(UPLOADS_DIR)
+    except ValueError as exc:
+        raise ValueError(
+            f"Refusing to read '{resolved}': not inside uploads directory {UPLOADS_DIR}"
+        ) from exc
+    return str(resolved)
+
+
 class ReadUploadFileTool(Tool):
     """Tool to safely read files saved in the `uploads` directory."""
 
@@ -35,7 +72,7 @@ class ReadUploadFileTool(Tool):
         Read a user-uploaded text file from the uploads directory.
         Input: `path` should be the absolute path you received (or a filename)
         under the `uploads` folder. Returns the file contents as text."""
-    inputs = {
+    inputs: ClassVar[dict] = {
         "path": {
             "type": "string",
             "description": "Absolute or relative path to the uploaded file \
@@ -88,11 +125,10 @@ class WriteTomlFileTool(Tool):
         pyproject.toml file before resolving dependencies.
         Also useful if the user cannot upload files directly or if the uploaded
         file has missing sections or formatting issues.
-        If the user has provided a requirements.txt file instead of a pyproject.toml,
-        this tool can be used to convert the requirements.txt content into a
-        minimal pyproject.toml file. But make sure to follow the PEP621 format.
+        Requirements files do not need to be converted, they can be resolved
+        and parsed directly.
         """
-    inputs = {
+    inputs: ClassVar[dict] = {
         "content": {
             "type": "string",
             "description": "The content of the pyproject.toml file to write.",
@@ -126,24 +162,59 @@ class WriteTomlFileTool(Tool):
         return str(self.temp_dir / "pyproject.toml")
 
 
+class ParseManifestTool(Tool):
+    """Tool to read the dependencies of a pyproject.toml or requirements file."""
+
+    name = "parse_manifest"
+    description = """
+        Read the dependencies declared in a pyproject.toml (PEP 621, Poetry,
+        PDM, dependency groups) or a requirements file (following `-r`/`-c`
+        includes) without any resolution. Poetry constraints like `^1.2` are
+        translated to PEP 440 (`>=1.2,<2`).
+        It returns a dictionary with the schema described in `output_schema` attribute.
+        """
+    inputs: ClassVar[dict] = {
+        "path": {
+            "type": "string",
+            "description": "Absolute path to the pyproject.toml or requirements file.",
+        }
+    }
+    output_schema = ManifestSchema.schema()
+    output_type = "object"
+
+    def __init__(self):
+        super().__init__()
+
+    def forward(self, path: str) -> dict:
+        try:
+            return load_manifest(_uploaded_path(path)).model_dump()
+        except (ManifestError, ValueError) as e:
+            return ErrorResponseSchema(error=str(e)).model_dump()
+
+
 class ResolvePyProjectTOMLTool(Tool):
     """Tool to resolve dependencies from a pyproject.toml file using uv."""
 
     name = "resolve_pyproject_toml"
     description = """Using `uv` resolver, this tool takes a pyproject.toml file
-        and resolves its dependencies according to the specified strategy and
-        environment settings (Python version, platform, etc.). It does not
-        support requirements.txt files. The file needs to be provided as an
-        absolute path.
+        (PEP 621, Poetry or PDM) or a requirements file and resolves its
+        dependencies according to the specified strategy and
+        environment settings (Python version, platform, etc.). The file needs
+        to be provided as an absolute path, or its content directly as
+        `manifest_content` (no need to write it to a file first, e.g. after
+        editing a few dependencies). With `diagnose`, a failed resolution
+        also reports the smallest set of conflicting requirements and the
+        closest versions of each that would resolve (`conflict`).
         It returns a dictionary with the schema described in `output_schema` attribute.
         """
 
     output_schema = UVResolutionResultSchema.schema()
     output_type = "object"
-    inputs = {
+    inputs: ClassVar[dict] = {
         "toml_file": {
             "type": "string",
-            "description": "Absolute path to the pyproject.toml file.",
+            "description": "Absolute path to the pyproject.toml or requirements file. Null if `manifest_content` is given.",
+            "nullable": True,
         },
         "resolution_strategy": {
             "type": "string",
@@ -161,6 +232,36 @@ class ResolvePyProjectTOMLTool(Tool):
             "type": "boolean",
             "description": "Whether to use universal wheels. Defaults to False. Cannot be True if a specific platform/OS is specified.",
         },
+        "exclude_newer": {
+            "type": "string",
+            "description": "Resolve as of this snapshot: only consider files uploaded before this date or RFC 3339 timestamp, e.g. '2025-06-01'. Makes the result reproducible. Defaults to the latest releases.",
+            "nullable": True,
+        },
+        "previous": {
+            "type": "object",
+            "description": "The result of an earlier resolution of this file (before editing it). Its pins are kept where possible, so only the changed packages are re-solved, and the result includes a `pin_diff` against it.",
+            "nullable": True,
+        },
+        "upgrade_packages": {
+            "type": "array",
+            "description": "With `previous`: package names to re-solve even though `previous` pins them, e.g. ['gradio'] to see what upgrading gradio alone changes.",
+            "nullable": True,
+        },
+        "manifest_content": {
+            "type": "string",
+            "description": "Content of the manifest to resolve, instead of `toml_file`.",
+            "nullable": True,
+        },
+        "manifest_format": {
+            "type": "string",
+            "description": "Format of `manifest_content`: 'pyproject' (default) or 'requirements'.",
+            "nullable": True,
+        },
+        "diagnose": {
+            "type": "boolean",
+            "description": "If the resolution fails, find the conflicting requirements and the closest versions that resolve. Runs many resolutions, so only set it to explain a failure.",
+            "nullable": True,
+        },
     }
 
     def __init__(self):
@@ -168,22 +269,185 @@ class ResolvePyProjectTOMLTool(Tool):
 
     def forward(
         self,
-        toml_file: str,
+        toml_file: str | None,
         resolution_strategy: str,
         python_platform: str,
         python_version: str,
         universal: bool,
+        exclude_newer: str | None = None,
+        previous: dict | None = None,
+        upgrade_packages: list | None = None,
+        manifest_content: str | None = None,
+        manifest_format: str | None = None,
+        diagnose: bool | None = None,
     ) -> dict:
-        result = resolve_environment(
-            toml_file=toml_file,
-            resolution_strategy=resolution_strategy,
-            python_platform=python_platform,
-            python_version=python_version,
-            universal=universal,
+        if manifest_content is None and toml_file is not None:
+            try:
+                toml_file = _uploaded_path(toml_file)
+            except ValueError as e:
+                return ErrorResponseSchema(error=str(e)).model_dump()
+        manifest = {
+            "toml_file": None if manifest_content is not None else toml_file,
+            "content": manifest_content,
+            "manifest_format": manifest_format or "pyproject",
+        }
+        settings = {
+            "resolution_strategy": resolution_strategy,
+            "python_platform": python_platform,
+            "python_version": python_version,
+            "universal": universal,
+            "exclude_newer": exclude_newer,
+        }
+        result = resolve_with_pool(
+            **manifest,
+            **settings,
+            previous=previous,
+            upgrade_packages=upgrade_packages,
         )
+        if diagnose and result.get("errored"):
+            result["conflict"] = diagnose_conflict(**manifest, **settings)
         return result
 
 
+class ResolveMatrixTool(Tool):
+    """Tool to resolve a pyproject.toml for many environments at once."""
+
+    name = "resolve_pyproject_toml_matrix"
+    description = """Using `uv` resolver, this tool resolves a pyproject.toml
+        file for every combination of the given Python versions, platforms and
+        resolution strategies in a single call, running the resolutions in
+        parallel. Use it instead of calling `resolve_pyproject_toml` once per
+        combination, e.g. for "does this work on 3.10-3.13 on linux and macOS?".
+        The file needs to be provided as an absolute path, or its content
+        directly as `manifest_content`.
+        It returns a dictionary with the schema described in `output_schema`
+        attribute: a `compatibility` matrix (python version -> 'platform/strategy'
+        -> resolvable), the pins of the `baseline` cell, and per-cell `diff`
+        of the pins against the baseline (or the uv `error` of failed cells).
+        """
+
+    output_schema = ResolutionMatrixSchema.schema()
+    output_type = "object"
+    inputs: ClassVar[dict] = {
+        "toml_file": {
+            "type": "string",
+            "description": "Absolute path to the pyproject.toml or requirements file. Null if `manifest_content` is given.",
+            "nullable": True,
+        },
+        "python_versions": {
+            "type": "array",
+            "description": "Target Python versions, e.g. ['3.10', '3.11', '3.12', '3.13'].",
+        },
+        "python_platforms": {
+            "type": "array",
+            "description": f"Target platforms, each one of the allowed OS values in {ALLOWED_OS}. E.g. ['linux', 'aarch64-apple-darwin'].",
+        },
+        "resolution_strategies": {
+            "type": "array",
+            "description": "Resolution strategies among 'lowest-direct', 'lowest', 'highest'. Defaults to ['highest'].",
+            "nullable": True,
+        },
+        "exclude_newer": {
+            "type": "string",
+            "description": "Resolve as of this snapshot: only consider files uploaded before this date or RFC 3339 timestamp, e.g. '2025-06-01'. Defaults to the latest releases.",
+            "nullable": True,
+        },
+        "manifest_content": {
+            "type": "string",
+            "description": "Content of the manifest to resolve, instead of `toml_file`.",
+            "nullable": True,
+        },
+        "manifest_format": {
+            "type": "string",
+            "description": "Format of `manifest_content`: 'pyproject' (default) or 'requirements'.",
+            "nullable": True,
+        },
+    }
+
+    def __init__(self):
+        super().__init__()
+
+    def forward(
+        self,
+        toml_file: str | None,
+        python_versions: list,
+        python_platforms: list,
+        resolution_strategies: list | None = None,
+        exclude_newer: str | None = None,
+        manifest_content: str | None = None,
+        manifest_format: str | None = None,
+    ) -> dict:
+        if manifest_content is None and toml_file is not None:
+            try:
+                toml_file = _uploaded_path(toml_file)
+            except ValueError as e:
+                return ErrorResponseSchema(error=str(e)).model_dump()
+        result = resolve_matrix(
+            toml_file=None if manifest_content is not None else toml_file,
+            python_versions=python_versions,
+            python_platforms=python_platforms,
+            resolution_strategies=resolution_strategies,
+            exclude_newer=exclude_newer,
+            content=manifest_content,
+            manifest_format=manifest_format or "pyproject",
+        )
+        return result
+
+
+class QueryDependencyGraphTool(Tool):
+    """Tool to answer questions about the dependency graph of a resolution."""
+
+    name = "query_dependency_graph"
+    description = """
+        Answer a targeted question about the dependency graph of a resolution
+        returned by `resolve_pyproject_toml`, instead of reading its whole
+        `output`. Queries:
+        - 'dependents': every package that requires `package`, directly or
+          not, e.g. what may break when bumping numpy.
+        - 'dependencies': every package `package` pulls in.
+        - 'why': the shortest chains of requirements from a direct dependency
+          of the manifest to `package`, i.e. why it is installed.
+        - 'blast_radius': the packages whose pins differ between
+          `resolution` and `other` (e.g. before and after an upgrade), and
+          everything depending on them.
+        It returns a dictionary with the schema described in `output_schema` attribute.
+        """
+    inputs: ClassVar[dict] = {
+        "resolution": {
+            "type": "object",
+            "description": "The result of `resolve_pyproject_toml` (or its `output`).",
+        },
+        "query": {
+            "type": "string",
+            "description": "One of 'dependents', 'dependencies', 'why', 'blast_radius'.",
+        },
+        "package": {
+            "type": "string",
+            "description": "The package the question is about. Not needed for 'blast_radius'.",
+            "nullable": True,
+        },
+        "other": {
+            "type": "object",
+            "description": "For 'blast_radius': the resolution to compare with, e.g. the one after upgrading.",
+            "nullable": True,
+        },
+    }
+    output_schema = DependencyQuerySchema.schema()
+    output_type = "object"
+
+    def __init__(self):
+        super().__init__()
+
+    def forward(
+        self,
+        resolution: dict,
+        query: str,
+        package: str | None = None,
+        other: dict | None = None,
+    ) -> dict:
+        return query_dependency_graph(resolution, query, package=package, other=other)
+
+
 class RepoFromURLTool(Tool):
     """Tool to extract GitHub repository information from a URL."""
 
@@ -193,7 +457,7 @@ class RepoFromURLTool(Tool):
         Returns a dictionary containing the owner and repository name.
         It returns a dictionary with the schema described in `output_schema` attribute.
         """
-    inputs = {
+    inputs: ClassVar[dict] = {
         "url": {
             "type": "string",
             "description": "GitHub repository URL with https:// prefix.",
@@ -219,14 +483,29 @@ class PypiSearchTool(Tool):
         Get metadata about a PyPI package by its name.
         It returns a dictionary with the schema described in `output_schema` attribute.
         """
-    inputs = {
+    inputs: ClassVar[dict] = {
         "package": {
             "type": "string",
             "description": "Name of the package to look up on PyPI.",
         },
         "cutoff": {
             "type": "integer",
-            "description": "The maximum number of releases to include in the response. Defaults to 10.",
+            "description": "The maximum number of newest releases (by version) to include in the response. Defaults to 10.",
+        },
+        "include_prereleases": {
+            "type": "boolean",
+            "description": "Include pre-releases (alpha, beta, rc, dev). Defaults to True.",
+            "nullable": True,
+        },
+        "include_yanked": {
+            "type": "boolean",
+            "description": "Include yanked releases. Defaults to True.",
+            "nullable": True,
+        },
+        "python_version": {
+            "type": "string",
+            "description": "Only include releases that support this Python version, e.g. '3.12'. Defaults to no filtering.",
+            "nullable": True,
         },
     }
     output_type = "object"
@@ -235,8 +514,21 @@ class PypiSearchTool(Tool):
     def __init__(self):
         super().__init__()
 
-    def forward(self, package: str, cutoff: int) -> dict:
-        coro = pypi_search(package, cutoff=cutoff)
+    def forward(
+        self,
+        package: str,
+        cutoff: int,
+        include_prereleases: bool = True,
+        include_yanked: bool = True,
+        python_version: str | None = None,
+    ) -> dict:
+        coro = pypi_search(
+            package,
+            cutoff=cutoff,
+            include_prereleases=include_prereleases is not False,
+            include_yanked=include_yanked is not False,
+            python_version=python_version,
+        )
         result = run_coro_sync(coro)
 
         return result
@@ -250,7 +542,7 @@ class PypiSearchVersionTool(Tool):
         Get metadata about a specific version of a PyPI package. 
         It returns a dictionary with the schema described in `output_schema` attribute.
         """
-    inputs = {
+    inputs: ClassVar[dict] = {
         "package": {
             "type": "string",
             "description": "Name of the package to look up on PyPI.",
@@ -289,7 +581,7 @@ class RepoFromPyPITool(Tool):
         metadata.
         It returns a dictionary with the schema described in `output_schema` attribute.
         """
-    inputs = {
+    inputs: ClassVar[dict] = {
         "package": {
             "type": "string",
             "description": "Name of the PyPI package.",
@@ -310,3 +602,152 @@ class RepoFromPyPITool(Tool):
         result = run_coro_sync(coro)
 
         return result
+
+
+class PypiSearchBatchTool(Tool):
+    """Tool to search PyPI for the metadata of several packages at once."""
+
+    name = "pypi_search_batch"
+    description = """
+        Get metadata about several PyPI packages in a single call. Prefer this
+        over repeated `pypi_search` calls when more than one package is
+        involved (e.g. all packages of a requirements file).
+        Each entry is either a package name or `name==version` to get the
+        metadata of that specific version.
+        It returns a dictionary with the schema described in `output_schema`
+        attribute, where each result follows the `pypi_search` (or
+        `pypi_search_version`) output, or holds an `error` key.
+        """
+    inputs: ClassVar[dict] = {
+        "packages": {
+            "type": "array",
+            "description": "List of package names (optionally `name==version`) to look up on PyPI.",
+        },
+        "cutoff": {
+            "type": "integer",
+            "description": "The maximum number of newest releases (by version) to include per package. Defaults to 10.",
+        },
+        "include_prereleases": {
+            "type": "boolean",
+            "description": "Include pre-releases (alpha, beta, rc, dev). Defaults to True.",
+            "nullable": True,
+        },
+        "include_yanked": {
+            "type": "boolean",
+            "description": "Include yanked releases. Defaults to True.",
+            "nullable": True,
+        },
+        "python_version": {
+            "type": "string",
+            "description": "Only include releases that support this Python version, e.g. '3.12'. Defaults to no filtering.",
+            "nullable": True,
+        },
+    }
+    output_type = "object"
+    output_schema = PackageBatchResponseSchema.schema()
+
+    def __init__(self):
+        super().__init__()
+
+    def forward(
+        self,
+        packages: list,
+        cutoff: int,
+        include_prereleases: bool = True,
+        include_yanked: bool = True,
+        python_version: str | None = None,
+    ) -> dict:
+        coro = pypi_search_batch(
+            packages,
+            cutoff=cutoff,
+            include_prereleases=include_prereleases is not False,
+            include_yanked=include_yanked is not False,
+            python_version=python_version,
+        )
+        result = run_coro_sync(coro)
+
+        return result
+
+
+class RepoFromPyPIBatchTool(Tool):
+    """Tool to extract GitHub repository information for several PyPI packages."""
+
+    name = "repo_from_pypi_batch"
+    description = """
+        Extract GitHub repository information and the releases published to
+        PyPI for several packages in a single call. Prefer this over repeated
+        `repo_from_pypi` calls when more than one package is involved.
+        It returns a dictionary with the schema described in `output_schema`
+        attribute, where each result follows the `repo_from_pypi` output, or
+        holds an `error` key.
+        """
+    inputs: ClassVar[dict] = {
+        "packages": {
+            "type": "array",
+            "description": "List of PyPI package names.",
+        },
+        "cutoff": {
+            "type": "integer",
+            "description": "The maximum number of releases to include per package. Defaults to 10.",
+        },
+    }
+    output_type = "object"
+    output_schema = PackageBatchResponseSchema.schema()
+
+    def __init__(self):
+        super().__init__()
+
+    def forward(self, packages: list, cutoff: int) -> dict:
+        coro = github_repo_and_releases_batch(packages, cutoff=cutoff)
+        result = run_coro_sync(coro)
+
+        return result
+
+
+class PypiVersionDependenciesTool(Tool):
+    """Tool to get the dependencies of many versions of a package at once."""
+
+    name = "pypi_version_dependencies"
+    description = """
+        Get the core metadata (`requires_dist`, `requires_python`,
+        `provides_extra`) of several versions of a PyPI package in a single
+        call. It only downloads the small PEP 658 metadata files instead of
+        the full JSON documents, so prefer it over repeated
+        `pypi_search_version` calls when walking back through versions, e.g.
+        to find the newest version compatible with a Python version or with
+        another dependency.
+        It returns a dictionary with the schema described in `output_schema`
+        attribute, keyed by version, where each result holds the metadata or
+        an `error` key.
+        """
+    inputs: ClassVar[dict] = {
+        "package": {
+            "type": "string",
+            "description": "Name of the package to look up on PyPI.",
+        },
+        "versions": {
+            "type": "array",
+            "description": "Versions to look up. Defaults to the newest `last_n` versions.",
+            "nullable": True,
+        },
+        "last_n": {
+            "type": "integer",
+            "description": "Number of newest versions to look up when `versions` is not given. Defaults to 10.",
+            "nullable": True,
+        },
+    }
+    output_type = "object"
+    output_schema = PackageBatchResponseSchema.schema()
+
+    def __init__(self):
+        super().__init__()
+
+    def forward(
+        self, package: str, versions: list | None = None, last_n: int | None = None
+    ) -> dict:
+        coro = pypi_core_metadata_versions(
+            package, versions=versions, last_n=last_n or 10
+        )
+        result = run_coro_sync(coro)
+
+        return result
@@ -1,14 +1,69 @@
+import asyncio
+import functools
+import itertools
 import logging
 import os
+import resource
 import shutil
+import signal
+import subprocess
 import sys
 import tempfile
-from contextlib import contextmanager
+import time
+import weakref
+from collections.abc import Callable
+from contextlib import contextmanager, nullcontext
 from typing import Literal
 
-from src.upgrade_advisor.agents.tools.parse_response import parse_resolved_deps
-from src.upgrade_advisor.const import ALLOWED_OS, UV_VERSION
+import packaging.version
+from packaging.requirements import InvalidRequirement, Requirement
+
+from src.upgrade_advisor.agents.tools.dependency_graph import CompileOutputParser
+from src.upgrade_advisor.agents.tools.graph_query import (
+    remember_graph,
+    resolution_key,
+)
+from src.upgrade_advisor.agents.tools.indexes import get_index_config
+from src.upgrade_advisor.agents.tools.manifest import (
+    ManifestError,
+    UVManifest,
+    dependencies_manifest,
+    uv_manifest,
+)
+from src.upgrade_advisor.agents.tools.parse_response import (
+    diff_pins,
+    resolved_pins,
+)
+from src.upgrade_advisor.agents.tools.pypi_cache import normalize_name
+from src.upgrade_advisor.agents.tools.resolution_cache import (
+    canonical_dependencies,
+    get_resolution_cache,
+    is_past_snapshot,
+    normalize_snapshot,
+    resolution_fingerprint,
+)
+from src.upgrade_advisor.agents.tools.uv_toolchain import (
+    UVToolchainError,
+    find_uv_async,
+    maybe_prune_uv_cache,
+    uv_environment,
+)
+from src.upgrade_advisor.config import (
+    RESOLVE_MATRIX_CONCURRENCY,
+    RESOLVE_MATRIX_MAX_CELLS,
+    UV_CACHE_PRUNE_INTERVAL,
+    UV_CPU_TIME_LIMIT,
+    UV_MAX_CONCURRENT_RESOLUTIONS,
+    UV_MEMORY_LIMIT_MB,
+    UV_RESOLVE_TIMEOUT,
+    UV_WARMUP_PACKAGES,
+)
+from src.upgrade_advisor.const import ALLOWED_OS, UPLOADS_DIR, UV_VERSION
+from src.upgrade_advisor.misc import run_coro_background, run_coro_sync
 from src.upgrade_advisor.schema import (
+    ErrorResponseSchema,
+    ResolutionMatrixCellSchema,
+    ResolutionMatrixSchema,
     ResolvedDep,
     ResolveResult,
     UVResolutionResultSchema,
@@ -18,6 +73,11 @@ logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 logger.addHandler(logging.StreamHandler())
 
+# asyncio semaphores are bound to the loop they are first used on
+_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+# process groups of the uv processes running in this process
+_running_groups: set[int] = set()
+
 
 @contextmanager
 def temp_directory():
@@ -26,12 +86,20 @@ def temp_directory():
     try:
         yield temp_dir
     except Exception as e:
-        logger.error(f"Error creating or using temporary directory: {str(e)}")
-        raise e
+        logger.error(f"Error creating or using temporary directory: {e!s}")
+        raise
     finally:
         safe_remove(temp_dir)
 
 
+def _write_scratch_file(directory: str, name: str, content: str | bytes) -> str:
+    """Write an input file for uv in a scratch directory, return its path."""
+    path = os.path.join(directory, name)
+    with open(path, "wb" if isinstance(content, bytes) else "w") as f:
+        f.write(content)
+    return path
+
+
 def safe_remove(path):
     """Safely removes a file or directory if it exists."""
     if not os.path.exists(path):
@@ -47,11 +115,11 @@ def safe_remove(path):
                 f"Path {path} exists but is neither a file nor a directory."
             )
     except Exception as e:
-        logger.error(f"Error removing path {path}: {str(e)}")
-        raise e
+        logger.error(f"Error removing path {path}: {e!s}")
+        raise
 
 
-def install_pip_package(package_name: str, version: str = None):
+def install_pip_package(package_name: str, version: str | None = None):
     """Installs a pip package using python -m pip install."""
     import subprocess
 
@@ -62,8 +130,8 @@ def install_pip_package(package_name: str, version: str = None):
             [sys.executable, "-m", "pip", "install", package_spec],
         )
     except Exception as e:
-        logger.error(f"Error logging package installation: {str(e)}")
-        raise e
+        logger.error(f"Error logging package installation: {e!s}")
+        raise
 
 
 def clean_up_toml_file(toml_path: str):
@@ -118,28 +186,357 @@ def check_python_exists(version_str: str) -> str:
         raise ValueError(f"Invalid Python version: {version_str}")
 
 
+def previous_pins(previous: dict) -> dict[str, str]:
+    """
+    Get the pins of a previous resolution.
+
+    Args:
+        previous (dict): A result following UVResolutionResultSchema, its
+            `output` (ResolveResult), or a mapping of package name to version.
+    Returns:
+        Dict[str, str]: Normalized package name -> pinned version, empty for
+            direct references (git or URL dependencies).
+    """
+    previous = previous.get("output", previous)
+    if "deps" in previous:
+        pins = resolved_pins(previous)
+    else:
+        pins = {name: str(version) for name, version in previous.items()}
+    return {normalize_name(name): version for name, version in pins.items()}
+
+
+def preferred_pins(pins: dict[str, str]) -> dict[str, str]:
+    """
+    The pins uv can be asked to keep: the ones with a PEP 440 version.
+
+    Direct references have none, uv takes them from the manifest again.
+    """
+    preferred = {}
+    for name, version in pins.items():
+        try:
+            packaging.version.Version(version)
+        except (packaging.version.InvalidVersion, TypeError):
+            continue
+        preferred[name] = version
+    return preferred
+
+
+def changed_requirements(toml_content: bytes, pins: dict[str, str]) -> list[str]:
+    """Direct dependencies of a manifest that their pin no longer satisfies."""
+    changed = []
+    for requirement in canonical_dependencies(toml_content).get("dependencies", []):
+        try:
+            req = Requirement(requirement)
+        except InvalidRequirement:
+            continue
+        name = normalize_name(req.name)
+        if name in pins and not req.specifier.contains(pins[name], prereleases=True):
+            changed.append(name)
+    return changed
+
+
+def read_manifest(
+    toml_file: str | None = None,
+    content: str | bytes | None = None,
+    manifest_format: Literal["pyproject", "requirements"] = "pyproject",
+    dependencies: list[str] | None = None,
+) -> tuple[UVManifest, bytes | None]:
+    """
+    Read a manifest given in any of the ways `resolve_environment` takes.
+
+    Args:
+        toml_file (str, optional): Path to the pyproject.toml or
+            requirements file.
+        content (str, optional): Content of the manifest.
+        manifest_format (str): Format of `content`, 'pyproject' or
+            'requirements'.
+        dependencies (List[str], optional): PEP 508 requirements.
+    Returns:
+        Tuple[UVManifest, Optional[bytes]]: What uv resolves, and the raw
+            manifest (None for `dependencies`).
+    Raises:
+        ManifestError: If the manifest cannot be parsed.
+    """
+    if dependencies is not None:
+        return dependencies_manifest(dependencies), None
+    source = toml_file
+    if toml_file is not None:
+        with open(toml_file, "rb") as f:
+            raw_content = f.read()
+    else:
+        raw_content = content.encode() if isinstance(content, str) else content
+        # includes of requirements can only be uploaded files
+        source = str(
+            UPLOADS_DIR
+            / (
+                "requirements.txt"
+                if manifest_format == "requirements"
+                else "pyproject.toml"
+            )
+        )
+    return uv_manifest(source, raw_content), raw_content
+
+
 def resolve_environment(
-    toml_file: str,
+    toml_file: str | None = None,
     resolution_strategy: Literal["lowest-direct", "lowest", "highest"] = "highest",
     python_platform: Literal[ALLOWED_OS] = "linux",
     python_version: str = "3.10",
     universal: bool = False,
+    exclude_newer: str | None = None,
+    previous: dict | None = None,
+    upgrade_packages: list[str] | None = None,
+    content: str | bytes | None = None,
+    manifest_format: Literal["pyproject", "requirements"] = "pyproject",
+    dependencies: list[str] | None = None,
+    constraints: list[str] | None = None,
+    overrides: list[str] | None = None,
+    timeout: float | None = UV_RESOLVE_TIMEOUT,
 ) -> dict:
     """
     Resolves the environment using uv tool based on the provided
     `pyproject.toml` file path and uv resolution parameters.
 
+    Blocking wrapper around `resolve_environment_async`, which runs on the
+    shared background loop; see there for the arguments.
+
+    Returns:
+        dict: A dictionary containing the resolution result following UVResolutionResultSchema.
+    """
+    return run_coro_sync(
+        resolve_environment_async(
+            toml_file,
+            resolution_strategy=resolution_strategy,
+            python_platform=python_platform,
+            python_version=python_version,
+            universal=universal,
+            exclude_newer=exclude_newer,
+            previous=previous,
+            upgrade_packages=upgrade_packages,
+            content=content,
+            manifest_format=manifest_format,
+            dependencies=dependencies,
+            constraints=constraints,
+            overrides=overrides,
+            timeout=timeout,
+        )
+    )
+
+
+def _uv_slots() -> asyncio.Semaphore:
+    """Return the semaphore limiting concurrent uv processes on the running loop."""
+    loop = asyncio.get_running_loop()
+    semaphore = _semaphores.get(loop)
+    if semaphore is None:
+        semaphore = _semaphores[loop] = asyncio.Semaphore(UV_MAX_CONCURRENT_RESOLUTIONS)
+    return semaphore
+
+
+@functools.lru_cache(maxsize=1)
+def _resource_limits() -> tuple[tuple[int, tuple[int, int]], ...]:
+    """The memory and CPU time limits of uv processes, within the app's own."""
+    limits = []
+    if UV_MEMORY_LIMIT_MB > 0:
+        limit = UV_MEMORY_LIMIT_MB * 1024 * 1024
+        limits.append((resource.RLIMIT_AS, (limit, limit)))
+    if UV_CPU_TIME_LIMIT > 0:
+        # SIGXCPU at the soft limit, SIGKILL at the hard one
+        limits.append((resource.RLIMIT_CPU, (UV_CPU_TIME_LIMIT, UV_CPU_TIME_LIMIT + 5)))
+    clamped = []
+    for which, (soft, hard) in limits:
+        # a process cannot raise its hard limit, stay below the app's
+        _, app_hard = resource.getrlimit(which)
+        if app_hard != resource.RLIM_INFINITY and hard > app_hard:
+            logger.info(f"Lowered a uv resource limit to the app's: {app_hard}")
+            soft, hard = min(soft, app_hard), app_hard
+        clamped.append((which, (soft, hard)))
+    return tuple(clamped)
+
+
+def _limit_resources() -> None:
+    """Apply the limits in a uv process, between fork and exec."""
+    # nothing but the system calls, the child is a copy of a threaded process
+    for which, limit in _resource_limits():
+        resource.setrlimit(which, limit)
+
+
+def kill_running_uv() -> None:
+    """Kill the uv processes (and what they started) running in this process."""
+    for group in list(_running_groups):
+        try:
+            os.killpg(group, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+
+async def run_uv(
+    command: list[str],
+    env: dict | None = None,
+    timeout: float | None = None,
+    on_output: Callable[[str], None] | None = None,
+    stdin: bytes | None = None,
+    on_stdout: Callable[[str], None] | None = None,
+    limited: bool = True,
+) -> tuple[int | None, str]:
+    """
+    Run a uv command without blocking the event loop.
+
+    At most `UV_MAX_CONCURRENT_RESOLUTIONS` uv processes run at once (per
+    event loop); further calls wait for a slot. stdout and stderr are read
+    line by line as uv writes them.
+
+    uv runs in a session of its own, limited to `UV_MEMORY_LIMIT_MB` of
+    memory and `UV_CPU_TIME_LIMIT` seconds of CPU time. On timeout or
+    cancellation its whole process group is killed, including the build
+    backends it started.
+
     Args:
-        toml_file (str): Path to the pyproject.toml file.
+        command (List[str]): The command, starting with the uv executable.
+        env (dict, optional): Environment of the process.
+        timeout (float, optional): Seconds after which the process is
+            killed. The wait for a slot does not count.
+        on_output (Callable, optional): Called with every output line of
+            both streams as it is produced, e.g. to stream progress.
+        stdin (bytes, optional): Input of the process, e.g. the requirements
+            of `uv pip compile -`.
+        on_stdout (Callable, optional): Called with every line of stdout
+            only, e.g. to parse the result while it is written.
+        limited (bool): Take one of the `UV_MAX_CONCURRENT_RESOLUTIONS`
+            slots. Background work that runs one uv at a time passes False,
+            so it never keeps a resolution waiting.
+    Returns:
+        Tuple[Optional[int], str]: The exit code (None if killed on timeout
+            or uv could not be started) and the output of both streams.
+    """
+    async with _uv_slots() if limited else nullcontext():
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *command,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                stdin=asyncio.subprocess.PIPE if stdin else asyncio.subprocess.DEVNULL,
+                env=env,
+                start_new_session=True,
+                # limited before exec, so neither uv nor what it starts
+                # ever runs without the limits
+                preexec_fn=_limit_resources if _resource_limits() else None,
+            )
+        except (OSError, subprocess.SubprocessError) as e:
+            return None, f"Could not start uv: {e!s}\n"
+        _running_groups.add(process.pid)
+        lines = []
+
+        async def feed() -> None:
+            try:
+                process.stdin.write(stdin)
+                await process.stdin.drain()
+            except (BrokenPipeError, ConnectionResetError):
+                # uv exited early, its output tells why
+                pass
+            process.stdin.close()
+
+        async def read(stream: asyncio.StreamReader, is_stdout: bool) -> None:
+            async for raw_line in stream:
+                line = raw_line.decode("utf-8", errors="replace")
+                lines.append(line)
+                if on_output is not None:
+                    on_output(line)
+                if is_stdout and on_stdout is not None:
+                    on_stdout(line)
+
+        async def pump() -> int:
+            # all at once, so neither uv nor this side waits on a full pipe
+            await asyncio.gather(
+                feed() if stdin else asyncio.sleep(0),
+                read(process.stdout, True),
+                read(process.stderr, False),
+            )
+            return await process.wait()
+
+        try:
+            returncode = await asyncio.wait_for(pump(), timeout)
+        except asyncio.TimeoutError:
+            returncode = None
+            lines.append(f"\nuv was killed after running for {timeout} seconds.\n")
+        finally:
+            # also reached when the caller is cancelled
+            if process.returncode is None:
+                # not reaped yet, so the group id still belongs to uv
+                try:
+                    os.killpg(process.pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    # uv and its children exited meanwhile
+                    pass
+                await process.wait()
+            _running_groups.discard(process.pid)
+    return returncode, "".join(lines)
+
+
+async def resolve_environment_async(
+    toml_file: str | None = None,
+    resolution_strategy: Literal["lowest-direct", "lowest", "highest"] = "highest",
+    python_platform: Literal[ALLOWED_OS] = "linux",
+    python_version: str = "3.10",
+    universal: bool = False,
+    exclude_newer: str | None = None,
+    previous: dict | None = None,
+    upgrade_packages: list[str] | None = None,
+    content: str | bytes | None = None,
+    manifest_format: Literal["pyproject", "requirements"] = "pyproject",
+    dependencies: list[str] | None = None,
+    constraints: list[str] | None = None,
+    overrides: list[str] | None = None,
+    timeout: float | None = UV_RESOLVE_TIMEOUT,
+    on_output: Callable[[str], None] | None = None,
+) -> dict:
+    """
+    Resolves the environment using uv tool based on the provided
+    `pyproject.toml` file path and uv resolution parameters, without
+    blocking the event loop while uv runs.
+
+    The manifest is a file, in-memory content or a plain list of
+    requirements. Poetry and PDM projects and requirements files (any file
+    not ending in `.toml`) are translated into static dependencies first,
+    which uv reads from stdin: nothing is written to disk and no project is
+    built unless its dependencies are dynamic.
+
+    Args:
+        toml_file (str, optional): Path to the pyproject.toml or
+            requirements file.
         resolution_strategy (str): Resolution strategy to use. One of 'lowest-direct', 'lowest', 'highest'.
         python_platform (str): Target Python platform. One of the allowed OS values.
         python_version (str): Target Python version. E.g., '3.10'. Should be >= 3.8.
         universal (bool): Whether to use universal wheels. Defaults to False. Cannot be True if a specific platform is provided.
+        exclude_newer (str, optional): Snapshot to resolve at: only files
+            uploaded before this RFC 3339 timestamp or date (UTC midnight),
+            e.g. '2025-06-01', are considered. Resolutions at a past
+            snapshot are reproducible and cached permanently.
+        previous (dict, optional): A previous resolution, as returned by
+            this function (or its `output`, or a name -> version mapping).
+            Its pins are kept wherever the manifest still allows them, and
+            the result gets a `pin_diff` against them.
+        upgrade_packages (List[str], optional): Packages to re-solve even
+            though `previous` pins them, e.g. to see what upgrading one
+            package does. Direct dependencies whose requirement no longer
+            matches their previous pin are always re-solved.
+        timeout (float, optional): Seconds after which uv is killed and the
+            resolution reported as errored. Defaults to `UV_RESOLVE_TIMEOUT`.
+        content (str, optional): Content of the manifest, instead of
+            `toml_file`.
+        manifest_format (str): Format of `content`, 'pyproject' or
+            'requirements'. Includes (`-r`, `-c`) of requirements are
+            relative to the uploads directory.
+        dependencies (List[str], optional): PEP 508 requirements to resolve,
+            instead of a manifest.
+        constraints (List[str], optional): Constraints on top of those of
+            the manifest, e.g. 'urllib3<2'.
+        overrides (List[str], optional): Overrides on top of those of the
+            manifest.
+        on_output (Callable, optional): Called with every line of uv output
+            as it is produced.
     Returns:
         dict: A dictionary containing the resolution result following UVResolutionResultSchema.
     """
-    import subprocess
-
     import packaging.version
 
     errored = False
@@ -167,122 +564,215 @@ def resolve_environment(
             f"Invalid Python platform: {python_platform}. Must be one of {ALLOWED_OS}."
         )
 
-    if not os.path.isfile(toml_file):
+    if [toml_file, content, dependencies].count(None) != 2:
+        errored = True
+        e = ValueError("Give exactly one of toml_file, content or dependencies.")
+    elif toml_file is not None and not os.path.isfile(toml_file):
+        errored = True
+        e = FileNotFoundError(f"Manifest file not found: {toml_file}")
+    elif manifest_format not in ("pyproject", "requirements"):
         errored = True
-        e = FileNotFoundError(f"Toml file not found: {toml_file}")
+        e = ValueError(
+            f"Invalid manifest format: {manifest_format}. "
+            "Must be one of 'pyproject', 'requirements'."
+        )
+
+    if exclude_newer:
+        try:
+            exclude_newer = normalize_snapshot(exclude_newer)
+        except ValueError as snapshot_error:
+            errored = True
+            e = snapshot_error
+    exclude_newer = exclude_newer or None
+
+    pins = preferences = {}
+    if previous:
+        try:
+            pins = previous_pins(previous)
+        except (AttributeError, TypeError, ValueError):
+            errored = True
+            e = ValueError("Invalid previous resolution: expected a resolution result.")
+        preferences = preferred_pins(pins)
+
+    timings = {}
+    if not errored:
+        started = time.perf_counter()
+        cache = get_resolution_cache()
+        try:
+            manifest, raw_content = read_manifest(
+                toml_file, content, manifest_format, dependencies
+            )
+        except ManifestError as manifest_error:
+            errored = True
+            e = manifest_error
+        else:
+            toml_content = manifest.pyproject or raw_content
+            manifest = manifest._replace(
+                constraints=manifest.constraints
+                + "".join(f"{c}\n" for c in constraints or []),
+                overrides=manifest.overrides
+                + "".join(f"{o}\n" for o in overrides or []),
+            )
+
+    if not errored:
+        if preferences:
+            upgrade_packages = sorted(
+                set(map(normalize_name, upgrade_packages or []))
+                | set(changed_requirements(toml_content, preferences))
+            )
+        cache_key = resolution_fingerprint(
+            toml_content,
+            resolution_strategy=resolution_strategy,
+            python_platform=None if universal else python_platform.lower(),
+            python_version=python_version,
+            universal=universal,
+            uv_version=UV_VERSION,
+            exclude_newer=exclude_newer,
+            constraints=manifest.constraints,
+            overrides=manifest.overrides,
+            preferences=pins,
+            upgrade_packages=upgrade_packages if preferences else None,
+        )
+        cached = cache.get(cache_key)
+        if cached is not None:
+            cached["cached"] = True
+            cached["resolution_id"] = cache_key
+            cached["timings"] = {"cache_lookup": time.perf_counter() - started}
+            logger.info(
+                f"Resolution cache hit for {toml_file or 'in-memory manifest'}."
+            )
+            return cached
+
+        started = time.perf_counter()
+        try:
+            uv_bin = await find_uv_async()
+        except UVToolchainError as uv_error:
+            errored = True
+            e = uv_error
+        timings["find_uv"] = time.perf_counter() - started
 
     if errored:
-        logger.error(f"Error before resolving environment: {str(e)}")
+        logger.error(f"Error before resolving environment: {e!s}")
         return UVResolutionResultSchema(
             python_version=python_version,
             uv_version=UV_VERSION,
             output=ResolveResult(deps={}).model_dump(),
             errored=True,
             logs=str(e),
+            timings=timings,
+            exclude_newer=exclude_newer,
         ).model_dump()
 
-    # copy the toml file to a temp directory
-    with temp_directory() as temp_dir:
-        temp_toml_path = os.path.join(temp_dir, "pyproject.toml")
-        shutil.copy(toml_file, temp_toml_path)
-        logger.info(f"Copied toml file to temporary path: {temp_toml_path}")
-        # create fake readme.md in case it's required by the build system
-        readme_path = os.path.join(temp_dir, "README.md")
-        with open(readme_path, "w") as f:
-            f.write("# Temporary README\nThis is a temporary README file.")
-        logger.info(f"Created temporary README at: {readme_path}")
-        # clean up the toml file
-        clean_up_toml_file(temp_toml_path)
-        # install uv package in a virtual environment
-        # curl -LsSf https://astral.sh/uv/0.9.11/install.sh | sh
-        subprocess.check_call(
-            [
-                "bash",
-                "-c",
-                f"curl -LsSf https://astral.sh/uv/{UV_VERSION}/install.sh | env UV_UNMANAGED_INSTALL={temp_dir}/bin sh",
-            ]
-        )
-        # add temp_dir to PATH
-        os.environ["PATH"] = f"{temp_dir}/bin:" + os.environ["PATH"]
-        logger.info(f"Added {temp_dir}/bin to PATH for uv executable.")
-
-        venv_path = os.path.join(temp_dir, "venv")
-        subprocess.check_call(
-            [
-                "uv",
-                "venv",
-                "--python",
-                python_version,
-                venv_path,
-                "--clear",  # clear venv if exists
-            ]
-        )
-        # activate: source /tmp/tmpxjawvuqp/venv/bin/activate but in ci/cd
-        subprocess.check_call(
-            ["bash", "-c", f"source {os.path.join(venv_path, 'bin', 'activate')}"]
-        )
-        logger.info(
-            f"Created virtual environment at: {venv_path} with Python version: {python_version}"
-        )
-        # verify the python version in the venv (this is the new venv)
-        python_executable = os.path.join(
-            venv_path, "Scripts" if os.name == "nt" else "bin", "python"
-        )
-        out = subprocess.check_output(
-            [python_executable, "--version"],
-            text=True,
-        )
-        out = out.strip()
-        logger.info(f"Python version in venv: {out}")
-        logger.info(f"Required Python version: {python_version}")
+    # static dependencies go to uv through stdin; a scratch directory is
+    # only needed for a project uv has to build, or for extra input files
+    started = time.perf_counter()
+    dynamic = manifest.requirements is None
+    scratch = dynamic or manifest.constraints or manifest.overrides or preferences
+    with temp_directory() if scratch else nullcontext() as temp_dir:
+        if dynamic:
+            # uv has to build the project to get its dependencies
+            manifest_path = _write_scratch_file(temp_dir, "pyproject.toml", raw_content)
+            logger.info(f"Wrote toml file to temporary path: {manifest_path}")
+            # create fake readme.md in case it's required by the build system
+            readme_path = _write_scratch_file(
+                temp_dir,
+                "README.md",
+                "# Temporary README\nThis is a temporary README file.",
+            )
+            logger.info(f"Created temporary README at: {readme_path}")
+            # clean up the toml file
+            clean_up_toml_file(manifest_path)
+        else:
+            manifest_path = "-"
+        timings["prepare"] = time.perf_counter() - started
 
-        # now comes the resolution step
+        # now comes the resolution step, the only one that runs uv. No venv
+        # is needed: --python-version sets the target, and any interpreter
+        # uv finds will do for the rest.
         # see docs; https://docs.astral.sh/uv/concepts/resolution/
         # python -m uv pip compile pyproject.toml --resolution lowest-direct
         # --universal
-        # store all stdout and err to a variable which is then returned
-        try:
-            out = subprocess.check_output(["which", "uv"], text=True)
-            logger.info(f"Using uv executable at: {out.strip()}")
-            # store the output, if good or bad
-            command = [
-                "uv",
-                "pip",
-                "compile",
-                temp_toml_path,
-                "--resolution",
-                resolution_strategy,
-                "--python-version",
-                python_version,
-            ]
-            if universal:
-                command.append("--universal")
-            else:
-                command.extend(
-                    [
-                        "--python-platform",
-                        python_platform,
-                    ]
+        logger.info(f"Using uv executable at: {uv_bin}")
+        command = [
+            uv_bin,
+            "pip",
+            "compile",
+            manifest_path,
+            "--resolution",
+            resolution_strategy,
+            "--python-version",
+            python_version,
+            "--no-python-downloads",
+            # one self-contained line per package, with its marker and `via`
+            "--annotation-style",
+            "line",
+            "--no-header",
+        ]
+        if exclude_newer:
+            command.extend(["--exclude-newer", exclude_newer])
+        if universal:
+            command.append("--universal")
+        else:
+            command.extend(
+                [
+                    "--python-platform",
+                    python_platform,
+                ]
+            )
+        for option, requirements in (
+            ("--constraint", manifest.constraints),
+            ("--override", manifest.overrides),
+        ):
+            if requirements:
+                path = _write_scratch_file(
+                    temp_dir, f"{option.strip('-')}s.txt", requirements
                 )
+                command.extend([option, path])
+        if preferences:
+            # uv prefers the versions already in the output file, and only
+            # re-solves the upgraded packages and what no longer fits
+            previous_path = _write_scratch_file(
+                temp_dir,
+                "previous.txt",
+                "".join(f"{name}=={v}\n" for name, v in preferences.items()),
+            )
+            command.extend(["--output-file", previous_path])
+            for package in upgrade_packages:
+                command.extend(["--upgrade-package", package])
 
-            logger.info(f"Running uv pip compile command: {' '.join(command)}")
-            out = subprocess.check_output(command, stderr=subprocess.STDOUT, text=True)
-            returncode = 0
-
-        except subprocess.CalledProcessError as e:
-            returncode = e.returncode
-            out = e.output
+        logger.info(f"Running uv pip compile command: {' '.join(command)}")
+        # resolve against the same indexes the PyPI lookups use, sharing
+        # downloaded metadata with every other resolution, in an environment
+        # of its own
+        env = uv_environment(get_index_config().uv_env())
+        # parse the requirements uv writes to stdout while it writes them
+        parser = CompileOutputParser()
+        started = time.perf_counter()
+        returncode, out = await run_uv(
+            command,
+            env=env,
+            timeout=timeout,
+            on_output=on_output,
+            stdin=None if dynamic else manifest.requirements.encode("utf-8"),
+            on_stdout=parser.feed,
+        )
+        if returncode != 0:
             logger.error(
-                f"Error running uv pip compile: {e}\nOutput was: {out}\nReturn code: {returncode}"
+                f"Error running uv pip compile.\nOutput was: {out}\nReturn code: {returncode}"
             )
             errored = True
+        timings["compile"] = time.perf_counter() - started
 
-        logger.info(f"Ran uv pip compile command to get output:\n{out}")
+        logger.debug(f"Ran uv pip compile command to get output:\n{out}")
 
+        started = time.perf_counter()
+        for name in manifest.direct:
+            if name in parser.graph.packages:
+                parser.graph.add_dependent(name, "-r -")
         result = {
             "python_version": python_version,
             "uv_version": UV_VERSION,
-            "output": parse_resolved_deps(out).model_dump()
+            "output": parser.graph.to_output()
             if not errored
             else ResolveResult(
                 deps={"NA": ResolvedDep(name="", version="", via=[])}
@@ -290,20 +780,249 @@ def resolve_environment(
             "errored": errored,
             "logs": out,
         }
-        logger.info(f"Raw resolution result: {result}")
+        logger.debug(f"Raw resolution result: {result}")
         # type
         logger.info(f"Result type: {type(result)}")
         # validate the result schema
         # result is json, so parse it
+        timings["parse"] = time.perf_counter() - started
         result_schema = UVResolutionResultSchema(
             output=result["output"],
             errored=result["errored"],
             logs=result["logs"],
             python_version=result["python_version"],
             uv_version=result["uv_version"],
+            timings=timings,
+            exclude_newer=exclude_newer,
+            manifest_warnings=list(manifest.warnings),
+            pin_diff=diff_pins(pins, resolved_pins(result["output"]))
+            if pins and not errored
+            else None,
+            resolution_id=cache_key,
+        )
+        logger.debug(f"Environment resolution result: {result_schema}")
+        result = result_schema.model_dump()
+        if not errored:
+            cache.put(cache_key, result, pinned=is_past_snapshot(exclude_newer))
+            # graph queries on this result reuse the graph parsed from uv
+            remember_graph(resolution_key(result), parser.graph)
+        return result
+
+
+async def warm_up_uv_cache(
+    packages: list[str], python_version: str = "3.10"
+) -> dict[str, bool]:
+    """
+    Resolve commonly used packages once, so the shared uv cache holds their
+    metadata before the first real resolution needs it.
+
+    Each package is resolved on its own (universally, to fetch the metadata
+    of every platform), so one failing package does not affect the others.
+    They are resolved one after the other and outside the resolution slots,
+    so user resolutions never wait for the warm-up.
+
+    Args:
+        packages (List[str]): Requirements to resolve, e.g. ['torch', 'scipy'].
+        python_version (str): Minimum Python version to resolve for.
+    Returns:
+        Dict[str, bool]: Whether each package resolved.
+    """
+    try:
+        uv_bin = await find_uv_async()
+    except UVToolchainError as e:
+        logger.error(f"Skipping the uv cache warm-up: {e!s}")
+        return {}
+    env = uv_environment(get_index_config().uv_env())
+
+    async def warm_up(package: str) -> bool:
+        command = [
+            uv_bin,
+            "pip",
+            "compile",
+            "-",
+            "--universal",
+            "--python-version",
+            python_version,
+            "--no-python-downloads",
+        ]
+        returncode, _ = await run_uv(
+            command,
+            env=env,
+            timeout=UV_RESOLVE_TIMEOUT,
+            stdin=f"{package}\n".encode(),
+            limited=False,
+        )
+        return returncode == 0
+
+    started = time.perf_counter()
+    results = [await warm_up(package) for package in packages]
+    logger.info(
+        f"Warmed up the uv cache with {sum(results)}/{len(packages)} packages "
+        f"in {time.perf_counter() - started:.1f}s."
+    )
+    return dict(zip(packages, results))
+
+
+async def maintain_uv_cache(packages: list[str]) -> None:
+    """
+    Warm up the uv cache with `packages`, then keep it under its size cap,
+    checking every `UV_CACHE_PRUNE_INTERVAL` seconds.
+    """
+    await asyncio.to_thread(maybe_prune_uv_cache)
+    if packages:
+        await warm_up_uv_cache(packages)
+    while True:
+        await asyncio.sleep(UV_CACHE_PRUNE_INTERVAL)
+        await asyncio.to_thread(maybe_prune_uv_cache)
+
+
+_maintenance_future = None
+
+
+def start_uv_cache_maintenance() -> bool:
+    """
+    Warm up the uv cache with `UV_WARMUP_PACKAGES` and prune it periodically,
+    in the background.
+
+    Returns:
+        bool: Whether the maintenance task is running.
+    """
+    global _maintenance_future
+    if _maintenance_future is not None and not _maintenance_future.done():
+        return True
+    packages = [p.strip() for p in UV_WARMUP_PACKAGES.split(",") if p.strip()]
+    _maintenance_future = run_coro_background(maintain_uv_cache(packages))
+    return True
+
+
+async def resolve_matrix_async(
+    toml_file: str | None,
+    python_versions: list[str],
+    python_platforms: list[str],
+    resolution_strategies: list[str] | None = None,
+    exclude_newer: str | None = None,
+    concurrency: int = RESOLVE_MATRIX_CONCURRENCY,
+    content: str | bytes | None = None,
+    manifest_format: Literal["pyproject", "requirements"] = "pyproject",
+) -> dict:
+    """
+    Resolve a pyproject.toml for every combination of Python version,
+    platform and resolution strategy, running the uv compiles in parallel,
+    in the resolver service when it runs.
+
+    Args:
+        toml_file (str): Path to the pyproject.toml or requirements file,
+            None to resolve `content`.
+        python_versions (List[str]): Target Python versions, e.g. ['3.10', '3.13'].
+        python_platforms (List[str]): Target platforms, from ALLOWED_OS.
+        resolution_strategies (List[str], optional): Strategies to try.
+            Defaults to ['highest'].
+        exclude_newer (str, optional): Snapshot to resolve at, see
+            `resolve_environment`.
+        concurrency (int): Maximum number of uv processes running at once.
+        content (str, optional): Content of the manifest, instead of
+            `toml_file`.
+        manifest_format (str): Format of `content`, see `resolve_environment`.
+    Returns:
+        dict: The compatibility matrix following ResolutionMatrixSchema. Every
+              cell is diffed against the first cell that resolved.
+    """
+    resolution_strategies = resolution_strategies or ["highest"]
+    cells = list(
+        itertools.product(python_versions, python_platforms, resolution_strategies)
+    )
+    if not cells:
+        return ErrorResponseSchema(
+            error="Give at least one Python version and platform."
+        ).model_dump()
+    if len(cells) > RESOLVE_MATRIX_MAX_CELLS:
+        return ErrorResponseSchema(
+            error=f"Matrix too large: {len(cells)} combinations, at most "
+            f"{RESOLVE_MATRIX_MAX_CELLS} are allowed."
+        ).model_dump()
+
+    # imported here, the pool imports this module for its workers
+    from src.upgrade_advisor.agents.tools.resolver_pool import (
+        resolve_with_pool_async,
+    )
+
+    # on top of the global limit on uv processes
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def resolve(cell: tuple[str, str, str]) -> dict:
+        python_version, python_platform, resolution_strategy = cell
+        async with semaphore:
+            return await resolve_with_pool_async(
+                toml_file=toml_file,
+                resolution_strategy=resolution_strategy,
+                python_platform=python_platform,
+                python_version=python_version,
+                exclude_newer=exclude_newer,
+                content=content,
+                manifest_format=manifest_format,
+            )
+
+    results = await asyncio.gather(*(resolve(cell) for cell in cells))
+
+    baseline, baseline_pins = None, {}
+    compatibility: dict[str, dict[str, bool]] = {}
+    matrix_cells = []
+    for (python_version, python_platform, strategy), result in zip(cells, results):
+        errored = result["errored"]
+        compatibility.setdefault(python_version, {})[
+            f"{python_platform}/{strategy}"
+        ] = not errored
+        cell = ResolutionMatrixCellSchema(
+            python_version=python_version,
+            python_platform=python_platform,
+            resolution_strategy=strategy,
+            errored=errored,
+            cached=result.get("cached", False),
+        )
+        if errored:
+            cell.error = "\n".join(result["logs"].strip().splitlines()[-10:])
+        else:
+            pins = resolved_pins(result["output"])
+            cell.num_deps = len(pins)
+            if baseline is None:
+                baseline = f"{python_version}/{python_platform}/{strategy}"
+                baseline_pins = pins
+            cell.diff = diff_pins(baseline_pins, pins)
+        matrix_cells.append(cell)
+
+    return ResolutionMatrixSchema(
+        compatibility=compatibility,
+        baseline=baseline,
+        baseline_pins=baseline_pins,
+        cells=matrix_cells,
+        uv_version=UV_VERSION,
+        exclude_newer=results[0].get("exclude_newer"),
+    ).model_dump()
+
+
+def resolve_matrix(
+    toml_file: str | None,
+    python_versions: list[str],
+    python_platforms: list[str],
+    resolution_strategies: list[str] | None = None,
+    exclude_newer: str | None = None,
+    concurrency: int = RESOLVE_MATRIX_CONCURRENCY,
+    content: str | bytes | None = None,
+    manifest_format: Literal["pyproject", "requirements"] = "pyproject",
+) -> dict:
+    """Blocking wrapper around `resolve_matrix_async`."""
+    return run_coro_sync(
+        resolve_matrix_async(
+            toml_file,
+            python_versions,
+            python_platforms,
+            resolution_strategies=resolution_strategies,
+            exclude_newer=exclude_newer,
+            concurrency=concurrency,
+            content=content,
+            manifest_format=manifest_format,
         )
-        logger.info(f"Environment resolution result: {result_schema}")
-        return result_schema.model_dump()
+    )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,331 @@
+import asyncio
+import fcntl
+import hashlib
+import io
+import logging
+import os
+import platform
+import shutil
+import subprocess
+import tarfile
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import httpx
+
+from src.upgrade_advisor.config import (
+    CACHE_DIR,
+    HTTP_TIMEOUT,
+    UV_BINARY,
+    UV_CACHE_DIR,
+    UV_CACHE_MAX_MB,
+    UV_CACHE_PRUNE_INTERVAL,
+)
+from src.upgrade_advisor.const import UV_VERSION
+
+from .http_client import USER_AGENT
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+logger.addHandler(logging.StreamHandler())
+
+UV_RELEASE_URL = "https://github.com/astral-sh/uv/releases/download/{version}/{asset}"
+# variables of the app environment passed on to uv processes
+_INHERITED_ENV = (
+    "PATH",
+    "HOME",
+    "USER",
+    "LANG",
+    "LC_ALL",
+    "LC_CTYPE",
+    "TMPDIR",
+    "XDG_CACHE_HOME",
+    "XDG_CONFIG_HOME",
+    "SSL_CERT_FILE",
+    "SSL_CERT_DIR",
+    "HTTP_PROXY",
+    "HTTPS_PROXY",
+    "ALL_PROXY",
+    "NO_PROXY",
+    "http_proxy",
+    "https_proxy",
+    "all_proxy",
+    "no_proxy",
+)
+# platform.machine() -> rust target architecture
+_ARCHITECTURES = {
+    "x86_64": "x86_64",
+    "amd64": "x86_64",
+    "aarch64": "aarch64",
+    "arm64": "aarch64",
+}
+
+
+class UVToolchainError(RuntimeError):
+    """uv could not be found or installed."""
+
+
+def uv_version(uv_bin: str) -> str | None:
+    """Return the version of a uv executable, None if it cannot be run."""
+    try:
+        out = subprocess.run(
+            [uv_bin, "--version"],
+            capture_output=True,
+            text=True,
+            timeout=10,
+            check=False,
+        ).stdout
+    except (OSError, subprocess.SubprocessError):
+        return None
+    # "uv 0.9.11 (c0ffee 2025-11-20)"
+    parts = out.split()
+    return parts[1] if len(parts) > 1 and parts[0] == "uv" else None
+
+
+def _sha256_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def release_asset() -> str:
+    """Name of the uv release archive for this platform."""
+    system = platform.system()
+    arch = _ARCHITECTURES.get(platform.machine().lower())
+    if arch is None:
+        raise UVToolchainError(f"Unsupported architecture: {platform.machine()}")
+    if system == "Linux":
+        return f"uv-{arch}-unknown-linux-gnu.tar.gz"
+    if system == "Darwin":
+        return f"uv-{arch}-apple-darwin.tar.gz"
+    raise UVToolchainError(f"Unsupported platform: {system}")
+
+
+def _extract_uv(archive: bytes, asset: str) -> bytes:
+    """Return the `uv` executable from a release archive."""
+    with tarfile.open(fileobj=io.BytesIO(archive), mode="r:gz") as tf:
+        for member in tf.getmembers():
+            if member.isfile() and member.name.rsplit("/", 1)[-1] == "uv":
+                return tf.extractfile(member).read()
+    raise UVToolchainError(f"No uv executable in {asset}.")
+
+
+def _download_uv(version: str, target: Path) -> None:
+    """Download a uv release, check it against its published sha256 and install it."""
+    asset = release_asset()
+    url = UV_RELEASE_URL.format(version=version, asset=asset)
+    logger.info(f"Downloading uv {version} from {url}")
+    headers = {"User-Agent": USER_AGENT}
+    try:
+        with httpx.Client(
+            follow_redirects=True, timeout=HTTP_TIMEOUT, headers=headers
+        ) as client:
+            expected = client.get(f"{url}.sha256").raise_for_status().text.split()[0]
+            archive = client.get(url).raise_for_status().content
+    except httpx.HTTPError as e:
+        raise UVToolchainError(f"Could not download uv {version}: {e!s}") from e
+    if hashlib.sha256(archive).hexdigest() != expected.lower():
+        raise UVToolchainError(f"Hash mismatch for {asset}.")
+
+    binary = _extract_uv(archive, asset)
+    fd, tmp_path = tempfile.mkstemp(dir=str(target.parent), suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(binary)
+    os.chmod(tmp_path, 0o755)
+    os.replace(tmp_path, target)
+    # remember the digest, so reuse can check the binary was not tampered with
+    target.with_name(f"{target.name}.sha256").write_text(_sha256_file(target))
+
+
+def install_uv(version: str = UV_VERSION) -> str:
+    """
+    Install a uv release under `CACHE_DIR/uv/<version>`, once.
+
+    Concurrent installs (threads, workers, processes) wait on a file lock,
+    and all but the first find the binary already in place.
+
+    Args:
+        version (str): The uv version to install.
+    Returns:
+        str: Path of the installed uv executable.
+    Raises:
+        UVToolchainError: If uv cannot be downloaded or fails its checks.
+    """
+    install_dir = CACHE_DIR / "uv" / version
+    install_dir.mkdir(parents=True, exist_ok=True)
+    target = install_dir / "uv"
+    digest_file = target.with_name(f"{target.name}.sha256")
+    with open(install_dir / ".lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            if target.exists():
+                if (
+                    digest_file.exists()
+                    and _sha256_file(target) == digest_file.read_text().strip()
+                    and uv_version(str(target)) == version
+                ):
+                    return str(target)
+                logger.info(f"Reinstalling uv {version}, the installed one is broken.")
+            _download_uv(version, target)
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+    if uv_version(str(target)) != version:
+        raise UVToolchainError(f"Installed uv does not report version {version}.")
+    return str(target)
+
+
+def _candidates():
+    """Places uv may already be installed at, most preferred first."""
+    if UV_BINARY:
+        yield UV_BINARY
+    try:
+        # the `uv` wheel from our dependencies ships the binary
+        from uv import find_uv_bin
+
+        yield find_uv_bin()
+    except (ImportError, FileNotFoundError):
+        pass
+    which = shutil.which("uv")
+    if which:
+        yield which
+
+
+_uv_bin: str | None = None
+_uv_lock = threading.Lock()
+
+
+def find_uv() -> str:
+    """
+    Return the path of a uv executable of version `UV_VERSION`.
+
+    The first call looks for an existing uv (`UV_BINARY`, the `uv` wheel,
+    `PATH`) and otherwise uses the managed install of `install_uv`, which
+    only downloads a release the first time. The result is reused for the
+    lifetime of the process.
+
+    Returns:
+        str: Absolute path of the uv executable.
+    Raises:
+        UVToolchainError: If no matching uv is found and it cannot be installed.
+    """
+    global _uv_bin
+    with _uv_lock:
+        if _uv_bin is not None:
+            return _uv_bin
+        for candidate in _candidates():
+            if os.path.isfile(candidate) and uv_version(candidate) == UV_VERSION:
+                _uv_bin = os.path.abspath(candidate)
+                break
+        else:
+            _uv_bin = install_uv(UV_VERSION)
+        logger.info(f"Using uv {UV_VERSION} at: {_uv_bin}")
+        return _uv_bin
+
+
+async def find_uv_async() -> str:
+    """
+    `find_uv` for event loops: the first call runs `uv --version`, may wait
+    on the install lock and download uv, so it runs in a thread.
+    """
+    if _uv_bin is not None:
+        return _uv_bin
+    return await asyncio.to_thread(find_uv)
+
+
+def uv_cache_env() -> dict:
+    """Environment variables pointing uv at the shared, persistent cache."""
+    return {"UV_CACHE_DIR": str(UV_CACHE_DIR)}
+
+
+def uv_environment(extra: dict | None = None) -> dict:
+    """
+    Build the environment of a uv process from scratch.
+
+    Only what uv needs to run and reach the network is taken over from the
+    app's environment, so tokens, Python settings (PYTHONPATH, ...) and
+    anything else set in the app do not leak into uv or the build backends
+    it runs. uv settings belong in a uv.toml file.
+
+    Args:
+        extra (dict, optional): Variables to set on top, e.g. the index
+            configuration.
+    Returns:
+        dict: The environment, pointing uv at the shared cache.
+    """
+    env = {name: os.environ[name] for name in _INHERITED_ENV if name in os.environ}
+    env.update(uv_cache_env())
+    env.update(extra or {})
+    return env
+
+
+def uv_cache_size(path: Path = UV_CACHE_DIR) -> int:
+    """Return the size of the uv cache in bytes."""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                # removed by a concurrent uv process
+                pass
+    return total
+
+
+def prune_uv_cache(max_bytes: int = UV_CACHE_MAX_MB * 1024 * 1024) -> int:
+    """
+    Bring the uv cache under `max_bytes`.
+
+    Unreachable entries are pruned first; if the cache is still too large
+    it is cleared. uv waits for running uv processes before removing
+    anything they use.
+
+    Blocking (it walks the cache and runs uv), async code runs it in a
+    thread.
+
+    Args:
+        max_bytes (int): The size cap of the cache.
+    Returns:
+        int: The size of the cache afterwards, in bytes.
+    """
+    size = uv_cache_size()
+    if size <= max_bytes:
+        return size
+    uv_bin = find_uv()
+    env = uv_environment()
+    for action in ("prune", "clean"):
+        logger.info(f"uv cache is {size >> 20} MB, running uv cache {action}.")
+        subprocess.run(
+            [uv_bin, "cache", action], env=env, capture_output=True, check=False
+        )
+        size = uv_cache_size()
+        if size <= max_bytes:
+            break
+    return size
+
+
+_last_prune: float | None = None
+_prune_lock = threading.Lock()
+
+
+def maybe_prune_uv_cache() -> None:
+    """Run `prune_uv_cache` at most once every `UV_CACHE_PRUNE_INTERVAL` seconds."""
+    global _last_prune
+    if not _prune_lock.acquire(blocking=False):
+        # another thread is pruning
+        return
+    try:
+        if (
+            _last_prune is not None
+            and time.monotonic() - _last_prune < UV_CACHE_PRUNE_INTERVAL
+        ):
+            return
+        _last_prune = time.monotonic()
+        prune_uv_cache()
+    except (OSError, UVToolchainError) as e:
+        logger.error(f"Could not prune the uv cache: {e!s}")
+    finally:
+        _prune_lock.release()
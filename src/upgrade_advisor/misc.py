@@ -1,4 +1,5 @@
 import asyncio
+import concurrent.futures
 import logging
 import random
 import threading
@@ -197,24 +198,8 @@ def _monkeypatch_gradio_save_history():
     gr.ChatInterface._ua_safe_patch = True
 
 
-def run_coro_sync(coro) -> Any:
-    """Run an async coroutine and return its result from sync code.
-
-    - If no event loop is running: use asyncio.run().
-    - If a loop is already running: dispatch to a dedicated background loop.
-    """
-    try:
-        loop = asyncio.get_running_loop()
-        loop_running = loop.is_running()
-    except RuntimeError:
-        loop = None
-        loop_running = False
-
-    # No loop: safest case
-    if not loop_running:
-        return asyncio.run(coro)
-
-    # Loop already running: use background loop in another thread
+def _get_background_loop() -> asyncio.AbstractEventLoop:
+    """Return the long-lived background loop, starting it on first use."""
     global _bg_loop, _bg_thread
     with _bg_lock:
         if _bg_loop is None or _bg_loop.is_closed():
@@ -226,7 +211,40 @@ def run_coro_sync(coro) -> Any:
             )
             _bg_thread.start()
 
-        bg_loop = _bg_loop
+        return _bg_loop
+
+
+def run_coro_sync(coro, timeout: float | None = None) -> Any:
+    """Run an async coroutine and return its result from sync code.
+
+    Coroutines are always dispatched to a dedicated background loop, so
+    loop-bound resources such as the pooled HTTP client are reused across
+    calls instead of being rebuilt by a fresh `asyncio.run()` every time.
+    If waiting fails (timeout, interrupt), the task is cancelled on the
+    background loop so it does not keep running unattended.
+    """
+    bg_loop = _get_background_loop()
+    try:
+        running_loop = asyncio.get_running_loop()
+    except RuntimeError:
+        running_loop = None
+    # blocking on the background loop from within itself would deadlock
+    if running_loop is bg_loop:
+        coro.close()
+        raise RuntimeError("run_coro_sync cannot be called from the background loop.")
 
     future = asyncio.run_coroutine_threadsafe(coro, bg_loop)
-    return future.result()
+    try:
+        return future.result(timeout=timeout)
+    except BaseException:
+        future.cancel()
+        raise
+
+
+def run_coro_background(coro) -> concurrent.futures.Future:
+    """Schedule a long-running coroutine on the background loop without waiting.
+
+    Returns:
+        concurrent.futures.Future: Cancel it to stop the coroutine.
+    """
+    return asyncio.run_coroutine_threadsafe(coro, _get_background_loop())
@@ -1,5 +1,5 @@
 import logging
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional
 
 from pydantic import BaseModel, Field
 
@@ -38,6 +38,12 @@ class PackageReleaseSchema(BaseModel):
     )
     url: Optional[str] = Field(None, description="Download URL for the release")
     filename: Optional[str] = Field(None, description="Filename of the release package")
+    requires_python: Optional[str] = Field(
+        None, description="Python versions supported by the release file"
+    )
+    yanked: Optional[bool] = Field(
+        None, description="Whether the release file was yanked from the index"
+    )
 
 
 class PackageSearchResponseSchema(BaseModel):
@@ -66,6 +72,27 @@ class PackageVersionResponseSchema(BaseModel):
     )
 
 
+class CoreMetadataSchema(BaseModel):
+    """Core metadata of a single release, as served by PEP 658 `.metadata` files."""
+
+    name: str = Field(..., description="Name of the package")
+    version: str = Field(..., description="Version of the release")
+    requires_python: Optional[str] = Field(
+        None, description="Python version requirements for the release"
+    )
+    requires_dist: List[str] = Field(
+        default_factory=list, description="List of dependencies of the release"
+    )
+    provides_extra: List[str] = Field(
+        default_factory=list, description="Extras provided by the release"
+    )
+    source: str = Field(
+        ...,
+        description="Where the metadata came from: the `.metadata` file URL, "
+        "or `json-api` when the index does not serve PEP 658 metadata",
+    )
+
+
 class GithubRepoSchema(BaseModel):
     owner: Optional[str] = Field(None, description="Owner of the GitHub repository")
     repo: Optional[str] = Field(None, description="Name of the GitHub repository")
@@ -79,6 +106,14 @@ class PackageGitHubandReleasesSchema(BaseModel):
     )
 
 
+class PackageBatchResponseSchema(BaseModel):
+    results: dict[str, dict[str, Any]] = Field(
+        ...,
+        description="Per-package results keyed by the requested package spec. "
+        "Failed lookups hold an `error` key instead of the metadata.",
+    )
+
+
 class ErrorResponseSchema(BaseModel):
     error: str = Field(..., description="Error message")
 
@@ -101,7 +136,65 @@ class ResolvedDep(BaseModel):
 
 class ResolveResult(BaseModel):
     deps: Dict[str, ResolvedDep] = Field(
-        ..., description="Mapping of package names to their resolved dependencies"
+        ...,
+        description=(
+            "Mapping of package names to their resolved dependencies; in "
+            "universal resolutions, the other entries of a package pinned "
+            "per environment are keyed 'name ; marker'"
+        ),
+    )
+
+
+class PinDiffSchema(BaseModel):
+    added: Dict[str, str] = Field(
+        default_factory=dict, description="Packages only in the new pins: version"
+    )
+    removed: Dict[str, str] = Field(
+        default_factory=dict, description="Packages only in the old pins: version"
+    )
+    changed: Dict[str, List[str]] = Field(
+        default_factory=dict,
+        description="Packages pinned differently: [old version, new version]",
+    )
+
+
+class PinSuggestionSchema(BaseModel):
+    requirement: str = Field(..., description="The conflicting requirement")
+    package: str = Field(..., description="Name of the package")
+    lower: Optional[str] = Field(
+        None,
+        description="Closest version below the requested ones that resolves "
+        "with the rest of the conflict",
+    )
+    higher: Optional[str] = Field(
+        None,
+        description="Closest version above the requested ones that resolves "
+        "with the rest of the conflict",
+    )
+
+
+class ConflictReportSchema(BaseModel):
+    resolvable: bool = Field(
+        ..., description="Whether all the requirements resolve together"
+    )
+    conflict: List[str] = Field(
+        default_factory=list,
+        description="Smallest set of direct requirements failing to resolve "
+        "on its own (with the constraints and overrides of the manifest)",
+    )
+    minimal: bool = Field(
+        True,
+        description="Whether no requirement can be dropped from `conflict`; "
+        "False if the search ran out of resolutions",
+    )
+    suggestions: List[PinSuggestionSchema] = Field(
+        default_factory=list,
+        description="Closest resolvable versions of each conflicting requirement",
+    )
+    logs: str = Field("", description="uv error of the conflicting requirements")
+    resolutions: int = Field(0, description="Candidate resolutions run")
+    error: Optional[str] = Field(
+        None, description="Why the conflict could not be diagnosed, if so"
     )
 
 
@@ -117,6 +210,156 @@ class UVResolutionResultSchema(BaseModel):
         ..., description="Output in validated ResolveResult format"
     )
     logs: str = Field(..., description="Raw logs from the uv pip compile command")
+    timings: Optional[Dict[str, float]] = Field(
+        None, description="Seconds spent in each phase of the resolution"
+    )
+    cached: bool = Field(
+        False, description="Whether the result was served from the resolution cache"
+    )
+    exclude_newer: Optional[str] = Field(
+        None,
+        description="Snapshot (UTC timestamp) the resolution was pinned to, if any",
+    )
+    manifest_warnings: List[str] = Field(
+        default_factory=list,
+        description="Parts of the manifest skipped or approximated when reading it",
+    )
+    pin_diff: Optional[PinDiffSchema] = Field(
+        None,
+        description="Changes against the pins of the previous resolution, if given",
+    )
+    resolution_id: Optional[str] = Field(
+        None,
+        description="Fingerprint of the resolution, identifies it in graph queries",
+    )
+    conflict: Optional[ConflictReportSchema] = Field(
+        None, description="Diagnosis of a failed resolution, if requested"
+    )
+
+
+class ResolutionMatrixCellSchema(BaseModel):
+    python_version: str = Field(..., description="Target Python version")
+    python_platform: str = Field(..., description="Target platform")
+    resolution_strategy: str = Field(..., description="Resolution strategy")
+    errored: bool = Field(..., description="Whether the resolution failed")
+    error: Optional[str] = Field(
+        None, description="Tail of the uv output if the resolution failed"
+    )
+    num_deps: int = Field(0, description="Number of resolved packages")
+    cached: bool = Field(False, description="Served from the resolution cache")
+    diff: Optional[PinDiffSchema] = Field(
+        None, description="Pins compared to the baseline cell"
+    )
+
+
+class ResolutionMatrixSchema(BaseModel):
+    compatibility: Dict[str, Dict[str, bool]] = Field(
+        ...,
+        description="python_version -> '<platform>/<strategy>' -> resolvable",
+    )
+    baseline: Optional[str] = Field(
+        None,
+        description="Cell the diffs are relative to, '<python>/<platform>/<strategy>'",
+    )
+    baseline_pins: Dict[str, str] = Field(
+        default_factory=dict, description="Pinned versions of the baseline cell"
+    )
+    cells: List[ResolutionMatrixCellSchema] = Field(
+        ..., description="Result of every combination"
+    )
+    uv_version: str = Field(..., description="Version of uv used")
+    exclude_newer: Optional[str] = Field(
+        None, description="Snapshot the resolutions were pinned to, if any"
+    )
+
+
+class ManifestRequirementSchema(BaseModel):
+    name: str = Field(..., description="Normalized name of the package")
+    requirement: str = Field(..., description="The requirement as a PEP 508 string")
+    specifier: str = Field("", description="Version specifier, e.g. '>=1.2,<2'")
+    extras: List[str] = Field(
+        default_factory=list, description="Extras of the package requested"
+    )
+    marker: Optional[str] = Field(
+        None, description="Environment marker, e.g. 'python_version < \"3.11\"'"
+    )
+    url: Optional[str] = Field(None, description="Direct reference (VCS or archive)")
+    hashes: List[str] = Field(
+        default_factory=list,
+        description="Allowed hashes of the files, e.g. 'sha256:...'",
+    )
+
+
+class ManifestSchema(BaseModel):
+    """Dependencies of a project, whatever format they were declared in."""
+
+    source_format: str = Field(
+        ...,
+        description="Format the manifest was declared in: 'pep621', 'poetry', "
+        "'pdm' or 'requirements'",
+    )
+    name: Optional[str] = Field(None, description="Name of the project, if any")
+    requires_python: Optional[str] = Field(
+        None, description="Python versions supported by the project"
+    )
+    dependencies: List[ManifestRequirementSchema] = Field(
+        default_factory=list, description="Runtime dependencies"
+    )
+    optional_dependencies: Dict[str, List[ManifestRequirementSchema]] = Field(
+        default_factory=dict, description="Dependencies of each extra"
+    )
+    dependency_groups: Dict[str, List[ManifestRequirementSchema]] = Field(
+        default_factory=dict,
+        description="Development dependency groups (PEP 735, Poetry, PDM, uv)",
+    )
+    constraints: List[ManifestRequirementSchema] = Field(
+        default_factory=list,
+        description="Constraints that restrict versions without adding packages",
+    )
+    overrides: List[ManifestRequirementSchema] = Field(
+        default_factory=list,
+        description="Requirements replacing those of any dependency (uv overrides)",
+    )
+    dynamic: bool = Field(
+        False,
+        description="Whether the dependencies are only known by building the project",
+    )
+    warnings: List[str] = Field(
+        default_factory=list,
+        description="Parts of the manifest that were skipped or approximated",
+    )
+
+
+class DependencyNodeSchema(BaseModel):
+    name: str = Field(..., description="Name of the package")
+    version: str = Field(..., description="Pinned version ('' for direct references)")
+    distance: int = Field(
+        ..., description="Requirement edges between it and the queried package(s)"
+    )
+    direct: bool = Field(False, description="Whether the manifest requires it directly")
+    marker: str = Field(
+        "", description="Environment marker limiting where it is installed"
+    )
+
+
+class DependencyQuerySchema(BaseModel):
+    query: str = Field(
+        ...,
+        description="The query: 'dependents', 'dependencies', 'why' or 'blast_radius'",
+    )
+    package: Optional[str] = Field(None, description="The queried package, if any")
+    packages: List[DependencyNodeSchema] = Field(
+        default_factory=list,
+        description="Packages answering the query, nearest first",
+    )
+    paths: List[List[str]] = Field(
+        default_factory=list,
+        description="For 'why': shortest requirement chains from a direct "
+        "dependency to the package",
+    )
+    pin_diff: Optional[PinDiffSchema] = Field(
+        None, description="For 'blast_radius': pins changed between the resolutions"
+    )
 
 
 if __name__ == "__main__":
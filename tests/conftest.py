@@ -0,0 +1,9 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# the modules are imported as `src.upgrade_advisor...`, from the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+# keep the caches of the modules under test away from the user's
+os.environ["UPGRADE_ADVISOR_CACHE_DIR"] = tempfile.mkdtemp(prefix="upgrade-advisor-")
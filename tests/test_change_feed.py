@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+
+from src.upgrade_advisor.agents.tools import change_feed
+from src.upgrade_advisor.agents.tools.change_feed import (
+    CacheRefresher,
+    Change,
+    ChangeFeed,
+)
+from src.upgrade_advisor.agents.tools.indexes import PackageIndex
+from src.upgrade_advisor.agents.tools.pypi_cache import PyPICache
+
+
+class FakeFeed(ChangeFeed):
+    def __init__(self, changes):
+        self.changes = changes
+        self.polls = 0
+
+    async def last_serial(self):
+        return 0
+
+    async def changes_since(self, serial):
+        self.polls += 1
+        if self.polls == 1:
+            # e.g. a malformed changelog entry
+            raise KeyError("name")
+        return [c for c in self.changes if c.serial > serial]
+
+
+@pytest.fixture
+def index():
+    return PackageIndex.from_url("pypi", "https://pypi.example/simple")
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return PyPICache(tmp_path, max_bytes=10_000, ttl=60)
+
+
+@pytest.mark.asyncio
+async def test_run_survives_failed_polls(index, cache):
+    feed = FakeFeed([])
+    refresher = CacheRefresher(feed, index, interval=0, cache=cache)
+    task = asyncio.ensure_future(refresher.run())
+    for _ in range(100):
+        await asyncio.sleep(0)
+        if refresher.caught_up:
+            break
+    assert feed.polls >= 2
+    assert refresher.caught_up
+    # only cancelling ends the loop
+    assert not task.done()
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+
+@pytest.mark.asyncio
+async def test_changes_invalidate_the_package_entries(index, cache, monkeypatch):
+    monkeypatch.setattr(change_feed, "forget_negative_results", lambda keys: None)
+    namespace = index.namespace
+    for key in ("six", "six/1.16.0", "simple/six", "sixty"):
+        cache.put(f"{namespace}/{key}", b"{}", etag=None, last_serial=5)
+    cache.put(f"{namespace}/requests", b"{}", etag=None, last_serial=5)
+    refresher = CacheRefresher(FakeFeed([]), index, cache=cache)
+    await refresher._apply(
+        {
+            "six": [Change("six", "1.17.0", "new release", 10)],
+            "requests": [Change("requests", None, "remove project", 11)],
+        }
+    )
+    stale = {f"{namespace}/{key}" for key in ("six", "six/1.16.0", "simple/six")}
+    for key in stale:
+        assert cache.peek(key).fetched_at == 0
+    assert cache.peek(f"{namespace}/sixty").fetched_at > 0
+    assert cache.peek(f"{namespace}/requests") is None
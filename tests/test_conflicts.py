@@ -0,0 +1,62 @@
+import pytest
+
+from src.upgrade_advisor.agents.tools.conflicts import ConflictSearch, _split
+
+
+class FakeSearch(ConflictSearch):
+    """Resolves without uv: a set fails when it holds all of a conflict."""
+
+    def __init__(self, conflicts, **kwargs):
+        super().__init__(settings={}, **kwargs)
+        self.conflicts = [set(c) for c in conflicts]
+        self.calls: list[list[str]] = []
+
+    async def _run(self, requirements: list[str]) -> dict:
+        self.calls.append(requirements)
+        errored = any(c <= set(requirements) for c in self.conflicts)
+        return {"errored": errored, "output": {"deps": {}}}
+
+
+REQUIREMENTS = [f"pkg{i}" for i in range(12)]
+
+
+def test_split_keeps_order_and_sizes():
+    assert _split(list("abcde"), 2) == [["a", "b", "c"], ["d", "e"]]
+    assert _split(list("abcde"), 5) == [[c] for c in "abcde"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "conflict",
+    [["pkg3"], ["pkg0", "pkg11"], ["pkg2", "pkg5", "pkg9"], ["pkg6", "pkg7"]],
+)
+async def test_finds_the_minimal_conflict(conflict):
+    search = FakeSearch([conflict])
+    found, minimal = await search.minimize(REQUIREMENTS)
+    assert sorted(found) == sorted(conflict)
+    assert minimal
+
+
+@pytest.mark.asyncio
+async def test_finds_one_of_several_conflicts():
+    search = FakeSearch([["pkg1", "pkg2"], ["pkg8"]])
+    found, minimal = await search.minimize(REQUIREMENTS)
+    assert sorted(found) in (["pkg1", "pkg2"], ["pkg8"])
+    assert minimal
+
+
+@pytest.mark.asyncio
+async def test_resolves_each_subset_once():
+    search = FakeSearch([["pkg2", "pkg5", "pkg9"]])
+    await search.minimize(REQUIREMENTS)
+    subsets = [frozenset(call) for call in search.calls]
+    assert len(subsets) == len(set(subsets)) == search.resolutions
+
+
+@pytest.mark.asyncio
+async def test_stops_when_the_budget_runs_out():
+    search = FakeSearch([["pkg2", "pkg5", "pkg9"]], max_resolutions=4)
+    found, minimal = await search.minimize(REQUIREMENTS)
+    assert not minimal
+    assert {"pkg2", "pkg5", "pkg9"} <= set(found)
+    assert search.resolutions <= 4
@@ -0,0 +1,135 @@
+from src.upgrade_advisor.agents.tools.dependency_graph import (
+    CompileOutputParser,
+    DependencyGraph,
+    parse_compile_output,
+)
+
+LINE_STYLE = """\
+anyio==4.4.0              # via httpx
+certifi==2024.7.4         # via httpcore, httpx
+h11==0.14.0               # via httpcore
+httpcore==1.0.5           # via httpx
+httpx==0.27.0             # via -r /tmp/tmpab12cd/requirements.in, respx
+idna==3.7                 # via anyio, httpx
+respx==0.21.1             # via -r /tmp/tmpab12cd/requirements.in
+sniffio==1.3.1            # via anyio, httpx
+"""
+
+SPLIT_STYLE = """\
+# This file was autogenerated by uv via the following command:
+#    uv pip compile requirements.in
+anyio==4.4.0
+    # via httpx
+httpx==0.27.0
+    # via
+    #   -r requirements.in
+    #   respx
+idna==3.7
+    # via
+    #   anyio
+    #   httpx
+respx==0.21.1
+    # via -r requirements.in
+six @ git+https://github.com/benjaminp/six@1.16.0
+    --hash=sha256:0123
+    # via -r requirements.in
+"""
+
+UNIVERSAL = """\
+numpy==2.0.2 ; python_full_version < '3.10'  # via pandas
+numpy==2.2.6 ; python_full_version >= '3.10'  # via pandas
+pandas==2.2.3             # via -r -
+tzdata==2025.2 ; sys_platform == 'win32'  # via pandas
+"""
+
+
+def test_line_style():
+    graph = parse_compile_output(LINE_STYLE)
+    assert len(graph) == 8
+    assert graph.pins()["httpx"] == "0.27.0"
+    assert sorted(graph.requires("httpx")) == [
+        "anyio",
+        "certifi",
+        "httpcore",
+        "idna",
+        "sniffio",
+    ]
+    # the temporary directory uv was run in is dropped
+    assert graph.required_by("httpx") == ["-r requirements.in", "respx"]
+    assert graph.direct() == ["httpx", "respx"]
+
+
+def test_split_style():
+    graph = parse_compile_output(SPLIT_STYLE)
+    assert graph.pins() == {
+        "anyio": "4.4.0",
+        "httpx": "0.27.0",
+        "idna": "3.7",
+        "respx": "0.21.1",
+        "six": "",
+    }
+    assert graph.packages["six"].url == "git+https://github.com/benjaminp/six@1.16.0"
+    assert sorted(graph.required_by("idna")) == ["anyio", "httpx"]
+    assert graph.is_direct("six")
+    assert not graph.is_direct("idna")
+
+
+def test_fed_line_by_line_like_uv_writes():
+    parsed = parse_compile_output(SPLIT_STYLE)
+    parser = CompileOutputParser()
+    for line in SPLIT_STYLE.splitlines(keepends=True):
+        parser.feed(line.rstrip("\n"))
+    assert parser.graph.to_output() == parsed.to_output()
+
+
+def test_transitive_queries():
+    graph = parse_compile_output(LINE_STYLE)
+    assert graph.transitive_dependents("h11") == {"httpcore": 1, "httpx": 2, "respx": 3}
+    assert graph.transitive_dependencies("respx") == {
+        "httpx": 1,
+        "anyio": 2,
+        "certifi": 2,
+        "httpcore": 2,
+        "idna": 2,
+        "sniffio": 2,
+        "h11": 3,
+    }
+    # memoized results are copies
+    graph.transitive_dependents("h11").clear()
+    assert graph.transitive_dependents("H11") == {"httpcore": 1, "httpx": 2, "respx": 3}
+
+
+def test_why():
+    graph = parse_compile_output(LINE_STYLE)
+    assert graph.why("h11") == [["httpx", "httpcore", "h11"]]
+    assert graph.why("httpx") == [["httpx"]]
+    # only the shortest chains
+    assert graph.why("idna") == [["httpx", "idna"]]
+    assert graph.why("unknown") == []
+
+
+def test_universal_resolutions_keep_one_entry_per_marker():
+    graph = parse_compile_output(UNIVERSAL)
+    assert [p.version for p in graph.variants["numpy"]] == ["2.0.2", "2.2.6"]
+    assert graph.packages["numpy"].version == "2.0.2"
+    deps = graph.to_output()["deps"]
+    assert deps["numpy"]["version"] == "2.0.2"
+    assert deps["numpy ; python_full_version >= '3.10'"]["version"] == "2.2.6"
+    assert deps["tzdata"]["metainfo"] == "sys_platform == 'win32'"
+
+
+def test_output_round_trip():
+    for output in (LINE_STYLE, SPLIT_STYLE, UNIVERSAL):
+        graph = parse_compile_output(output)
+        rebuilt = DependencyGraph.from_output(graph.to_output())
+        assert rebuilt.to_output() == graph.to_output()
+        assert rebuilt.direct() == graph.direct()
+
+
+def test_stdin_requirements_become_direct():
+    graph = parse_compile_output("rich==13.7.1\nmarkdown-it-py==3.0.0  # via rich\n")
+    # uv does not annotate requirements read from stdin
+    assert graph.direct() == ["rich"]
+    graph.add_dependent("rich", "-r -")
+    assert graph.required_by("rich") == ["-r -"]
+    assert graph.to_output()["deps"]["rich"]["via"] == ["-r -"]
@@ -0,0 +1,41 @@
+import copy
+
+from src.upgrade_advisor.agents.tools.dependency_graph import parse_compile_output
+from src.upgrade_advisor.agents.tools.graph_query import (
+    get_dependency_graph,
+    query_dependency_graph,
+    resolution_key,
+)
+
+
+def _resolution(output: str, resolution_id: str = "abc") -> dict:
+    graph = parse_compile_output(output)
+    return {"output": graph.to_output(), "resolution_id": resolution_id}
+
+
+OLD = _resolution("httpx==0.27.0\nidna==3.7  # via httpx\nrich==13.7.1\n")
+NEW = _resolution("httpx==0.28.1\nidna==3.10  # via httpx\nrich==13.7.1\n")
+
+
+def test_graphs_are_keyed_on_the_output_not_the_id():
+    assert resolution_key(OLD) != resolution_key(NEW)
+    assert resolution_key(OLD) == resolution_key(dict(OLD, resolution_id="other"))
+    # same id, other pins: never the graph of the other resolution
+    assert get_dependency_graph(NEW).pins()["httpx"] == "0.28.1"
+    assert get_dependency_graph(OLD).pins()["httpx"] == "0.27.0"
+    assert get_dependency_graph(copy.deepcopy(OLD)) is get_dependency_graph(OLD)
+
+
+def test_blast_radius():
+    answer = query_dependency_graph(NEW, "blast_radius", other=OLD)
+    assert answer["pin_diff"]["changed"] == {
+        "httpx": ["0.28.1", "0.27.0"],
+        "idna": ["3.10", "3.7"],
+    }
+    assert {node["name"] for node in answer["packages"]} == {"httpx", "idna"}
+
+
+def test_invalid_queries():
+    assert "error" in query_dependency_graph(OLD, "nonsense", package="httpx")
+    assert "error" in query_dependency_graph({"deps": None}, "why", package="httpx")
+    assert "error" in query_dependency_graph(OLD, "blast_radius")
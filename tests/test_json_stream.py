@@ -0,0 +1,67 @@
+import json
+
+import pytest
+
+from src.upgrade_advisor.agents.tools.json_stream import (
+    iter_file_chunks,
+    iter_pypi_document,
+)
+
+DOCUMENT = {
+    "info": {"name": "café", "summary": "ünïcode ✓", "requires_dist": None},
+    "last_serial": 123456789,
+    "releases": {
+        "1.0": [{"filename": "pkg-1.0.tar.gz", "size": 1024, "yanked": False}],
+        "1.1": [],
+        "2.0rc1": [{"filename": "pkg-2.0rc1-py3-none-any.whl", "size": 2.5}],
+    },
+    "urls": [],
+    "vulnerabilities": [],
+}
+
+
+def _chunks(data: bytes, size: int):
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, 1 << 20])
+def test_chunking_does_not_change_the_result(size):
+    # small chunks split numbers, strings and multi-byte characters
+    data = json.dumps(DOCUMENT, ensure_ascii=False).encode("utf-8")
+    members = list(iter_pypi_document(_chunks(data, size)))
+    assert members == [
+        ("info", DOCUMENT["info"]),
+        ("last_serial", 123456789),
+        ("releases", ("1.0", DOCUMENT["releases"]["1.0"])),
+        ("releases", ("1.1", [])),
+        ("releases", ("2.0rc1", DOCUMENT["releases"]["2.0rc1"])),
+        ("urls", []),
+        ("vulnerabilities", []),
+    ]
+
+
+def test_streams_only_the_requested_keys():
+    data = json.dumps(DOCUMENT).encode("utf-8")
+    members = dict(iter_pypi_document([data], stream_keys=()))
+    assert members["releases"] == DOCUMENT["releases"]
+
+
+def test_empty_objects():
+    assert list(iter_pypi_document([b"{}"])) == []
+    assert list(iter_pypi_document([b'{"releases": {}, "info": {}}'])) == [("info", {})]
+
+
+@pytest.mark.parametrize(
+    "data", [b'{"info": {"name": "x"', b'{"info" {}}', b'{"info": {}', b""]
+)
+def test_malformed_documents_raise(data):
+    with pytest.raises(ValueError):
+        list(iter_pypi_document(_chunks(data, 4)))
+
+
+def test_reads_files_in_chunks(tmp_path):
+    path = tmp_path / "doc.json"
+    path.write_bytes(json.dumps(DOCUMENT).encode("utf-8"))
+    chunks = list(iter_file_chunks(path, chunk_size=16))
+    assert all(len(chunk) <= 16 for chunk in chunks)
+    assert dict(iter_pypi_document(iter(chunks), stream_keys=())) == DOCUMENT
@@ -0,0 +1,55 @@
+from src.upgrade_advisor.agents.tools.parse_response import (
+    LatestReleases,
+    select_latest_releases,
+)
+
+
+def _file(requires_python=None, yanked=False):
+    return {"requires_python": requires_python, "yanked": yanked}
+
+
+def test_orders_by_version_not_by_document_order():
+    releases = {v: [_file()] for v in ["1.10", "1.9", "2.0", "1.2.post1", "0.9"]}
+    assert list(select_latest_releases(releases, 3)) == ["1.9", "1.10", "2.0"]
+
+
+def test_keeps_everything_when_k_is_not_positive():
+    releases = {v: [_file()] for v in ["2", "1", "3"]}
+    assert list(select_latest_releases(releases, 0)) == ["1", "2", "3"]
+
+
+def test_skips_legacy_versions_but_counts_the_parseable_ones():
+    selector = LatestReleases(2)
+    for version in ["1.0", "not a version", "2.0", "3.0"]:
+        selector.add(version, [_file()])
+    assert list(selector.releases()) == ["2.0", "3.0"]
+    assert selector.seen == 3
+
+
+def test_prereleases_can_be_excluded():
+    releases = {v: [_file()] for v in ["1.0", "2.0rc1", "2.0.dev0", "1.1"]}
+    assert list(select_latest_releases(releases, 2, include_prereleases=False)) == [
+        "1.0",
+        "1.1",
+    ]
+    assert list(select_latest_releases(releases, 1)) == ["2.0rc1"]
+
+
+def test_filters_files_by_python_version_and_yanked():
+    releases = {
+        "1.0": [_file(">=3.8")],
+        "2.0": [_file(">=3.12")],
+        "2.1": [_file(">=3.8", yanked=True)],
+        "0.5": [],
+    }
+    selected = select_latest_releases(
+        releases, 5, include_yanked=False, python_version="3.10"
+    )
+    # releases without files are kept, they have nothing to filter
+    assert list(selected) == ["0.5", "1.0"]
+    assert selected["1.0"] == [_file(">=3.8")]
+
+
+def test_invalid_requires_python_does_not_exclude_files():
+    releases = {"1.0": [_file("not a specifier")]}
+    assert list(select_latest_releases(releases, 1, python_version="3.10")) == ["1.0"]
@@ -0,0 +1,208 @@
+import pytest
+
+from src.upgrade_advisor.agents.tools import manifest as manifest_module
+from src.upgrade_advisor.agents.tools.manifest import (
+    ManifestError,
+    load_manifest,
+    parse_pyproject,
+    parse_requirements,
+    poetry_specifier,
+    uv_manifest,
+)
+
+REQUIREMENTS = """\
+# a comment
+requests>=2.0 \\
+    ; python_version >= '3.8'  # trailing comment
+six==1.16.0 --hash=sha256:abc --hash sha256:def
+https://example.org/pkg.zip#egg=pkg
+-e git+https://example.org/repo.git#egg=repo
+-e ./local
+--index-url https://example.org/simple
+--pre
+not a requirement!
+"""
+
+
+def _requirements(requirements):
+    return [r.requirement for r in requirements]
+
+
+def test_pep621():
+    manifest = parse_pyproject(
+        """
+        [project]
+        name = "demo"
+        requires-python = ">=3.10"
+        dependencies = ["Requests[Socks]>=2.0", "not a requirement!"]
+
+        [project.optional-dependencies]
+        plot = ["matplotlib"]
+
+        [dependency-groups]
+        test = ["pytest"]
+        dev = [{include-group = "test"}, "ruff"]
+
+        [tool.uv]
+        constraint-dependencies = ["urllib3<3"]
+        override-dependencies = ["idna==3.7"]
+        """
+    )
+    assert manifest.source_format == "pep621"
+    assert manifest.requires_python == ">=3.10"
+    assert _requirements(manifest.dependencies) == ["requests[socks]>=2.0"]
+    assert _requirements(manifest.optional_dependencies["plot"]) == ["matplotlib"]
+    assert _requirements(manifest.dependency_groups["dev"]) == ["pytest", "ruff"]
+    assert _requirements(manifest.constraints) == ["urllib3<3"]
+    assert _requirements(manifest.overrides) == ["idna==3.7"]
+    assert len(manifest.warnings) == 1
+
+
+@pytest.mark.parametrize(
+    "constraint, specifier",
+    [
+        ("^1.2.3", "<2,>=1.2.3"),
+        ("^0.2.3", "<0.3,>=0.2.3"),
+        ("^0.0.3", "<0.0.4,>=0.0.3"),
+        ("~1.2.3", "<1.3,>=1.2.3"),
+        ("~1", "<2,>=1"),
+        ("1.2", "==1.2"),
+        ("1.2.*", "==1.2.*"),
+        (">=1.0,<2.0", "<2.0,>=1.0"),
+        (">=1.0 <2.0", "<2.0,>=1.0"),
+        ("^1.0 || ^2.0", "<3,>=2.0"),
+        ("^1.0 | ^2.0", "<3,>=2.0"),
+        ("*", ""),
+    ],
+)
+def test_poetry_specifier(constraint, specifier):
+    assert poetry_specifier(constraint) == specifier
+
+
+def test_poetry_alternatives_are_reported():
+    manifest = parse_pyproject(
+        """
+        [tool.poetry.dependencies]
+        python = ">=3.8,<3.9 || >=3.10"
+        click = "^7.0 || ^8.0"
+        rich = "^13.0"
+        """
+    )
+    assert _requirements(manifest.dependencies) == ["click<9,>=8.0", "rich<14,>=13.0"]
+    assert manifest.requires_python == ">=3.10"
+    assert len(manifest.warnings) == 2
+    assert any("'^7.0 || ^8.0' of click" in warning for warning in manifest.warnings)
+
+
+def test_poetry():
+    manifest = parse_pyproject(
+        """
+        [tool.poetry]
+        name = "demo"
+
+        [tool.poetry.dependencies]
+        python = "^3.10"
+        requests = {version = "^2.31", extras = ["socks"]}
+        tomli = {version = "^2.0", python = "<3.11"}
+        numpy = "1.26.*"
+        local = {path = "../local"}
+        matplotlib = {version = "^3.8", optional = true}
+
+        [tool.poetry.extras]
+        plot = ["matplotlib"]
+
+        [tool.poetry.group.dev.dependencies]
+        pytest = "^8.0"
+        """
+    )
+    assert manifest.source_format == "poetry"
+    assert manifest.name == "demo"
+    assert manifest.requires_python == "<4,>=3.10"
+    assert _requirements(manifest.dependencies) == [
+        "requests[socks]<3,>=2.31",
+        'tomli<3,>=2.0; python_version < "3.11"',
+        "numpy==1.26.*",
+    ]
+    assert _requirements(manifest.optional_dependencies["plot"]) == [
+        "matplotlib<4,>=3.8"
+    ]
+    assert _requirements(manifest.dependency_groups["dev"]) == ["pytest<9,>=8.0"]
+    assert any("local" in warning for warning in manifest.warnings)
+
+
+def test_pdm():
+    manifest = parse_pyproject(
+        """
+        [project]
+        name = "demo"
+        dependencies = ["httpx"]
+
+        [tool.pdm.dev-dependencies]
+        lint = ["ruff", "-e file:///${PROJECT_ROOT}/plugins/local"]
+        """
+    )
+    assert manifest.source_format == "pdm"
+    assert _requirements(manifest.dependency_groups["lint"]) == ["ruff"]
+    assert len(manifest.warnings) == 1
+
+
+def test_dynamic_and_missing_metadata():
+    dynamic = parse_pyproject('[project]\nname = "x"\ndynamic = ["dependencies"]\n')
+    assert dynamic.dynamic
+    build_only = parse_pyproject('[build-system]\nrequires = ["setuptools"]\n')
+    assert build_only.dynamic
+    assert uv_manifest("pyproject.toml", b"[build-system]\n").requirements is None
+
+
+def test_invalid_toml():
+    with pytest.raises(ManifestError):
+        parse_pyproject("[project")
+
+
+@pytest.fixture
+def uploads(tmp_path, monkeypatch):
+    monkeypatch.setattr(manifest_module, "UPLOADS_DIR", tmp_path)
+    return tmp_path
+
+
+def test_requirements_options(tmp_path):
+    manifest = parse_requirements(REQUIREMENTS, base_dir=tmp_path)
+    assert _requirements(manifest.dependencies) == [
+        'requests>=2.0; python_version >= "3.8"',
+        "six==1.16.0",
+        "pkg@ https://example.org/pkg.zip",
+        "repo@ git+https://example.org/repo.git",
+    ]
+    assert manifest.dependencies[1].hashes == ["sha256:abc", "sha256:def"]
+    assert len(manifest.warnings) == 3
+    # warnings name lines, never their content
+    assert all("not a requirement" not in warning for warning in manifest.warnings)
+
+
+def test_requirements_includes(uploads):
+    (uploads / "base.txt").write_text("httpx\n-c constraints.txt\n")
+    (uploads / "constraints.txt").write_text("h11<1\n")
+    (uploads / "requirements.txt").write_text("-r base.txt\n-r base.txt\nrich\n")
+    manifest = load_manifest(str(uploads / "requirements.txt"))
+    assert _requirements(manifest.dependencies) == ["httpx", "rich"]
+    assert _requirements(manifest.constraints) == ["h11<1"]
+    assert manifest.warnings == []
+
+
+def test_includes_stay_in_the_uploads(tmp_path, monkeypatch):
+    uploads = tmp_path / "uploads"
+    uploads.mkdir()
+    monkeypatch.setattr(manifest_module, "UPLOADS_DIR", uploads)
+    (tmp_path / "secret.txt").write_text("leaked-package\n")
+    (tmp_path / "requirements.txt").write_text("-r secret.txt\n")
+    manifest = parse_requirements(
+        "-r ../secret.txt\n-c /etc/passwd\n-r missing.txt\n", base_dir=uploads
+    )
+    assert manifest.dependencies == []
+    assert manifest.constraints == []
+    assert len(manifest.warnings) == 3
+    assert all("leaked" not in warning for warning in manifest.warnings)
+    # nor next to a manifest outside of them
+    manifest = load_manifest(str(tmp_path / "requirements.txt"))
+    assert manifest.dependencies == []
+    assert len(manifest.warnings) == 1
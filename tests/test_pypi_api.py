@@ -0,0 +1,23 @@
+import pytest
+
+from src.upgrade_advisor.agents.tools import pypi_api
+from src.upgrade_advisor.agents.tools.indexes import PackageIndex
+
+
+@pytest.mark.asyncio
+async def test_spellings_of_a_name_share_url_and_cache_key(monkeypatch):
+    index = PackageIndex.from_url("pypi", "https://pypi.example/simple")
+    requests = []
+
+    async def fetch_from_indexes(build_url, cache_key, accept=None):
+        requests.append((build_url(index), cache_key))
+        raise pypi_api.LookupFailedError(404)
+
+    monkeypatch.setattr(pypi_api, "fetch_from_indexes", fetch_from_indexes)
+    for name in ("Foo_Bar", "foo-bar", "foo.bar"):
+        await pypi_api.pypi_search(name)
+        await pypi_api.pypi_search_version(name, "1.0")
+    assert set(requests) == {
+        ("https://pypi.example/pypi/foo-bar/json", "foo-bar"),
+        ("https://pypi.example/pypi/foo-bar/1.0/json", "foo-bar/1.0"),
+    }
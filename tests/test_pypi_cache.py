@@ -0,0 +1,83 @@
+import itertools
+
+import pytest
+
+from src.upgrade_advisor.agents.tools import pypi_cache
+from src.upgrade_advisor.agents.tools.pypi_cache import PyPICache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # strictly increasing access times, so the LRU order is deterministic
+    ticks = itertools.count(1000)
+    monkeypatch.setattr(pypi_cache.time, "time", lambda: float(next(ticks)))
+
+
+@pytest.fixture
+def cache(tmp_path, clock):
+    return PyPICache(tmp_path, max_bytes=25, ttl=60)
+
+
+def test_put_and_get_round_trip(cache):
+    entry = cache.put("pypi/six", b'{"info": {}}', etag='"abc"', last_serial=7)
+    cached = cache.get("pypi/six")
+    assert cached.read_bytes() == b'{"info": {}}'
+    assert (cached.etag, cached.last_serial) == ('"abc"', 7)
+    assert cached.path == entry.path
+
+
+def test_evicts_least_recently_used(cache):
+    cache.put("a", b"x" * 10, etag=None, last_serial=0)
+    cache.put("b", b"x" * 10, etag=None, last_serial=0)
+    # reading `a` makes `b` the least recently used
+    assert cache.get("a") is not None
+    cache.put("c", b"x" * 10, etag=None, last_serial=0)
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+    assert cache.total_size() <= cache.max_bytes
+
+
+def test_never_evicts_the_entry_being_stored(cache):
+    cache.put("small", b"x" * 10, etag=None, last_serial=0)
+    entry = cache.put("large", b"x" * 40, etag=None, last_serial=0)
+    assert entry.path.exists()
+    assert cache.get("large") is not None
+    assert cache.get("small") is None
+
+
+def test_invalidate_removes_the_body(cache):
+    entry = cache.put("a", b"{}", etag=None, last_serial=0)
+    cache.invalidate("a")
+    assert cache.get("a") is None
+    assert not entry.path.exists()
+
+
+def test_forgets_entries_whose_body_is_gone(cache):
+    entry = cache.put("a", b"{}", etag=None, last_serial=0)
+    entry.path.unlink()
+    assert cache.get("a") is None
+    assert cache.peek("a") is None
+
+
+def test_package_entries(tmp_path):
+    cache = PyPICache(tmp_path, max_bytes=1000, ttl=60)
+    for key in (
+        "pypi/six",
+        "pypi/six/1.16.0",
+        "pypi/simple/six",
+        "pypi/six-extra",
+        "pypi/sixty/1.0",
+        "other/six",
+    ):
+        cache.put(key, b"{}", etag=None, last_serial=0)
+    found = cache.package_entries("pypi", ["six", "missing"])
+    assert sorted(entry.key for entry in found["six"]) == [
+        "pypi/simple/six",
+        "pypi/six",
+        "pypi/six/1.16.0",
+    ]
+    assert "missing" not in found
+    # lookups are batched, the result does not depend on the batch size
+    names = [f"pkg{i}" for i in range(500)] + ["six"]
+    assert cache.package_entries("pypi", names).keys() == {"six"}
@@ -0,0 +1,146 @@
+import json
+
+import pytest
+
+from src.upgrade_advisor.agents.tools import release_index
+from src.upgrade_advisor.agents.tools.parse_response import parse_response_pypi_search
+from src.upgrade_advisor.agents.tools.pypi_cache import CacheEntry
+from src.upgrade_advisor.agents.tools.release_index import (
+    ReleaseIndex,
+    build_compact_package,
+)
+
+
+def _file(version, requires_python=None, yanked=False):
+    return {
+        "url": f"https://files.example/pkg-{version}.tar.gz",
+        "upload_time": "2025-01-01T00:00:00",
+        "python_version": "source",
+        "requires_python": requires_python,
+        "yanked": yanked,
+    }
+
+
+def _entry(tmp_path, releases, description="A long description."):
+    document = {
+        "info": {
+            "name": "pkg",
+            "version": "2.0",
+            "summary": "A package",
+            "description": description,
+            "requires_dist": ["six>=1.0"],
+            "project_urls": {"Homepage": "https://example.org"},
+        },
+        "last_serial": 42,
+        "releases": releases,
+    }
+    path = tmp_path / "pkg.json"
+    path.write_text(json.dumps(document))
+    return CacheEntry("pkg", path, None, 42, 0.0, path.stat().st_size)
+
+
+@pytest.fixture
+def releases():
+    return {
+        "0.1-legacy!": [_file("legacy")],
+        "1.0": [_file("1.0", ">=3.8")],
+        "1.1": [_file("1.1", ">=3.8", yanked=True)],
+        "2.0rc1": [_file("2.0rc1", ">=3.10")],
+        "2.0": [_file("2.0", ">=3.10")],
+    }
+
+
+def test_keeps_the_newest_releases_sorted(tmp_path, releases):
+    package = build_compact_package(_entry(tmp_path, releases), (1,), 3)
+    assert [package.version(i) for i in range(len(package))] == ["1.1", "2.0rc1", "2.0"]
+    assert package.truncated
+
+
+def test_legacy_versions_do_not_truncate(tmp_path, releases):
+    package = build_compact_package(_entry(tmp_path, releases), (1,), 10)
+    assert len(package) == 4
+    assert not package.truncated
+    response = package.search_response(cutoff=0)
+    assert list(response.releases) == ["1.0", "1.1", "2.0rc1", "2.0"]
+
+
+def test_response_matches_the_document(tmp_path, releases):
+    package = build_compact_package(_entry(tmp_path, releases), (1,), 10)
+    response = package.search_response(cutoff=2)
+    assert list(response.releases) == ["2.0rc1", "2.0"]
+    release = response.releases["2.0"]
+    assert release.filename == "pkg-2.0.tar.gz"
+    assert release.requires_python == ">=3.10"
+    assert response.info.description == "A long description."
+    assert response.info.requires_dist == ["six>=1.0"]
+    assert response.last_serial == 42
+
+
+def test_filters(tmp_path, releases):
+    package = build_compact_package(_entry(tmp_path, releases), (1,), 10)
+    response = package.search_response(
+        cutoff=5, include_prereleases=False, include_yanked=False, python_version="3.9"
+    )
+    assert list(response.releases) == ["1.0"]
+
+
+def test_truncated_records_defer_to_the_document(tmp_path, releases):
+    package = build_compact_package(_entry(tmp_path, releases), (1,), 2)
+    # the two kept releases cannot tell which older ones pass the filter
+    assert package.search_response(cutoff=2, python_version="3.9") is None
+    assert package.search_response(cutoff=2) is not None
+
+
+def test_description_is_not_kept_in_the_record(tmp_path, releases):
+    package = build_compact_package(_entry(tmp_path, releases), (1,), 10)
+    assert "description" not in package.info_dict(include_description=False)
+
+
+def test_index_rebuilds_records_of_changed_documents(tmp_path, releases):
+    index = ReleaseIndex(max_packages=1, max_releases=10)
+    entry = _entry(tmp_path, releases)
+    package = index.get(entry)
+    assert index.get(entry) is package
+
+    releases["3.0"] = [_file("3.0")]
+    entry = _entry(tmp_path, releases, description="Changed.")
+    rebuilt = index.get(entry)
+    assert rebuilt is not package
+    assert rebuilt.version(len(rebuilt) - 1) == "3.0"
+    assert rebuilt.search_response(cutoff=1).info.description == "Changed."
+
+
+def test_index_is_bounded(tmp_path, releases):
+    index = ReleaseIndex(max_packages=1, max_releases=10)
+    entry = _entry(tmp_path, releases)
+    index.get(entry)
+    index.get(CacheEntry("other", entry.path, None, 42, 0.0, entry.size))
+    assert len(index) == 1
+    assert "pkg" not in index
+    index.invalidate(["other"])
+    assert len(index) == 0
+
+
+def test_search_parses_the_document_once(tmp_path, releases, monkeypatch):
+    passes = []
+    read_document = release_index._read_document
+
+    def counting(path, selectors):
+        passes.append(1)
+        return read_document(path, selectors)
+
+    # full passes over the releases (descriptions are read separately)
+    monkeypatch.setattr(release_index, "_read_document", counting)
+    index = ReleaseIndex(max_packages=1, max_releases=2)
+    entry = _entry(tmp_path, releases)
+    document = json.loads(entry.read_bytes())
+    # the new record is too short for the query, the same pass answers it
+    response = index.search(entry, cutoff=2, python_version="3.9")
+    assert passes == [1]
+    assert "pkg" in index
+    assert response == parse_response_pypi_search(
+        document, cutoff=2, python_version="3.9"
+    )
+    # the record answers on its own from now on
+    assert list(index.search(entry, cutoff=2).releases) == ["2.0rc1", "2.0"]
+    assert passes == [1]
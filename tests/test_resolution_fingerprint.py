@@ -0,0 +1,77 @@
+import pytest
+
+from src.upgrade_advisor.agents.tools.resolution_cache import (
+    canonical_dependencies,
+    normalize_snapshot,
+    resolution_fingerprint,
+)
+
+SETTINGS = {"resolution_strategy": "highest", "python_version": "3.12"}
+
+MANIFEST = b"""
+[project]
+name = "Demo_App"
+version = "0.1.0"
+requires-python = ">=3.10"
+dependencies = ["Requests[Socks]>=2.0", "numpy"]
+"""
+
+EQUIVALENT = b"""
+# same dependencies, spelled and ordered differently
+[project]
+version = "0.2.0"
+name = "demo-app"
+dependencies = [
+    "numpy",
+    "requests[socks] >= 2.0",
+]
+requires-python = ">=3.10"
+"""
+
+
+def test_formatting_and_spelling_do_not_change_the_fingerprint():
+    assert canonical_dependencies(MANIFEST) == canonical_dependencies(EQUIVALENT)
+    assert resolution_fingerprint(MANIFEST, **SETTINGS) == resolution_fingerprint(
+        EQUIVALENT, **SETTINGS
+    )
+
+
+def test_dependencies_change_the_fingerprint():
+    changed = MANIFEST.replace(b'"numpy"', b'"numpy<2"')
+    assert resolution_fingerprint(MANIFEST, **SETTINGS) != resolution_fingerprint(
+        changed, **SETTINGS
+    )
+
+
+def test_settings_change_the_fingerprint():
+    assert resolution_fingerprint(MANIFEST, **SETTINGS) != resolution_fingerprint(
+        MANIFEST, **dict(SETTINGS, python_version="3.11")
+    )
+
+
+def test_settings_order_does_not_matter():
+    reordered = dict(reversed(list(SETTINGS.items())))
+    assert resolution_fingerprint(MANIFEST, **SETTINGS) == resolution_fingerprint(
+        MANIFEST, **reordered
+    )
+
+
+def test_dynamic_and_non_pep621_manifests_use_their_content():
+    dynamic = b'[project]\nname = "x"\ndynamic = ["dependencies"]\n'
+    poetry = b'[tool.poetry.dependencies]\npython = "^3.10"\n'
+    assert set(canonical_dependencies(dynamic)) == {"content"}
+    assert set(canonical_dependencies(poetry)) == {"content"}
+    assert canonical_dependencies(poetry) != canonical_dependencies(poetry + b"\n")
+
+
+@pytest.mark.parametrize(
+    "value",
+    ["2025-06-01", "2025-06-01T00:00:00Z", "2025-06-01T02:00:00+02:00"],
+)
+def test_equivalent_snapshots_normalize_alike(value):
+    assert normalize_snapshot(value) == "2025-06-01T00:00:00Z"
+
+
+def test_invalid_snapshot():
+    with pytest.raises(ValueError):
+        normalize_snapshot("last tuesday")
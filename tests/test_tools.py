@@ -0,0 +1,27 @@
+from src.upgrade_advisor.agents.tools import tools
+from src.upgrade_advisor.agents.tools.tools import (
+    ParseManifestTool,
+    ResolvePyProjectTOMLTool,
+)
+
+
+def test_manifests_are_read_from_the_uploads_only(tmp_path, monkeypatch):
+    uploads = tmp_path / "uploads"
+    uploads.mkdir()
+    monkeypatch.setattr(tools, "UPLOADS_DIR", uploads)
+    (uploads / "requirements.txt").write_text("httpx\n")
+    (tmp_path / "secret.txt").write_text("leaked-package\n")
+
+    parse = ParseManifestTool()
+    assert parse.forward("requirements.txt")["dependencies"][0]["name"] == "httpx"
+    for path in (str(tmp_path / "secret.txt"), "../secret.txt", "/etc/passwd"):
+        assert "not inside uploads directory" in parse.forward(path)["error"]
+
+    result = ResolvePyProjectTOMLTool().forward(
+        toml_file=str(tmp_path / "secret.txt"),
+        resolution_strategy="highest",
+        python_platform="linux",
+        python_version="3.12",
+        universal=False,
+    )
+    assert "not inside uploads directory" in result["error"]
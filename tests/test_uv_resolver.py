@@ -0,0 +1,42 @@
+import pytest
+
+from src.upgrade_advisor.agents.tools.parse_response import parse_resolved_deps
+from src.upgrade_advisor.agents.tools.uv_resolver import (
+    preferred_pins,
+    previous_pins,
+    resolve_environment_async,
+)
+
+# a previous resolution with a direct reference, which has no version
+OUTPUT = """\
+httpx==0.27.0             # via -r -
+six @ git+https://github.com/benjaminp/six@1.16.0  # via -r -
+"""
+
+
+def _previous():
+    return {"output": parse_resolved_deps(OUTPUT).model_dump(), "errored": False}
+
+
+def test_direct_references_are_carried_through():
+    pins = previous_pins(_previous())
+    assert pins == {"httpx": "0.27.0", "six": ""}
+    # uv is only asked to keep the versioned pins
+    assert preferred_pins(pins) == {"httpx": "0.27.0"}
+
+
+@pytest.mark.asyncio
+async def test_previous_with_direct_reference_is_accepted():
+    # the manifest is invalid, so this fails before running uv, on the
+    # manifest and not on the previous resolution
+    result = await resolve_environment_async(content="[project", previous=_previous())
+    assert result["errored"]
+    assert "Invalid previous resolution" not in result["logs"]
+
+
+@pytest.mark.asyncio
+async def test_invalid_previous_is_rejected():
+    result = await resolve_environment_async(
+        content='[project]\nname = "demo"\nversion = "0"\n', previous=["httpx"]
+    )
+    assert "Invalid previous resolution" in result["logs"]